@@ -473,6 +473,7 @@ document.addEventListener('DOMContentLoaded', () => {
             // Create new track object
             const newTrack = {
                 buffer: audioBuffer,
+                file: file,                               // Original upload, for server-side alignment
                 name: file.name,
                 gainNode: audioContext.createGain(),      // For level adjustments
                 switchNode: audioContext.createGain(),     // For A/B switching
@@ -1508,7 +1509,21 @@ document.addEventListener('DOMContentLoaded', () => {
     const matchButton = document.getElementById('match-loudness');
     matchButton.parentNode.insertBefore(autoAlignButton, matchButton.nextSibling);
 
-    // Auto alignment function
+    // Cross-correlation on the server (align.py); the local peak search is the fallback
+    async function requestServerAlignment(fileA, fileB) {
+        const formData = new FormData();
+        formData.append('a', fileA);
+        formData.append('b', fileB);
+        const response = await fetch('/api/align', { method: 'POST', body: formData });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const result = await response.json();
+        console.log('Server alignment:', result);
+        return result.delayMs;
+    }
+
+    // Auto alignment function; positive delay means B plays the material later than A
     async function findOptimalAlignment(trackABuffer, trackBBuffer) {
         // Use first 100ms for analysis
         const sampleRate = trackABuffer.sampleRate;
@@ -1577,17 +1592,23 @@ document.addEventListener('DOMContentLoaded', () => {
             autoAlignButton.disabled = true;
             
             // Find optimal delay
-            const delayMs = await findOptimalAlignment(trackA.buffer, trackB.buffer);
+            let delayMs;
+            try {
+                delayMs = await requestServerAlignment(trackA.file, trackB.file);
+            } catch (error) {
+                console.warn('Server alignment unavailable, using local peak search:', error);
+                delayMs = await findOptimalAlignment(trackA.buffer, trackB.buffer);
+            }
             
             // Reset both delays first
             adjustDelay('A', -trackA.delayTime);
             adjustDelay('B', -trackB.delayTime);
             
-            // Apply the new delay
+            // Delay whichever track plays the material first
             if (delayMs > 0) {
-                adjustDelay('B', delayMs);
+                adjustDelay('A', delayMs);
             } else {
-                adjustDelay('A', -delayMs);
+                adjustDelay('B', -delayMs);
             }
             
             // Restore button state
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Time offset between two versions of the same material (the AB tool's Auto Align).
+#
+#   python align.py master_a.wav master_b.wav --max-lag 2
+#
+# A coarse FFT cross-correlation on decimated mono mixes finds the lag to
+# within the decimation factor, then a fine pass at the full rate over the
+# loudest stretch of A pins it down with parabolic interpolation. Both passes are
+# plain numpy/scipy FFTs, so a full-length track aligns in well under a second
+# once decoded.
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+from scipy import fft as sp_fft
+from scipy import signal
+
+from audio_io import read_audio
+
+DECIMATE = 16
+FINE_SECONDS = 10.0
+MAX_LAG_SECONDS = 2.0  # AB delay nodes top out at 2 s
+
+
+def to_mono(samples):
+    return samples.mean(axis=1, dtype=np.float32) if samples.ndim == 2 else samples.astype(np.float32)
+
+
+def load_mono(path, samplerate=None):
+    samples, rate = read_audio(path)
+    mono = to_mono(samples)
+    if samplerate and rate != samplerate:
+        common = math.gcd(int(rate), int(samplerate))
+        mono = signal.resample_poly(mono, samplerate // common, rate // common).astype(np.float32)
+        rate = samplerate
+    return mono, rate
+
+
+def correlate_lags(a, b, max_lag):
+    """Cross-correlation of ``b`` against ``a`` for lags -max_lag..max_lag.
+
+    Entry ``i`` is sum(a[n] * b[n + lag]) with lag = i - max_lag, so a peak at
+    a positive lag means the material shows up later in ``b``.
+    """
+    size = sp_fft.next_fast_len(len(a) + len(b) - 1, real=True)
+    # float32 in, float32 FFTs: about 30% quicker than double precision and plenty for a peak search
+    spectrum = sp_fft.rfft(b, size) * np.conj(sp_fft.rfft(a, size))
+    full = sp_fft.irfft(spectrum, size)
+    # Non-negative lags sit at the start of the circular result, negative ones at the end
+    return np.concatenate([full[size - max_lag:], full[:max_lag + 1]])
+
+
+def _peak(values):
+    # Index of the largest magnitude and its parabolic sub-sample offset
+    index = int(np.argmax(np.abs(values)))
+    offset = 0.0
+    if 0 < index < len(values) - 1:
+        left, centre, right = np.abs(values[index - 1:index + 2])
+        denominator = left - 2 * centre + right
+        if denominator:
+            offset = 0.5 * (left - right) / denominator
+    return index, offset
+
+
+def decimate_mean(samples, factor):
+    # Block averages: a crude low-pass, but A and B alias the same way and the fine pass corrects it
+    usable = len(samples) // factor * factor
+    return samples[:usable].reshape(-1, factor).mean(axis=1, dtype=np.float32)
+
+
+def _loudest_window(a, length):
+    # Start of the highest-energy window of ``length`` samples, from a cumulative sum
+    if len(a) <= length:
+        return 0
+    energy = np.concatenate([[0.0], np.cumsum(a.astype(np.float64) ** 2)])
+    return int(np.argmax(energy[length:] - energy[:-length]))
+
+
+def find_delay(a, b, samplerate, max_lag_seconds=MAX_LAG_SECONDS, decimate=DECIMATE,
+               fine_seconds=FINE_SECONDS):
+    """Lag of mono signal ``b`` relative to ``a``.
+
+    Returns ``delayMs`` (positive: B plays the material later than A, so A
+    has to be delayed by that much to line up), ``confidence`` (normalized
+    correlation at the peak, 0-1) and ``inverted`` when B is polarity-flipped.
+    """
+    start = time.perf_counter()
+    max_lag = max(1, int(max_lag_seconds * samplerate))
+
+    # Coarse pass over the whole tracks at a reduced rate
+    decimate = max(1, int(decimate))
+    a_coarse = decimate_mean(a, decimate)
+    b_coarse = decimate_mean(b, decimate)
+    coarse_max = max(1, min(max_lag // decimate, len(a_coarse) - 1, len(b_coarse) - 1))
+    coarse = correlate_lags(a_coarse, b_coarse, coarse_max)
+    index, _ = _peak(coarse)
+    coarse_lag = (index - coarse_max) * decimate
+
+    # Fine pass at the full rate around the coarse lag, on the loudest stretch of A
+    # that still has a matching stretch of B
+    search = 2 * decimate
+    low = max(0, search - coarse_lag)
+    length = min(int(fine_seconds * samplerate), len(a) - low, len(b) - coarse_lag - search - low)
+    if length <= 0:
+        raise ValueError('Tracks do not overlap at the detected offset')
+    high = min(len(a) - length, len(b) - coarse_lag - search - length)
+    # Energy is only used to pick the window, so the decimated signal will do
+    loudest = _loudest_window(a_coarse, max(1, length // decimate)) * decimate
+    offset = min(max(loudest, low), high)
+    a_window = a[offset:offset + length]
+    b_window = b[offset + coarse_lag - search:offset + coarse_lag + length + search]
+    fine = signal.correlate(b_window, a_window, mode='valid', method='fft')
+    index, fraction = _peak(fine)
+    lag = coarse_lag + index - search + float(fraction)
+
+    shift = coarse_lag + index - search
+    aligned = b[offset + shift:offset + shift + length]
+    norm = float(np.linalg.norm(a_window) * np.linalg.norm(aligned))
+    correlation = float(fine[index]) / norm if norm else 0.0
+
+    return {
+        'delayMs': round(lag / samplerate * 1000, 3),
+        'lagSamples': round(lag, 2),
+        'confidence': round(min(abs(correlation), 1.0), 4),
+        'inverted': correlation < 0,
+        'coarseLagSamples': coarse_lag,
+        'sampleRate': samplerate,
+        'seconds': round(time.perf_counter() - start, 4)
+    }
+
+
+def align_files(path_a, path_b, **options):
+    a, samplerate = load_mono(path_a)
+    b, _ = load_mono(path_b, samplerate)
+    return find_delay(a, b, samplerate, **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the delay between two versions of a track')
+    parser.add_argument('a')
+    parser.add_argument('b')
+    parser.add_argument('--max-lag', type=float, default=MAX_LAG_SECONDS, help='largest offset searched, seconds')
+    parser.add_argument('--decimate', type=int, default=DECIMATE, help='coarse pass rate divisor (1 = single pass)')
+    args = parser.parse_args()
+    print(json.dumps(align_files(args.a, args.b, max_lag_seconds=args.max_lag, decimate=args.decimate), indent=2))
+
+
+if __name__ == '__main__':
+    main()
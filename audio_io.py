@@ -0,0 +1,198 @@
+import json
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:  # optional: WAV still works through the wave module
+    soundfile = None
+
+BLOCK_FRAMES = 65536
+
+
+class AudioReader:
+    """Block-wise float32 decoder.
+
+    ``blocks()`` yields arrays shaped (frames, channels) so callers can keep
+    memory bounded regardless of file length. ``frames`` is None when the
+    backend can't tell the length up front (ffmpeg pipes).
+    """
+
+    samplerate = None
+    channels = None
+    frames = None
+    backend = None
+
+    def blocks(self, block_frames=BLOCK_FRAMES):
+        raise NotImplementedError
+
+    def read(self, start, frames):
+        # Random access: up to ``frames`` frames from ``start``, shorter at the end of the file
+        raise NotImplementedError(f'{self.backend} reader cannot seek')
+
+    def close(self):
+        pass
+
+    @property
+    def duration(self):
+        if self.frames is None or not self.samplerate:
+            return None
+        return self.frames / self.samplerate
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SoundFileReader(AudioReader):
+    backend = 'soundfile'
+
+    def __init__(self, path):
+        self.file = soundfile.SoundFile(path)
+        self.samplerate = self.file.samplerate
+        self.channels = self.file.channels
+        self.frames = self.file.frames if self.file.seekable() else None
+
+    def blocks(self, block_frames=BLOCK_FRAMES):
+        for block in self.file.blocks(blocksize=block_frames, dtype='float32', always_2d=True):
+            yield block
+
+    def read(self, start, frames):
+        if not self.file.seekable():
+            return super().read(start, frames)
+        self.file.seek(min(start, self.file.frames))
+        return self.file.read(frames, dtype='float32', always_2d=True)
+
+    def close(self):
+        self.file.close()
+
+
+class WaveReader(AudioReader):
+    backend = 'wave'
+
+    def __init__(self, path):
+        self.file = wave.open(path, 'rb')
+        self.samplerate = self.file.getframerate()
+        self.channels = self.file.getnchannels()
+        self.frames = self.file.getnframes()
+        self.sample_width = self.file.getsampwidth()
+
+    def blocks(self, block_frames=BLOCK_FRAMES):
+        while True:
+            data = self.file.readframes(block_frames)
+            if not data:
+                return
+            yield pcm_to_float(data, self.sample_width, self.channels)
+
+    def read(self, start, frames):
+        self.file.setpos(min(start, self.frames))
+        return pcm_to_float(self.file.readframes(frames), self.sample_width, self.channels)
+
+    def close(self):
+        self.file.close()
+
+
+class FFmpegReader(AudioReader):
+    backend = 'ffmpeg'
+
+    def __init__(self, path):
+        probe = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a:0', '-show_entries',
+             'stream=sample_rate,channels,duration', '-of', 'json', path],
+            capture_output=True, check=True
+        )
+        streams = json.loads(probe.stdout).get('streams') or []
+        if not streams:
+            raise ValueError(f'No audio stream found in {path}')
+        self.samplerate = int(streams[0]['sample_rate'])
+        self.channels = int(streams[0]['channels'])
+        self.path = path
+        self.process = None
+
+    def blocks(self, block_frames=BLOCK_FRAMES):
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-v', 'error', '-i', self.path, '-f', 'f32le', '-acodec', 'pcm_f32le', '-'],
+            stdout=subprocess.PIPE
+        )
+        block_bytes = block_frames * self.channels * 4
+        try:
+            while True:
+                data = self.process.stdout.read(block_bytes)
+                if not data:
+                    break
+                usable = len(data) - len(data) % (self.channels * 4)
+                yield np.frombuffer(data[:usable], dtype='<f4').reshape(-1, self.channels)
+        finally:
+            self.close()
+
+    def read(self, start, frames):
+        # A fresh decoder per call; -ss before -i seeks accurately for the formats we see
+        result = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-ss', f'{start / self.samplerate:.6f}', '-i', self.path,
+             '-t', f'{frames / self.samplerate:.6f}', '-f', 'f32le', '-acodec', 'pcm_f32le', '-'],
+            capture_output=True, check=True
+        )
+        data = result.stdout[:frames * self.channels * 4]
+        usable = len(data) - len(data) % (self.channels * 4)
+        return np.frombuffer(data[:usable], dtype='<f4').reshape(-1, self.channels)
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdout.close()
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+
+def pcm_to_float(data, sample_width, channels):
+    # Little-endian integer PCM bytes to float32 in [-1, 1)
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints.astype(np.float32) / (1 << 23)
+    elif sample_width == 4:
+        samples = (np.frombuffer(data, dtype='<i4').astype(np.float64) / (1 << 31)).astype(np.float32)
+    else:
+        raise ValueError(f'Unsupported sample width: {sample_width}')
+    return samples.reshape(-1, channels)
+
+
+def open_audio(path):
+    errors = []
+    if soundfile is not None:
+        try:
+            return SoundFileReader(path)
+        except Exception as e:
+            errors.append(f'soundfile: {e}')
+    try:
+        return WaveReader(path)
+    except (wave.Error, EOFError, ValueError) as e:
+        errors.append(f'wave: {e}')
+    if shutil.which('ffmpeg') and shutil.which('ffprobe'):
+        try:
+            return FFmpegReader(path)
+        except (subprocess.CalledProcessError, ValueError) as e:
+            errors.append(f'ffmpeg: {e}')
+    raise ValueError(f'Unsupported audio file {path} ({"; ".join(errors)})')
+
+
+def read_audio(path):
+    # Whole-file convenience for short clips; returns (samples, samplerate)
+    with open_audio(path) as reader:
+        blocks = list(reader.blocks())
+        samplerate = reader.samplerate
+        channels = reader.channels
+    if not blocks:
+        return np.zeros((0, channels), dtype=np.float32), samplerate
+    return np.concatenate(blocks), samplerate
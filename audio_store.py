@@ -0,0 +1,231 @@
+from collections import OrderedDict
+import os
+import re
+import ssl
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_file_id_re = re.compile(r'^[0-9a-f-]{36}$')
+_range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class AudioStore:
+    """Process-wide directory of uploaded audio served back at /temp/audio/<id>.
+
+    Total size is capped at ``max_bytes`` (least recently used files go first)
+    and a background sweeper deletes files older than ``ttl`` seconds.
+    """
+
+    def __init__(self, root=None, max_bytes=2 * 1024 ** 3, ttl=3600, sweep_interval=60):
+        self.root = root or tempfile.mkdtemp(prefix='loum-audio-')
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        # Leftovers from a previous run are not indexed, so clear them out
+        for name in os.listdir(self.root):
+            if _file_id_re.match(name):
+                self._unlink(os.path.join(self.root, name))
+
+        self._sweeper = threading.Thread(target=self._sweep_loop, name='audio-store-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def path(self, file_id):
+        if not _file_id_re.match(file_id):
+            raise ValueError(f'Invalid audio file id: {file_id}')
+        return os.path.join(self.root, file_id)
+
+    def add(self, file_id, content_type='audio/wav'):
+        # Register a file that has been fully written to self.path(file_id)
+        path = self.path(file_id)
+        stat = os.stat(path)
+        with self._lock:
+            self._entries[file_id] = {
+                'size': stat.st_size,
+                'contentType': content_type,
+                'created': time.time(),
+                'etag': _etag(file_id, stat)
+            }
+            self.total_bytes += stat.st_size
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest_id, _ = next(iter(self._entries.items()))
+                if oldest_id == file_id:
+                    break
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def refresh(self, file_id):
+        # Re-stat a stored file that was edited in place (size and ETag change)
+        stat = os.stat(self.path(file_id))
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is None:
+                return None
+            self.total_bytes += stat.st_size - entry['size']
+            entry['size'] = stat.st_size
+            entry['etag'] = _etag(file_id, stat)
+            return entry
+
+    def get(self, file_id):
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None:
+                self._entries.move_to_end(file_id)
+            return entry
+
+    def discard(self, path):
+        self._unlink(path)
+
+    def _remove(self, file_id):
+        entry = self._entries.pop(file_id)
+        self.total_bytes -= entry['size']
+        # Open file descriptors keep serving until the request finishes
+        self._unlink(os.path.join(self.root, file_id))
+
+    def _unlink(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def sweep(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [file_id for file_id, entry in self._entries.items() if entry['created'] < cutoff]
+            for file_id in expired:
+                self._remove(file_id)
+            self.expirations += len(expired)
+        if expired:
+            logger.info(f'Removed {len(expired)} expired audio files')
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f'Audio store sweep failed: {e}')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'bytes': self.total_bytes,
+                'maxBytes': self.max_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def serve(self, handler, file_id):
+        # Answer a GET for a stored file with ETag, Range and sendfile support
+        try:
+            entry = self.get(file_id)
+        except ValueError:
+            entry = None
+        if entry is None:
+            handler.send_error(404, 'Audio file not found')
+            return
+
+        if handler.headers.get('If-None-Match') == entry['etag']:
+            handler.send_response(304)
+            handler.send_header('ETag', entry['etag'])
+            handler.end_headers()
+            return
+
+        size = entry['size']
+        byte_range = parse_range(handler.headers.get('Range'), size)
+        if byte_range is False:
+            handler.send_response(416)
+            handler.send_header('Content-Range', f'bytes */{size}')
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        partial = byte_range is not None
+        start, end = byte_range if partial else (0, size - 1)
+
+        try:
+            f = open(os.path.join(self.root, file_id), 'rb')
+        except OSError:
+            handler.send_error(404, 'Audio file not found')
+            return
+
+        with f:
+            length = end - start + 1 if size else 0
+            handler.send_response(206 if partial else 200)
+            handler.send_header('Content-Type', entry['contentType'])
+            handler.send_header('Content-Length', length)
+            handler.send_header('Accept-Ranges', 'bytes')
+            handler.send_header('ETag', entry['etag'])
+            handler.send_header('Cache-Control', 'private, max-age=3600')
+            if partial:
+                handler.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            handler.end_headers()
+            if handler.command != 'HEAD' and length:
+                send_file_range(handler, f, start, length)
+
+
+def _etag(file_id, stat):
+    return f'"{file_id}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(range_header, size):
+    # Single 'bytes=' range -> (start, end) inclusive, None to send everything,
+    # or False when the range can't be satisfied
+    if not range_header or size <= 0:
+        return None
+    match = _range_re.match(range_header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    else:
+        start = max(size - int(match.group(2)), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def send_file_range(handler, f, offset, length):
+    # Zero-copy transfer where the platform allows it, buffered copy otherwise
+    handler.wfile.flush()
+    if hasattr(os, 'sendfile') and not isinstance(handler.connection, ssl.SSLSocket):
+        try:
+            sock_fd = handler.connection.fileno()
+            while length > 0:
+                sent = os.sendfile(sock_fd, f.fileno(), offset, length)
+                if sent == 0:
+                    break
+                offset += sent
+                length -= sent
+            return
+        except (OSError, AttributeError, ValueError) as e:
+            if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                raise
+    f.seek(offset)
+    while length > 0:
+        data = f.read(min(64 * 1024, length))
+        if not data:
+            break
+        handler.wfile.write(data)
+        length -= len(data)
+
+
+def store_from_env():
+    return AudioStore(
+        root=os.getenv('AUDIO_STORE_DIR') or None,
+        max_bytes=int(os.getenv('AUDIO_STORE_MAX_BYTES', 2 * 1024 ** 3)),
+        ttl=float(os.getenv('AUDIO_STORE_TTL', 3600)),
+        sweep_interval=float(os.getenv('AUDIO_STORE_SWEEP_INTERVAL', 60))
+    )
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# Loudness, peak, duration and tag QC over a directory tree of masters.
+#
+#   python batch_analyze.py /path/to/release -o report.jsonl
+#   python batch_analyze.py masters/ --format csv --mode bs1770 -j 8 > report.csv
+#
+# Files are analyzed on a process pool and results stream out as they finish.
+# A cache file (default: .batch_analysis.json in the scanned directory) remembers
+# size, mtime and the audio fingerprint (fingerprint.py) per file. A file whose size
+# and mtime haven't changed is not opened at all. A touched or retagged file whose
+# audio is identical costs a hash and a tag read.
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from audio_io import open_audio
+from fingerprint import content_key
+from loudness import LoudnessMeter, MODES
+from metadata import read_metadata
+
+EXTENSIONS = ('.wav', '.wave', '.mp3', '.flac', '.aif', '.aiff', '.ogg')
+CACHE_VERSION = 2
+
+CSV_COLUMNS = ['path', 'status', 'duration', 'sampleRate', 'channels', 'integratedLoudness',
+               'loudnessRange', 'shortTermMax', 'truePeak', 'samplePeak', 'Title', 'Artist',
+               'Album', 'ISRC', 'Year', 'Genre', 'fingerprint', 'error']
+
+
+def find_audio_files(root):
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for name in sorted(filenames):
+            if name.lower().endswith(EXTENSIONS) and not name.startswith('._'):
+                yield os.path.join(directory, name)
+
+
+def analyze(path, mode='js', cached=None):
+    # Worker entry point. ``cached`` is the previous entry for a file whose mtime moved;
+    # if the audio still fingerprints the same, its result is reused instead of decoding again.
+    start = time.perf_counter()
+    entry = {'path': path}
+    try:
+        stat = os.stat(path)
+        entry.update(size=stat.st_size, mtime=stat.st_mtime)
+        entry['fingerprint'] = content_key(path)
+        if cached and cached.get('fingerprint') == entry['fingerprint'] and cached.get('mode') == mode:
+            entry.update({key: value for key, value in cached.items() if key not in entry})
+            entry['metadata'] = read_metadata(path)  # Tags may be all that changed
+            entry['status'] = 'unchanged'
+            return entry
+
+        with open_audio(path) as reader:
+            meter = LoudnessMeter(reader.samplerate, reader.channels, mode)
+            for block in reader.blocks():
+                meter.process(block)
+            entry['backend'] = reader.backend
+        entry.update(meter.result())
+        entry['metadata'] = read_metadata(path)
+        entry['status'] = 'analyzed'
+    except Exception as e:
+        entry['status'] = 'error'
+        entry['error'] = f'{type(e).__name__}: {e}'
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+class AnalysisCache:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    self.entries = data.get('files', {})
+            except (OSError, ValueError):
+                pass
+
+    def lookup(self, path):
+        # Returns (fresh entry or None, stale entry to hand the worker)
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is None or entry.get('status') == 'error':
+            return None, None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None  # Gone since the walk; let the worker report it
+        if entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            return entry, None
+        return None, entry
+
+    def store(self, entry):
+        self.entries[os.path.abspath(entry['path'])] = entry
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.entries}, f)
+        os.replace(tmp_path, self.path)
+
+
+class JsonLinesWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, entry):
+        self.out.write(json.dumps(entry) + '\n')
+        self.out.flush()
+
+
+class CsvWriter:
+    def __init__(self, out):
+        self.out = out
+        self.writer = csv.DictWriter(out, CSV_COLUMNS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, entry):
+        row = dict(entry)
+        row.update(entry.get('metadata') or {})
+        self.writer.writerow(row)
+        self.out.flush()
+
+
+def run(paths, writer, cache, mode='js', jobs=None, force=False, progress=None):
+    counts = {'files': len(paths), 'analyzed': 0, 'cached': 0, 'unchanged': 0, 'error': 0}
+    pending = []
+    for path in paths:
+        fresh, stale = (None, None) if force else cache.lookup(path)
+        if fresh is not None and fresh.get('mode') == mode:
+            counts['cached'] += 1
+            writer.write(dict(fresh, path=path, status='cached'))
+        else:
+            pending.append((path, stale))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(analyze, path, mode, stale) for path, stale in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            entry = future.result()
+            counts[entry['status']] += 1
+            writer.write(entry)
+            cache.store(dict(entry, status='analyzed' if entry['status'] == 'unchanged' else entry['status']))
+            if done % 50 == 0:
+                cache.save()  # An interrupted run keeps what it finished
+            if progress:
+                progress(done, len(pending), entry)
+    cache.save()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch loudness/peak/metadata analysis over a directory tree')
+    parser.add_argument('paths', nargs='+', help='directories and/or audio files')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--mode', choices=MODES, default='js', help='loudness mode (see loudness.py)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--cache', help='cache file (default: .batch_analysis.json in the first directory)')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--force', action='store_true', help='re-analyze files even if unchanged')
+    args = parser.parse_args()
+
+    paths = []
+    for target in args.paths:
+        paths.extend(find_audio_files(target) if os.path.isdir(target) else [target])
+    if args.no_cache:
+        cache_path = None
+    else:
+        first_dir = next((p for p in args.paths if os.path.isdir(p)), '.')
+        cache_path = args.cache or os.path.join(first_dir, '.batch_analysis.json')
+    cache = AnalysisCache(cache_path)
+
+    def progress(done, total, entry):
+        print(f'[{done}/{total}] {entry["status"]}: {entry["path"]}', file=sys.stderr)
+
+    start = time.perf_counter()
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = CsvWriter(out) if args.format == 'csv' else JsonLinesWriter(out)
+        counts = run(paths, writer, cache, args.mode, max(1, args.jobs), args.force, progress)
+    finally:
+        if args.output:
+            out.close()
+    print(f'{counts["files"]} files in {time.perf_counter() - start:.1f}s: {counts["analyzed"]} analyzed, '
+          f'{counts["cached"] + counts["unchanged"]} unchanged, {counts["error"]} errors', file=sys.stderr)
+    sys.exit(1 if counts['error'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Album ID extraction per page: the original decode + four re.search passes
+# versus album_ids' single-pass scanner, over whole pages and as a stream
+# that stops at the first top-priority ID.
+#
+#   python benchmarks/album_id_scan_bench.py --corpus saved_album_pages/
+#
+# The corpus is every *.html under --corpus (saved album pages); without one,
+# fixture pages in both layouts plus randcamp/scraper/page_source.html are used.
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'randcamp', 'scraper'))
+
+from album_ids import SCAN_CHUNK, AlbumIdScanner, find_album_id
+from fixture_server import LAYOUTS, album_page
+
+SCRAPER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'randcamp', 'scraper')
+
+LEGACY_PATTERNS = [
+    re.compile(r'album=(\d+)'),
+    re.compile(r'album_id=(\d+)'),
+    re.compile(r'album/(\d+)'),
+    re.compile(r'album_id&quot;:(\d+)')
+]
+
+
+def legacy_extract(content):
+    # extract_album_id before: response.text, then each pattern over the whole page in turn
+    html = content.decode('utf-8', errors='replace')
+    for pattern in LEGACY_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            return match.group(1)
+    return None
+
+
+def streamed_extract(content, chunk_size=SCAN_CHUNK):
+    # What AlbumIdExtractor.extract does with iter_content; returns (id, bytes read)
+    scanner = AlbumIdScanner()
+    for offset in range(0, len(content), chunk_size):
+        if scanner.feed(content[offset:offset + chunk_size]) is not None:
+            return scanner.result(), scanner.bytes
+    scanner.feed(b'', final=True)
+    return scanner.result(), scanner.bytes
+
+
+def load_corpus(corpus_dir, padding_kb):
+    if corpus_dir:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(corpus_dir, '**', '*.html'), recursive=True)):
+            with open(path, 'rb') as f:
+                pages[os.path.relpath(path, corpus_dir)] = f.read()
+        return pages
+    pages = {f'{layout}-{i}': album_page(f'release-{i}', padding_kb, True, layout)
+             for layout in LAYOUTS for i in range(20)}
+    pages.update({f'{layout}-noid': album_page('noid-release', padding_kb, False, layout) for layout in LAYOUTS})
+    with open(os.path.join(SCRAPER_DIR, 'page_source.html'), 'rb') as f:
+        pages['page_source.html'] = f.read()
+    return pages
+
+
+def timed(function, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [function(content) for content in pages]
+    return (time.perf_counter() - start) / repeat / len(pages), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Album ID scanning micro-benchmark')
+    parser.add_argument('--corpus', help='directory of saved album pages (*.html)')
+    parser.add_argument('--padding-kb', type=int, default=150, help='fixture page size without a corpus')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.padding_kb)
+    names, pages = list(corpus), list(corpus.values())
+    total_bytes = sum(len(content) for content in pages)
+
+    legacy_seconds, legacy = timed(legacy_extract, pages, args.repeat)
+    whole_seconds, whole = timed(find_album_id, pages, args.repeat)
+    stream_seconds, streamed = timed(streamed_extract, pages, args.repeat)
+    read_bytes = sum(read for _, read in streamed)
+
+    report = {
+        'pages': len(pages),
+        'meanPageBytes': total_bytes // len(pages),
+        'legacyMicrosPerPage': round(legacy_seconds * 1e6, 1),
+        'singlePassMicrosPerPage': round(whole_seconds * 1e6, 1),
+        'streamedMicrosPerPage': round(stream_seconds * 1e6, 1),
+        'streamedBytesRead': read_bytes,
+        'streamedBytesFraction': round(read_bytes / total_bytes, 3),
+        'earlyExits': sum(read < len(content) for (_, read), content in zip(streamed, pages)),
+        # Differences are pages where a head/tralbum ID outranks a lower-priority legacy match
+        'disagreements': [name for name, a, b in zip(names, legacy, whole) if a != b],
+        'streamMismatches': [name for name, a, (b, _) in zip(names, whole, streamed) if a != b]
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
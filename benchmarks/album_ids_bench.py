@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Album ID extraction throughput against the local Bandcamp fixture hosts:
+# the old one-URL-at-a-time requests.get loop versus the pooled extractor.
+#
+#   python benchmarks/album_ids_bench.py --urls 5000 --hosts 8 --delay 0.05 -j 64
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'randcamp', 'scraper'))
+
+from album_ids import AlbumIdExtractor, compact, find_album_id
+from fixture_server import LAYOUTS, album_id_for, fixture_urls, start_fixture_servers
+
+
+def serial_baseline(urls):
+    start = time.perf_counter()
+    for url in urls:
+        find_album_id(requests.get(url).text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Album ID extractor benchmark')
+    parser.add_argument('--urls', type=int, default=2000)
+    parser.add_argument('--hosts', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=0.05, help='fixture latency in seconds')
+    parser.add_argument('--fail-rate', type=float, default=0.02)
+    parser.add_argument('--missing-rate', type=float, default=0.05)
+    parser.add_argument('-j', '--workers', type=int, default=64)
+    parser.add_argument('--rate', type=float, default=0, help='per-host requests per second (0 = unlimited)')
+    parser.add_argument('--serial-sample', type=int, default=50, help='URLs timed with the serial loop')
+    parser.add_argument('--layout', choices=LAYOUTS, default='tail', help='where fixture pages carry the ID')
+    parser.add_argument('--drain-kb', type=int, default=64, help='page remainder read to keep a connection')
+    args = parser.parse_args()
+
+    servers, base_urls = start_fixture_servers(args.hosts, args.delay, args.fail_rate, layout=args.layout)
+    urls = fixture_urls(base_urls, args.urls, args.missing_rate)
+
+    # The serial loop is timed on a sample and extrapolated
+    fail_rate = args.fail_rate
+    for server in servers:
+        server.fail_rate = 0.0
+    serial = serial_baseline(urls[:args.serial_sample]) / args.serial_sample * len(urls)
+    for server in servers:
+        server.fail_rate = fail_rate
+    baseline_counters = dict(servers[0].counters)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'albums.jsonl')
+        extractor = AlbumIdExtractor(workers=args.workers, rate=args.rate, retries=5, backoff=0.05,
+                                     drain_bytes=args.drain_kb * 1024)
+        counts = extractor.run(urls, log_path, progress=False)
+        extractor.close()
+        start = time.perf_counter()
+        albums = compact(log_path, os.path.join(tmp, 'albums.json'), urls)
+        compact_seconds = time.perf_counter() - start
+
+    wrong = [album for album in albums
+             if album['id'] != album_id_for(album['url'].split('/album/')[1].split('?')[0])]
+    for server in servers:
+        server.shutdown()
+
+    counters = servers[0].counters
+    report = {
+        'urls': args.urls,
+        'hosts': args.hosts,
+        'workers': args.workers,
+        'fixtureDelay': args.delay,
+        'serialSecondsEstimate': round(serial, 2),
+        'seconds': counts['seconds'],
+        'pagesPerSecond': round(args.urls / counts['seconds'], 1),
+        'speedup': round(serial / counts['seconds'], 1),
+        'compactSeconds': round(compact_seconds, 3),
+        'counts': counts,
+        'albums': len(albums),
+        'wrongIds': len(wrong),
+        'connections': counters['connections'] - baseline_counters['connections'],
+        'upstreamRequests': counters['requests'] - baseline_counters['requests'],
+        'upstreamFailures': counters['failures'] - baseline_counters['failures']
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
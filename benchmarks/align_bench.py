@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Speed and accuracy of align.find_delay against a brute-force time-domain
+# cross-correlation and the first-peak heuristic the AB tool used in JS.
+#
+#   python benchmarks/align_bench.py --seconds 300 --samplerate 44100
+#
+# Test material is noise bursts over a slowly modulated tone. B is A shifted,
+# attenuated, low-passed (zero phase) and noised, like another master of the mix.
+# The brute-force reference can't run on full tracks in reasonable time; it runs
+# on a short excerpt with a narrow lag range and is extrapolated by N*lags.
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import align
+
+
+def synthetic_track(seconds, samplerate, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    bursts = rng.standard_normal(len(t)) * np.sin(2 * np.pi * 0.5 * t) ** 8 * 0.3
+    tone = 0.1 * np.sin(2 * np.pi * 220 * t) * np.sin(2 * np.pi * 0.1 * t)
+    return (bursts + tone).astype(np.float32)
+
+
+def other_master(a, lag, samplerate, seed=1):
+    rng = np.random.default_rng(seed)
+    b = np.zeros_like(a)
+    if lag >= 0:
+        b[lag:] = a[:len(a) - lag]
+    else:
+        b[:lag] = a[-lag:]
+    sos = signal.butter(4, 12000, fs=samplerate, output='sos')
+    b = 0.6 * signal.sosfiltfilt(sos, b) + 0.01 * rng.standard_normal(len(b))
+    return b.astype(np.float32)
+
+
+def brute_force(a, b, max_lag):
+    # sum(a[n] * b[n + lag]) for every lag, straight from the definition
+    padded = np.concatenate([np.zeros(max_lag, np.float32), b, np.zeros(max_lag, np.float32)])
+    values = np.correlate(padded, a, mode='valid')[:2 * max_lag + 1]
+    return int(np.argmax(np.abs(values))) - max_lag
+
+
+def first_peak(a, b, samplerate):
+    # findOptimalAlignment from AB/static/js/main.js: first 1 ms RMS chunk above 30% of max in 100 ms
+    window = int(samplerate * 0.1)
+    chunk = int(samplerate * 0.001)
+
+    def peak(data):
+        rms = np.sqrt([np.mean(data[i:i + chunk] ** 2) for i in range(0, len(data), chunk)])
+        above = np.nonzero(rms > rms.max() * 0.3)[0]
+        return int(above[0]) if len(above) else 0
+
+    return (peak(b[:window]) - peak(a[:window])) * chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AB alignment benchmark')
+    parser.add_argument('--seconds', type=float, default=300)
+    parser.add_argument('--samplerate', type=int, default=44100)
+    parser.add_argument('--lags', type=int, nargs='+', default=[0, 441, -2205, 30017, -70001])
+    parser.add_argument('--brute-seconds', type=float, default=2.0)
+    parser.add_argument('--brute-lag-seconds', type=float, default=0.1)
+    args = parser.parse_args()
+
+    sr = args.samplerate
+    a = synthetic_track(args.seconds, sr)
+    max_lag = int(align.MAX_LAG_SECONDS * sr)
+    report = {'seconds': args.seconds, 'samplerate': sr, 'runs': []}
+
+    for lag in args.lags:
+        b = other_master(a, lag, sr)
+        result = align.find_delay(a, b, sr)
+        report['runs'].append({
+            'trueLag': lag,
+            'fftLag': result['lagSamples'],
+            'fftSeconds': result['seconds'],
+            'confidence': result['confidence'],
+            'firstPeakLag': first_peak(a, b, sr)
+        })
+
+    # Brute force on an excerpt, then scaled to the full problem
+    excerpt = int(args.brute_seconds * sr)
+    brute_lag = int(args.brute_lag_seconds * sr)
+    offset = len(a) // 2
+    b = other_master(a, 1234, sr)
+    a_part, b_part = a[offset:offset + excerpt], b[offset:offset + excerpt]
+    start = time.perf_counter()
+    brute = brute_force(a_part, b_part, brute_lag)
+    brute_seconds = time.perf_counter() - start
+    fft = align.find_delay(a_part, b_part, sr, max_lag_seconds=args.brute_lag_seconds)
+    report['bruteForce'] = {
+        'excerptSeconds': args.brute_seconds,
+        'lagRangeSeconds': args.brute_lag_seconds,
+        'bruteLag': brute,
+        'fftLag': fft['lagSamples'],
+        'bruteSeconds': round(brute_seconds, 3),
+        'fftSeconds': fft['seconds'],
+        'fullTrackEstimateSeconds': round(brute_seconds * (len(a) / excerpt) * (max_lag / brute_lag), 1)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
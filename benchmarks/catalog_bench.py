@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Size and load cost of the sharded randcamp catalog versus the flat
+# bandcamp_albums.json, for synthetic catalogs of 100k+ albums.
+#
+#   python benchmarks/catalog_bench.py --albums 100000 250000 --shard-size 1000
+#
+# "First album" is what a page load has to download and parse before it can
+# show something: the whole list before, index.json plus one shard now.
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'randcamp', 'scraper'))
+
+from build_catalog import build_catalog, read_albums
+
+
+def synthetic_albums(count, seed=0):
+    rng = random.Random(seed)
+    labels = [f'label{i}' for i in range(count // 20 + 1)]
+    tags = ['electronic', 'ambient', 'techno', 'house', 'experimental', 'drum-and-bass']
+    records = []
+    for i in range(count):
+        record = {
+            'id': str(rng.randrange(10 ** 8, 2 ** 32)),
+            'url': f'https://{rng.choice(labels)}.bandcamp.com/album/release-{i}-{rng.randrange(10 ** 6)}'
+                   '?from=discover_page'
+        }
+        if i % 3 == 0:
+            record['artist'] = f'Artist {rng.randrange(count)}'
+            record['tags'] = rng.sample(tags, 2)
+        records.append(record)
+    return records
+
+
+def sizes(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return len(data), len(gzip.compress(data, 6)), data
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Randcamp catalog size/load benchmark')
+    parser.add_argument('--albums', type=int, nargs='+', default=[100000, 250000])
+    parser.add_argument('--shard-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.albums:
+            flat_path = os.path.join(tmp, f'albums-{count}.json')
+            records = synthetic_albums(count)
+            with open(flat_path, 'w') as f:
+                json.dump([{'id': r['id'], 'url': r['url']} for r in records], f, indent=2)
+            jsonl_path = os.path.join(tmp, f'albums-{count}.jsonl')
+            with open(jsonl_path, 'w') as f:
+                f.writelines(json.dumps(r) + '\n' for r in records)
+
+            out = os.path.join(tmp, f'catalog-{count}')
+            start = time.perf_counter()
+            index = build_catalog(read_albums([flat_path, jsonl_path]), out, args.shard_size)
+            build_seconds = time.perf_counter() - start
+
+            flat_bytes, flat_gzip, flat_data = sizes(flat_path)
+            index_bytes, index_gzip, index_data = sizes(os.path.join(out, 'index.json'))
+            shard_bytes, shard_gzip, shard_data = sizes(os.path.join(out, index['shards'][0]['file']))
+            total_bytes = sum(os.path.getsize(os.path.join(out, s['file'])) for s in index['shards']) + index_bytes
+
+            flat = json.loads(flat_data)
+            current = flat[0]['id']
+            report.append({
+                'albums': count,
+                'buildSeconds': round(build_seconds, 2),
+                'flat': {
+                    'bytes': flat_bytes,
+                    'gzipBytes': flat_gzip,
+                    'parseMs': round(timed(lambda: json.loads(flat_data)) * 1000, 2),
+                    # What getRandomAlbum used to do on every click
+                    'pickMs': round(timed(lambda: random.choice([a for a in flat if a['id'] != current])) * 1000, 3)
+                },
+                'catalog': {
+                    'shards': len(index['shards']),
+                    'totalBytes': total_bytes,
+                    'indexBytes': index_bytes,
+                    'shardBytes': shard_bytes,
+                    'firstAlbumGzipBytes': index_gzip + shard_gzip,
+                    'firstAlbumParseMs': round(timed(lambda: (json.loads(index_data), json.loads(shard_data))) * 1000, 3)
+                },
+                'firstAlbumBytesSaved': f'{(1 - (index_gzip + shard_gzip) / flat_gzip) * 100:.1f}%'
+            })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
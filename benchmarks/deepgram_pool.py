@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Fires concurrent transcriptions at the local mock Deepgram endpoint and reports
+# how many upstream connections were opened versus reused.
+#
+#   python benchmarks/deepgram_pool.py --requests 200 --concurrency 16 --delay 0.2
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from deepgram_client import DeepgramClient
+from mock_deepgram import start_mock_server
+
+
+async def run(client, total, payload):
+    start = time.perf_counter()
+    results = await asyncio.gather(*[client.transcribe(payload, 'audio/wav') for _ in range(total)])
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deepgram client pooling benchmark')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=0.1, help='mock upstream latency in seconds')
+    parser.add_argument('--payload-kb', type=int, default=256)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(delay=args.delay, fail_rate=args.fail_rate)
+    client = DeepgramClient(url=f'{base_url}/v1/listen', api_key='test',
+                            max_concurrency=args.concurrency, pool_size=args.pool_size,
+                            retries=3, backoff=0.05)
+    payload = os.urandom(args.payload_kb * 1024)
+
+    elapsed, results = client.run(run(client, args.requests, payload))
+    server.shutdown()
+
+    report = {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'mockDelay': args.delay,
+        'seconds': round(elapsed, 3),
+        'requestsPerSecond': round(args.requests / elapsed, 1),
+        'serialSeconds': round(args.requests * args.delay, 3),
+        'client': client.stats(),
+        'upstream': server.counters
+    }
+    assert len(results) == args.requests
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Throughput of fingerprint.py with each hashlib candidate against the
+# byte-at-a-time 32-bit hash calculateAudioHash used in metadata.js.
+#
+#   python benchmarks/fingerprint_bench.py --size-mb 256 --large-gb 4
+#
+# The large file is sparse, so it shows what quick mode reads rather than
+# disk speed; the JS-style hash is timed on a 4 MB slice and extrapolated.
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import fingerprint
+from riff_bench import make_wav
+
+
+def js_hash(data):
+    # hashArray() from audiodata/static/js/metadata.js
+    value = 0
+    for byte in data:
+        value = ((value << 5) - value + byte) & 0xFFFFFFFF
+    return value
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def write_random_wav(path, size):
+    # 48k/24-bit stereo header around random bytes, so fingerprint sees a real data chunk
+    fmt = struct.pack('<HHIIHH', 1, 2, 48000, 288000, 6, 24)
+    size -= size % 6
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sI4s', b'RIFF', 36 + size, b'WAVE'))
+        f.write(struct.pack('<4sI', b'fmt ', len(fmt)) + fmt)
+        f.write(struct.pack('<4sI', b'data', size))
+        for start in range(0, size, 16 * 1024 * 1024):
+            f.write(os.urandom(min(16 * 1024 * 1024, size - start)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audio fingerprint throughput benchmark')
+    parser.add_argument('--size-mb', type=int, default=256, help='random WAV for full-hash throughput')
+    parser.add_argument('--large-gb', type=float, default=4.0, help='sparse WAV for quick mode (0 to skip)')
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'random.wav')
+        write_random_wav(path, args.size_mb * 1024 * 1024)
+        size_mb = os.path.getsize(path) / 1024 ** 2
+        with open(path, 'rb') as f:
+            f.seek(44)
+            sample = f.read(4 * 1024 * 1024)
+        js_seconds = timed(lambda: js_hash(sample), 1) * size_mb / 4
+        report['full'] = {
+            'fileMB': round(size_mb, 1),
+            'defaultAlgorithm': fingerprint.ALGORITHM,
+            'jsHashMBps (extrapolated)': round(size_mb / js_seconds, 2),
+            'quickMs': round(timed(lambda: fingerprint.fingerprint(path, quick=True)) * 1000, 2)
+        }
+        for algorithm in ('sha256', 'blake2b', 'blake2s', 'sha1'):
+            fingerprint.ALGORITHM = algorithm
+            report['full'][f'{algorithm}MBps'] = round(size_mb / timed(lambda: fingerprint.fingerprint(path)), 1)
+        fingerprint.ALGORITHM = report['full']['defaultAlgorithm']
+
+        if args.large_gb > 0:
+            large = os.path.join(tmp, 'large.wav')
+            make_wav(large, int(args.large_gb * 1024 ** 3), rf64=args.large_gb >= 4)
+            result = fingerprint.fingerprint(large, quick=True)
+            report['quick'] = {
+                'fileGB': round(os.path.getsize(large) / 1024 ** 3, 2),
+                'hashedMB': result['hashedBytes'] / 1024 ** 2,
+                'quickMs': round(timed(lambda: fingerprint.fingerprint(large, quick=True)) * 1000, 2)
+            }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
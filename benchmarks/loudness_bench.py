@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# Throughput of the streaming loudness engine across file lengths.
+#
+#   python benchmarks/loudness_bench.py --lengths 10 60 600 --check
+#
+# --check compares 'js' mode against results of audiodata/static/js/loudness.js
+# checked in as loudness_reference.json, covering sample rates where the gating
+# and short-term hops don't divide each other. --update-reference regenerates
+# them with node (benchmarks/loudness_reference.js).
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from loudness import analyze_file
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REFERENCE_FILE = os.path.join(BENCH_DIR, 'loudness_reference.json')
+REFERENCE_SCRIPT = os.path.join(BENCH_DIR, 'loudness_reference.js')
+REFERENCE_CASES = [
+    {'seconds': 20, 'samplerate': 48000, 'channels': 2},
+    {'seconds': 20, 'samplerate': 44100, 'channels': 2},
+    {'seconds': 20, 'samplerate': 22050, 'channels': 2},
+    {'seconds': 20, 'samplerate': 11025, 'channels': 1}
+]
+
+
+def write_test_file(path, seconds, samplerate=48000, channels=2, seed=0):
+    # Noise with a slow level envelope so gating and LRA have something to do
+    rng = np.random.default_rng(seed)
+    chunk = samplerate * 10
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(samplerate)
+        written = 0
+        total = int(seconds * samplerate)
+        while written < total:
+            n = min(chunk, total - written)
+            t = (np.arange(n) + written) / samplerate
+            envelope = 0.05 + 0.25 * (1 + np.sin(2 * np.pi * t / 17)) / 2
+            noise = rng.standard_normal((n, channels)) * envelope[:, None] * 0.5
+            tone = 0.2 * np.sin(2 * np.pi * 440 * t)[:, None]
+            data = np.clip(noise + tone, -1, 1)
+            out.writeframes((data * 32767).astype('<i2').tobytes())
+            written += n
+
+
+def reference_wav(tmp, case):
+    path = os.path.join(tmp, f'reference-{case["samplerate"]}-{case["channels"]}ch.wav')
+    write_test_file(path, case['seconds'], case['samplerate'], case['channels'])
+    return path
+
+
+def update_reference(tmp):
+    # Results of audiodata/static/js/loudness.js itself, run under node with a minimal Web Audio stub
+    results = []
+    for case in REFERENCE_CASES:
+        path = reference_wav(tmp, case)
+        output = subprocess.run(['node', REFERENCE_SCRIPT, path], check=True, capture_output=True, text=True).stdout
+        results.append(dict(case, result=json.loads(output)))
+    with open(REFERENCE_FILE, 'w') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+    return results
+
+
+def check_reference(tmp):
+    # Largest difference from the checked-in JS results, per field, across the reference cases
+    with open(REFERENCE_FILE) as f:
+        references = json.load(f)
+    differences = {}
+    for reference in references:
+        streaming = analyze_file(reference_wav(tmp, reference), 'js')
+        for key, value in reference['result'].items():
+            differences[key] = max(differences.get(key, 0.0), abs(streaming[key] - value))
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loudness engine benchmark')
+    parser.add_argument('--lengths', type=float, nargs='+', default=[10, 60, 600], help='file lengths in seconds')
+    parser.add_argument('--mode', default='js', choices=['js', 'bs1770'])
+    parser.add_argument('--check', action='store_true', help='compare against the checked-in loudness.js results')
+    parser.add_argument('--update-reference', action='store_true', help='regenerate those results with node')
+    args = parser.parse_args()
+
+    report = {'mode': args.mode, 'runs': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in args.lengths:
+            path = os.path.join(tmp, f'bench-{seconds:g}s.wav')
+            write_test_file(path, seconds)
+            start = time.perf_counter()
+            result = analyze_file(path, args.mode)
+            elapsed = time.perf_counter() - start
+            report['runs'].append({
+                'seconds': seconds,
+                'fileBytes': os.path.getsize(path),
+                'elapsed': round(elapsed, 3),
+                'realtimeFactor': round(seconds / elapsed, 1),
+                'result': result
+            })
+
+        report['peakRssMb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+        if args.update_reference:
+            update_reference(tmp)
+        if args.check:
+            report['check'] = check_reference(tmp)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
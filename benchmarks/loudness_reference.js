@@ -0,0 +1,140 @@
+// Runs audiodata/static/js/loudness.js under node and prints its results as JSON.
+//
+//   node benchmarks/loudness_reference.js test.wav
+//
+// Used by loudness_bench.py --update-reference. Only the pieces of Web Audio
+// that LoudnessAnalyzer's loudness paths touch are stubbed: AudioBuffer, and
+// an OfflineAudioContext whose IIR filters run the difference equation in
+// double precision with float32 output, as IIRFilterNode does. True peak
+// depends on the browser's resampler and biquad, so it isn't reproduced.
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+class AudioBuffer {
+    constructor({ numberOfChannels, length, sampleRate }) {
+        this.numberOfChannels = numberOfChannels;
+        this.length = length;
+        this.sampleRate = sampleRate;
+        this.channels = Array.from({ length: numberOfChannels }, () => new Float32Array(length));
+    }
+
+    getChannelData(channel) {
+        return this.channels[channel];
+    }
+
+    copyToChannel(samples, channel) {
+        this.channels[channel].set(samples);
+    }
+}
+
+class IIRFilter {
+    constructor(b, a) {
+        this.b = b.map(value => value / a[0]);
+        this.a = a.map(value => value / a[0]);
+    }
+
+    process(input) {
+        const output = new Float32Array(input.length);
+        const x = new Float64Array(this.b.length);
+        const y = new Float64Array(this.a.length);
+        for (let n = 0; n < input.length; n++) {
+            x.copyWithin(1, 0);
+            x[0] = input[n];
+            let value = 0;
+            for (let k = 0; k < this.b.length; k++) value += this.b[k] * x[k];
+            for (let k = 1; k < this.a.length; k++) value -= this.a[k] * y[k - 1];
+            y.copyWithin(1, 0);
+            y[0] = value;
+            output[n] = value;
+        }
+        return output;
+    }
+
+    connect(node) {
+        this.next = node;
+    }
+}
+
+class OfflineAudioContext {
+    constructor(channels, length, sampleRate) {
+        this.destination = { sampleRate };
+        this.length = length;
+    }
+
+    createBufferSource() {
+        // Remembered so rendering can walk the graph from it
+        this.source = {
+            connect(node) { this.next = node; },
+            start() {}
+        };
+        return this.source;
+    }
+
+    createIIRFilter(b, a) {
+        return new IIRFilter(b, a);
+    }
+
+    async startRendering() {
+        const source = this.source;
+        let samples = source.buffer.getChannelData(0);
+        for (let node = source.next; node && node !== this.destination; node = node.next) {
+            samples = node.process(samples);
+        }
+        const rendered = new AudioBuffer({ numberOfChannels: 1, length: samples.length, sampleRate: source.buffer.sampleRate });
+        rendered.copyToChannel(samples, 0);
+        return rendered;
+    }
+}
+
+function readWav(file) {
+    // 16-bit PCM only, scaled the way decodeAudioData does
+    const data = fs.readFileSync(file);
+    let offset = 12;
+    let format = null;
+    while (offset + 8 <= data.length) {
+        const id = data.toString('ascii', offset, offset + 4);
+        const size = data.readUInt32LE(offset + 4);
+        if (id === 'fmt ') {
+            format = {
+                channels: data.readUInt16LE(offset + 10),
+                sampleRate: data.readUInt32LE(offset + 12),
+                bits: data.readUInt16LE(offset + 22)
+            };
+        } else if (id === 'data') {
+            if (!format || format.bits !== 16) throw new Error('Expected 16-bit PCM WAV');
+            const frames = Math.floor(size / (2 * format.channels));
+            const buffer = new AudioBuffer({ numberOfChannels: format.channels, length: frames, sampleRate: format.sampleRate });
+            for (let i = 0; i < frames; i++) {
+                for (let c = 0; c < format.channels; c++) {
+                    buffer.channels[c][i] = data.readInt16LE(offset + 8 + 2 * (i * format.channels + c)) / 32768;
+                }
+            }
+            return buffer;
+        }
+        offset += 8 + size + (size & 1);
+    }
+    throw new Error('No data chunk');
+}
+
+async function main() {
+    const sandbox = { window: {}, console: { log() {}, error: console.error }, AudioBuffer, OfflineAudioContext, Math };
+    const source = fs.readFileSync(path.join(__dirname, '..', 'audiodata', 'static', 'js', 'loudness.js'), 'utf8');
+    vm.runInNewContext(source, sandbox);
+    const analyzer = new sandbox.window.LoudnessAnalyzer();
+
+    const buffer = readWav(process.argv[2]);
+    const shortTermValues = await analyzer.calculateShortTermLoudness(buffer);
+    const gatedShortTerm = shortTermValues.filter(value => value >= -40);
+    console.log(JSON.stringify({
+        integratedLoudness: await analyzer.calculateIntegratedLoudness(buffer),
+        shortTermMax: Math.max(...gatedShortTerm),
+        loudnessRange: analyzer.calculateLoudnessRange(shortTermValues),
+        samplePeak: analyzer.calculateSamplePeak(buffer)
+    }));
+}
+
+main().catch(error => {
+    console.error(error);
+    process.exit(1);
+});
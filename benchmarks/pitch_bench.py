@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Batched YIN in pitch.py versus the tuner's frame-at-a-time algorithm.
+#
+#   python benchmarks/pitch_bench.py --seconds 120
+#
+# The reference ports PitchDetector.detectPitch with numpy doing each lag's
+# inner sum, one frame per call, the way the JS walks frames. It runs on a
+# slice of frames and is extrapolated. Test material is a harmonic tone that
+# steps through notes with small, known detunings.
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pitch
+
+DETUNE_CENTS = [0, 7, -12, 3]
+FREQUENCIES = [82.41, 110.0, 146.83, 196.0, 246.94, 329.63, 440.0]
+
+
+def synthetic_take(seconds, samplerate):
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    note = (t // 2).astype(int)
+    base = np.array(FREQUENCIES)[note % len(FREQUENCIES)]
+    frequency = base * 2 ** (np.array(DETUNE_CENTS)[note % len(DETUNE_CENTS)] / 1200)
+    phase = 2 * np.pi * np.cumsum(frequency) / samplerate
+    decay = np.exp(-(t % 2) * 1.5)
+    return (sum(np.sin(k * phase) / k for k in range(1, 7)) * 0.3 * decay).astype(np.float32)
+
+
+def detect_pitch_reference(frame, samplerate, settings):
+    # One detectPitch() call: window, difference, CMND, absolute threshold
+    window = 0.5 * (1 - np.cos(2 * np.pi * np.arange(len(frame)) / (len(frame) - 1)))
+    buffer = frame * window
+    half = len(frame) // 2
+    yin = np.empty(half)
+    for tau in range(half):
+        delta = buffer[:half] - buffer[tau:tau + half]
+        yin[tau] = np.dot(delta, delta)
+    yin[0] = 1
+    running = np.cumsum(yin[1:])
+    yin[1:] *= np.arange(1, half) / np.where(running > 0, running, 1)
+    start, end = int(samplerate / settings['max']), min(int(np.ceil(samplerate / settings['min'])), half)
+    candidates = yin[start:end]
+    if not (candidates < settings['clarityThreshold']).any():
+        return None
+    tau = start + int(np.argmin(np.where(candidates < settings['clarityThreshold'], candidates, np.inf)))
+    return samplerate / tau
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pitch tracking benchmark')
+    parser.add_argument('--seconds', type=float, default=120)
+    parser.add_argument('--samplerate', type=int, default=44100)
+    parser.add_argument('--reference-frames', type=int, default=200)
+    args = parser.parse_args()
+
+    sr = args.samplerate
+    audio = synthetic_take(args.seconds, sr)
+    report = {'seconds': args.seconds, 'samplerate': sr}
+
+    for mode in pitch.MODES:
+        start = time.perf_counter()
+        tracker = pitch.PitchTracker(sr, mode)
+        for offset in range(0, len(audio), 65536):
+            tracker.process(audio[offset:offset + 65536])
+        result = tracker.result(include_track=False)
+        elapsed = time.perf_counter() - start
+        report[mode] = {
+            'seconds': round(elapsed, 3),
+            'realtimeFactor': round(args.seconds / elapsed, 1),
+            'voicedFrames': result['voicedFrames'],
+            'frames': result['frames'],
+            'centsStd': result['centsStd']
+        }
+
+    frames = [audio[i:i + pitch.FRAME_SIZE] for i in range(0, args.reference_frames * pitch.HOP, pitch.HOP)]
+    start = time.perf_counter()
+    for frame in frames:
+        detect_pitch_reference(frame.astype(np.float64), sr, pitch.RANGES['normal'])
+    per_frame = (time.perf_counter() - start) / len(frames)
+    total_frames = report['js']['frames']
+    report['frameAtATime'] = {
+        'msPerFrame': round(per_frame * 1000, 3),
+        'estimatedSeconds': round(per_frame * total_frames, 1),
+        'realtimeFactor': round(args.seconds / (per_frame * total_frames), 2)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
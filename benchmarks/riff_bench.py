@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# Chunk walk and metadata rewrite cost of riff.py on multi-GB WAVs.
+#
+#   python benchmarks/riff_bench.py --size-gb 2.5 --rf64-size-gb 5
+#   python benchmarks/riff_bench.py --naive   # also time a full-file copy
+#
+# Files are sparse (the data chunk is a hole), so this needs no real disk
+# space unless --naive is given. The numbers that matter are how little of
+# the file is touched: time and peak RSS should not grow with file size.
+import argparse
+import json
+import os
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import riff
+
+SAMPLERATE = 48000
+CHANNELS = 2
+BITS = 24
+
+
+def make_wav(path, data_size, rf64=False):
+    block_align = CHANNELS * BITS // 8
+    data_size -= data_size % block_align
+    fmt = struct.pack('<HHIIHH', 1, CHANNELS, SAMPLERATE, SAMPLERATE * block_align, block_align, BITS)
+    info = riff.build_info([(b'INAM', b'Benchmark'), (b'IART', b'loum')])
+    with open(path, 'wb') as f:
+        if rf64:
+            f.write(struct.pack('<4sI4s', b'RF64', riff.SIZE_PLACEHOLDER, b'WAVE'))
+            ds64 = riff.DS64.pack(0, data_size, data_size // block_align, 0)
+            f.write(struct.pack('<4sI', b'ds64', len(ds64)) + ds64)
+        else:
+            f.write(struct.pack('<4sI4s', b'RIFF', 0, b'WAVE'))
+        f.write(struct.pack('<4sI', b'fmt ', len(fmt)) + fmt)
+        f.write(struct.pack('<4sI', b'data', riff.SIZE_PLACEHOLDER if rf64 else data_size))
+        data_offset = f.tell()
+        f.seek(data_offset + data_size)  # Leave the samples as a hole
+        f.write(struct.pack('<4sI', b'LIST', len(info)) + info)
+        end = f.tell()
+        if rf64:
+            f.seek(20)
+            f.write(struct.pack('<Q', end - 8))
+        else:
+            f.seek(4)
+            f.write(struct.pack('<I', end - 8))
+    return end
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - start) * 1000, 3)
+
+
+def parse(path):
+    with riff.RiffFile(path) as wav:
+        return wav.summary()
+
+
+def bench_file(path, naive):
+    result = {'fileBytes': os.path.getsize(path)}
+    summary, result['parseMs'] = timed(lambda: parse(path))
+    data_chunk = next(c for c in summary['chunks'] if c['id'] == 'data')
+    result['dataBytes'] = data_chunk['size']
+
+    # Shorter value: fits in the existing LIST chunk
+    report, result['inPlaceMs'] = timed(lambda: riff.update_metadata(path, info={'Title': 'Short'}))
+    result['inPlace'] = report['written']
+    # Longer values and a new bext chunk: the LIST is last so it grows, bext is appended
+    long_info = {'Title': 'A considerably longer title ' * 4, 'Comments': 'x' * 500}
+    report, result['growMs'] = timed(lambda: riff.update_metadata(path, info=long_info,
+                                                                 bext={'description': 'bench', 'originator': 'loum'}))
+    result['grow'] = report['written']
+    # The LIST is no longer last, so growing it again retires the old chunk
+    report, result['moveMs'] = timed(lambda: riff.update_metadata(path, info={'Comments': 'y' * 2000}))
+    result['move'] = report['written']
+    result['verify'] = report['verify']
+    result['dataUntouched'] = next(c for c in report['chunks'] if c['id'] == 'data') == data_chunk
+
+    if naive:
+        # Lower bound for the old approach: any rewrite that copies the whole file
+        copy_path = f'{path}.copy'
+        _, result['fullCopyMs'] = timed(lambda: shutil.copyfile(path, copy_path))
+        os.remove(copy_path)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RIFF/RF64 metadata read/write benchmark')
+    parser.add_argument('--size-gb', type=float, default=2.5, help='RIFF file size (must stay under 4 GiB)')
+    parser.add_argument('--rf64-size-gb', type=float, default=5.0, help='RF64 file size (0 to skip)')
+    parser.add_argument('--dir', help='directory for the test files (default: a temp dir)')
+    parser.add_argument('--naive', action='store_true', help='also time a full-file copy (writes real bytes)')
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        cases = [('riff', args.size_gb, False), ('rf64', args.rf64_size_gb, True)]
+        for name, size_gb, rf64 in cases:
+            if size_gb <= 0:
+                continue
+            path = os.path.join(tmp, f'{name}.wav')
+            make_wav(path, int(size_gb * 1024 ** 3), rf64)
+            report[name] = bench_file(path, args.naive)
+            os.remove(path)
+
+    report['peakRssMB'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
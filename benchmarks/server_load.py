@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# Mixed-workload load test for server.py and mixer/refresh.py against local
+# stand-ins: mock_deepgram answers /api/transcribe's upstream calls and
+# mock_file_host serves the tracks behind the mixer's /proxy/ route.
+#
+#   python benchmarks/server_load.py --requests 2000 --concurrency 32 \
+#       --mix static=4,transcribe=1,temp=2,proxy=3 --upload-kb 64 512 4096 --output load.json
+#
+# Operations:
+#   static      GET a site asset (Accept-Encoding: gzip)
+#   transcribe  POST a multipart WAV upload of one of --upload-kb sizes; each
+#               upload is distinct so the transcription cache misses (unless
+#               --repeat-uploads)
+#   temp        GET /temp/audio/<id> of an earlier upload
+#   proxy       GET a track through the mixer's /proxy/; --proxy-cold of them
+#               carry a unique query string and miss the proxy cache
+#
+# Each server runs as a subprocess with its stores in a temporary directory,
+# so its peak RSS (VmHWM) is read from /proc and runs start cold. --seed fixes
+# the operation sequence. Output is one JSON document: per-operation
+# throughput, latency percentiles, errors and bytes, each server's peak RSS
+# and the mocks' counters.
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from mock_deepgram import start_mock_server
+from mock_file_host import start_file_host
+
+OPERATIONS = ('static', 'transcribe', 'temp', 'proxy')
+STATIC_PATHS = [
+    '/index.html',
+    '/main.js',
+    '/favicon.ico',
+    '/meter/index.html',
+    '/meter/static/js/main.js',
+    '/meter/static/js/spectrogram.js',
+    '/meter/static/js/vuMeter.js',
+    '/mixer/index.html'
+]
+SAMPLE_RATE = 44100
+
+
+def parse_mix(text):
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'unknown operation {name!r} (choose from {", ".join(OPERATIONS)})')
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError('the mix needs at least one operation with a positive weight')
+    return weights
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def wav_payload(size, seed):
+    # 16-bit stereo PCM of noise, ``size`` bytes including the header
+    data = random.Random(seed).randbytes(max(size - 44, 4) // 4 * 4)
+    header = b'RIFF' + struct.pack('<I', 36 + len(data)) + b'WAVEfmt ' + struct.pack(
+        '<IHHIIHH', 16, 1, 2, SAMPLE_RATE, SAMPLE_RATE * 4, 4, 16) + b'data' + struct.pack('<I', len(data))
+    return header + data
+
+
+def multipart(payload, sequence, unique):
+    # One 'audio' part; the first sample frame carries ``sequence`` so uploads hash differently
+    boundary = f'loadtest{sequence:012d}'
+    if unique:
+        payload = payload[:44] + struct.pack('<I', sequence) + payload[48:]
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="load{sequence}.wav"\r\n'
+            f'Content-Type: audio/wav\r\n\r\n').encode()
+    return head + payload + f'\r\n--{boundary}--\r\n'.encode(), f'multipart/form-data; boundary={boundary}'
+
+
+class ServerProcess:
+    """A repo server started as a subprocess on a free port; output goes to ``log_path``."""
+
+    def __init__(self, name, argv, env, log_path):
+        self.name = name
+        self.port = free_port()
+        self.url = f'http://localhost:{self.port}'
+        self.log_path = log_path
+        self._log = open(log_path, 'wb')
+        self.process = subprocess.Popen([sys.executable] + argv + ['--port', str(self.port)], cwd=ROOT,
+                                        env=dict(os.environ, **env), stdout=self._log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, path, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                requests.get(self.url + path, timeout=1)
+                return
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        raise RuntimeError(f'{self.name} server did not start; see {self.log_path}')
+
+    def memory(self):
+        # Current and peak resident set size in bytes, from /proc (None elsewhere)
+        values = {'rssBytes': None, 'peakRssBytes': None}
+        try:
+            with open(f'/proc/{self.process.pid}/status') as f:
+                for line in f:
+                    field, _, value = line.partition(':')
+                    if field in ('VmRSS', 'VmHWM'):
+                        values['rssBytes' if field == 'VmRSS' else 'peakRssBytes'] = int(value.split()[0]) * 1024
+        except OSError:
+            pass
+        return values
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+
+
+class LoadRunner:
+    def __init__(self, args, site_url, mixer_url, file_host_url):
+        self.args = args
+        self.site_url = site_url
+        self.mixer_url = mixer_url
+        self.file_host_url = file_host_url
+        self.payloads = {kb: wav_payload(kb * 1024, kb) for kb in args.upload_kb}
+        self.audio_urls = []
+        self.audio_lock = threading.Lock()
+        self.local = threading.local()
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def plan(self, count, seed):
+        # The operation sequence: (sequence, operation, parameter) drawn from the mix
+        rng = random.Random(seed)
+        names = [name for name, weight in self.args.mix.items() if weight > 0]
+        weights = [self.args.mix[name] for name in names]
+        steps = []
+        for sequence in range(count):
+            operation = rng.choices(names, weights)[0]
+            if operation == 'static':
+                parameter = rng.choice(STATIC_PATHS)
+            elif operation == 'transcribe':
+                parameter = rng.choice(self.args.upload_kb)
+            elif operation == 'temp':
+                parameter = rng.random()
+            else:
+                track = rng.randrange(self.args.proxy_files)
+                cold = rng.random() < self.args.proxy_cold
+                parameter = f'{self.file_host_url}/track{track}.mp3' + (f'?n={seed}-{sequence}' if cold else '')
+            steps.append((sequence, operation, parameter))
+        return steps
+
+    def request(self, sequence, operation, parameter):
+        session = self.session()
+        if operation == 'static':
+            response = session.get(self.site_url + parameter, headers={'Accept-Encoding': 'gzip'}, stream=True)
+        elif operation == 'transcribe':
+            body, content_type = multipart(self.payloads[parameter], sequence, not self.args.repeat_uploads)
+            response = session.post(self.site_url + '/api/transcribe', data=body,
+                                    headers={'Content-Type': content_type}, stream=True)
+        elif operation == 'temp':
+            with self.audio_lock:
+                url = self.audio_urls[int(parameter * len(self.audio_urls))]
+            response = session.get(self.site_url + url, stream=True)
+        else:
+            response = session.get(f'{self.mixer_url}/proxy/{urllib.parse.quote(parameter, safe="")}', stream=True)
+
+        received = 0
+        chunks = []
+        for chunk in response.raw.stream(64 * 1024, decode_content=False):  # Bytes as sent
+            received += len(chunk)
+            if operation == 'transcribe':
+                chunks.append(chunk)
+        if operation == 'transcribe' and response.status_code == 200:
+            audio_url = json.loads(b''.join(chunks)).get('audioUrl')
+            if audio_url:
+                with self.audio_lock:
+                    self.audio_urls.append(audio_url)
+        return response.status_code, received
+
+    def timed(self, step):
+        sequence, operation, parameter = step
+        start = time.perf_counter()
+        try:
+            status, received = self.request(sequence, operation, parameter)
+            error = status >= 400
+        except requests.RequestException:
+            status, received, error = None, 0, True
+        return operation, time.perf_counter() - start, status, received, error
+
+    def seed_uploads(self):
+        # One upload per size so temp fetches have something to fetch from the start
+        for i, kb in enumerate(self.args.upload_kb):
+            status, _ = self.request(self.args.requests + i, 'transcribe', kb)
+            if status != 200:
+                raise RuntimeError(f'Seed upload of {kb} KB failed with status {status}')
+
+    def run(self):
+        if self.args.mix.get('temp') or self.args.mix.get('transcribe'):
+            self.seed_uploads()
+        steps = self.plan(self.args.requests, self.args.seed)
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(self.args.concurrency) as pool:
+            results = list(pool.map(self.timed, steps))
+        return results, time.perf_counter() - start
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(results, elapsed):
+    operations = {}
+    for operation in OPERATIONS:
+        rows = [row for row in results if row[0] == operation]
+        if not rows:
+            continue
+        latencies = sorted(seconds for _, seconds, _, _, _ in rows)
+        statuses = {}
+        for _, _, status, _, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        operations[operation] = {
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if row[4]),
+            'statuses': statuses,
+            'throughput': round(len(rows) / elapsed, 2),
+            'bytes': sum(row[3] for row in rows),
+            'meanMs': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50Ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95Ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99Ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'maxMs': round(latencies[-1] * 1000, 2)
+        }
+    latencies = sorted(row[1] for row in results)
+    return {
+        'requests': len(results),
+        'errors': sum(1 for row in results if row[4]),
+        'seconds': round(elapsed, 3),
+        'throughput': round(len(results) / elapsed, 2),
+        'p50Ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95Ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99Ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'operations': operations
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test server.py and mixer/refresh.py against local mocks')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('static=4,transcribe=1,temp=2,proxy=3'),
+                        help='operation weights, e.g. static=4,transcribe=1,temp=2,proxy=3')
+    parser.add_argument('--upload-kb', type=int, nargs='+', default=[64, 512, 4096])
+    parser.add_argument('--repeat-uploads', action='store_true',
+                        help='send identical bytes per upload size (transcription cache hits)')
+    parser.add_argument('--proxy-files', type=int, default=8)
+    parser.add_argument('--proxy-size-kb', type=int, default=4096)
+    parser.add_argument('--proxy-cold', type=float, default=0.2, help='fraction of proxy requests that miss the cache')
+    parser.add_argument('--deepgram-delay', type=float, default=0.2, help='mock Deepgram response time')
+    parser.add_argument('--host-delay', type=float, default=0.0, help='mock file host time to first byte')
+    parser.add_argument('--workers', type=int, default=8, help='worker threads per server')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    mock_deepgram, deepgram_url = start_mock_server(delay=args.deepgram_delay)
+    file_host, file_host_url = start_file_host(files=args.proxy_files, size_kb=args.proxy_size_kb,
+                                               delay=args.host_delay)
+    servers = {}
+    with tempfile.TemporaryDirectory(prefix='loum-load-') as tmp:
+        try:
+            if any(args.mix.get(name) for name in ('static', 'transcribe', 'temp')):
+                servers['site'] = ServerProcess('site', ['server.py', '--workers', str(args.workers)], {
+                    'DEEPGRAM_URL': f'{deepgram_url}/v1/listen',
+                    'DEEPGRAM_API_KEY': 'load-test',
+                    'AUDIO_STORE_DIR': os.path.join(tmp, 'audio'),
+                    'STATIC_CACHE_DIR': os.path.join(tmp, 'static'),
+                    'TRANSCRIPTION_CACHE_DIR': ''
+                }, os.path.join(tmp, 'site.log'))
+            if args.mix.get('proxy'):
+                servers['mixer'] = ServerProcess('mixer', [
+                    os.path.join('mixer', 'refresh.py'), '--no-browser', '--workers', str(args.workers)
+                ], {
+                    'MIXER_PROXY_CACHE_DIR': os.path.join(tmp, 'proxy'),
+                    'STATIC_CACHE_DIR': os.path.join(tmp, 'static')
+                }, os.path.join(tmp, 'mixer.log'))
+            for name, server in servers.items():
+                server.wait_ready('/api/status' if name == 'site' else '/api/collections')
+            baseline = {name: server.memory() for name, server in servers.items()}
+
+            runner = LoadRunner(args, servers['site'].url if 'site' in servers else None,
+                                servers['mixer'].url if 'mixer' in servers else None, file_host_url)
+            results, elapsed = runner.run()
+
+            report = summarize(results, elapsed)
+            report['config'] = {key: value for key, value in vars(args).items() if key != 'output'}
+            report['servers'] = {
+                name: dict(server.memory(), startRssBytes=baseline[name]['rssBytes'])
+                for name, server in servers.items()
+            }
+            with mock_deepgram.lock:
+                report['mockDeepgram'] = dict(mock_deepgram.counters)
+            with file_host.lock:
+                report['fileHost'] = dict(file_host.counters)
+        finally:
+            for server in servers.values():
+                server.stop()
+            mock_deepgram.shutdown()
+            file_host.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
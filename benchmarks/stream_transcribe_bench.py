@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# Time to first text and stitching accuracy of segmented transcription versus
+# one request for the whole file, against the mock Deepgram endpoint in
+# --words mode (one word per tone burst, named by its frequency).
+#
+#   python benchmarks/stream_transcribe_bench.py --minutes 60 --realtime-factor 0.01 --concurrency 4
+#
+# The test recording is "speech" made of tone bursts with short gaps between
+# words and longer pauses between sentences, so the expected transcript is
+# known exactly. --realtime-factor models upstream processing time per second
+# of audio.
+import argparse
+import contextlib
+import difflib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from deepgram_client import DeepgramClient
+from mock_deepgram import start_mock_server
+from stream_transcribe import SegmentedTranscriber
+
+
+def synthetic_speech(seconds, samplerate, seed=0):
+    # (samples, expected words)
+    rng = np.random.default_rng(seed)
+    audio = (rng.standard_normal(int(seconds * samplerate)) * 0.001).astype(np.float32)
+    words = []
+    t = 0.5
+    until_pause = rng.integers(5, 13)
+    while True:
+        duration = rng.uniform(0.15, 0.45)
+        if t + duration > seconds - 0.5:
+            break
+        frequency = 200 + 20 * int(rng.integers(0, 150))
+        start, length = int(t * samplerate), int(duration * samplerate)
+        fade = np.minimum(1, np.minimum(np.arange(length), np.arange(length)[::-1]) / (0.005 * samplerate))
+        audio[start:start + length] += 0.3 * fade * np.sin(2 * np.pi * frequency * np.arange(length) / samplerate)
+        words.append(str(frequency))
+        until_pause -= 1
+        if until_pause == 0:
+            t += duration + rng.uniform(0.6, 1.2)
+            until_pause = rng.integers(5, 13)
+        else:
+            t += duration + rng.uniform(0.08, 0.25)
+    return audio, words
+
+
+def accuracy(expected, words):
+    matcher = difflib.SequenceMatcher(a=expected, b=words, autojunk=False)
+    return {
+        'words': len(words),
+        'expectedWords': len(expected),
+        'matched': sum(block.size for block in matcher.get_matching_blocks()),
+        'exact': words == expected
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Segmented versus whole-file transcription benchmark')
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--samplerate', type=int, default=16000)
+    parser.add_argument('--segment-seconds', type=float, default=30)
+    parser.add_argument('--overlap-seconds', type=float, default=1)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--delay', type=float, default=0.2, help='mock per-request latency')
+    parser.add_argument('--realtime-factor', type=float, default=0.01, help='mock seconds per second of audio')
+    args = parser.parse_args()
+
+    server, url = start_mock_server(delay=args.delay, words=True, realtime_factor=args.realtime_factor)
+    client = DeepgramClient(url=f'{url}/v1/listen', api_key='test', read_timeout=3600)
+    audio, expected = synthetic_speech(args.minutes * 60, args.samplerate)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'speech.wav')
+        soundfile.write(path, audio, args.samplerate, subtype='PCM_16')
+
+        start = time.perf_counter()
+        whole = client.transcribe_sync(path, 'audio/wav')
+        whole_seconds = time.perf_counter() - start
+
+        transcriber = SegmentedTranscriber(args.segment_seconds, args.overlap_seconds, concurrency=args.concurrency)
+        partials = 0
+        with contextlib.closing(transcriber.events(path, client)) as events:
+            for event, data in events:
+                partials += event == 'partial'
+                if event == 'done':
+                    done = data
+
+    report = {
+        'audioSeconds': round(len(audio) / args.samplerate, 1),
+        'wholeFile': dict(accuracy(expected, whole['text'].split()), seconds=round(whole_seconds, 3)),
+        'segmented': dict(accuracy(expected, done['text'].split()),
+                          firstPartialSeconds=done['firstPartialSeconds'], seconds=done['seconds'],
+                          segments=done['segments'], failedSegments=done['failedSegments'], partials=partials),
+        'upstreamRequests': server.counters['requests'],
+        'maxInFlight': server.counters['maxInFlight']
+    }
+    print(json.dumps(report, indent=2))
+    client.loop_thread.stop()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
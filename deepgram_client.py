@@ -0,0 +1,122 @@
+import os
+import json
+import threading
+import time
+import urllib.parse
+import logging
+
+import metrics
+from upstream_client import AsyncHTTPClient, LoopThread, UpstreamError
+
+logger = logging.getLogger(__name__)
+
+DEEPGRAM_URL = 'https://api.deepgram.com/v1/listen'
+DEFAULT_PARAMS = {
+    'smart_format': 'true',
+    'model': 'general',
+    'language': 'en-US'
+}
+
+
+class DeepgramClient:
+    """Shared, pooled client for the Deepgram /v1/listen endpoint.
+
+    All requests run on one background event loop, so any number of handler
+    threads can have transcriptions in flight over a small set of kept-alive
+    connections.
+    """
+
+    def __init__(self, url=None, api_key=None, params=None, **http_options):
+        self.url = url or os.getenv('DEEPGRAM_URL', DEEPGRAM_URL)
+        self.api_key = api_key
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.http = AsyncHTTPClient(**http_options)
+        self._loop_thread = None
+        self._lock = threading.Lock()
+
+    def listen_url(self, params=None):
+        query = dict(self.params, **(params or {}))
+        return f'{self.url}?{urllib.parse.urlencode(query)}'
+
+    async def transcribe(self, audio, content_type, params=None, words=False):
+        # audio is either a file path (streamed from disk) or raw bytes; words=True adds word timings
+        api_key = self.api_key or os.getenv('DEEPGRAM_API_KEY')
+        if not api_key:
+            raise ValueError('Deepgram API key not found in environment')
+
+        headers = {
+            'Authorization': f'Token {api_key}',
+            'Content-Type': content_type,
+            'Accept': 'application/json'
+        }
+        start = time.perf_counter()
+        try:
+            if isinstance(audio, (bytes, bytearray, memoryview)):
+                response = await self.http.request('POST', self.listen_url(params), headers, body=audio)
+            else:
+                response = await self.http.request('POST', self.listen_url(params), headers, body_path=audio)
+        except Exception:
+            metrics.observe_upstream('deepgram', 'error', time.perf_counter() - start)
+            raise
+        metrics.observe_upstream('deepgram', response.status, time.perf_counter() - start, len(response.body))
+
+        if response.status != 200:
+            logger.error(f'Deepgram returned {response.status}: {response.body[:200]!r}')
+            raise UpstreamError(response.status, response.body)
+
+        response_data = json.loads(response.body.decode())
+        if 'results' in response_data and 'channels' in response_data['results']:
+            transcript = response_data['results']['channels'][0]['alternatives'][0]
+            result = {
+                'text': transcript['transcript'],
+                'confidence': transcript['confidence']
+            }
+            if words:
+                result['words'] = [{
+                    'word': word.get('punctuated_word') or word['word'],
+                    'start': word['start'],
+                    'end': word['end'],
+                    'confidence': word.get('confidence')
+                } for word in transcript.get('words') or []]
+            return result
+        raise ValueError('Unexpected response format from Deepgram')
+
+    @property
+    def loop_thread(self):
+        with self._lock:
+            if self._loop_thread is None:
+                self._loop_thread = LoopThread('deepgram-client')
+            return self._loop_thread
+
+    def run(self, coro, timeout=None):
+        # Run a coroutine on the shared loop from a synchronous caller
+        return self.loop_thread.run(coro, timeout)
+
+    def submit(self, coro):
+        # Schedule a coroutine on the shared loop; returns a concurrent.futures.Future
+        return self.loop_thread.submit(coro)
+
+    def transcribe_sync(self, audio, content_type, params=None):
+        return self.run(self.transcribe(audio, content_type, params))
+
+    def stats(self):
+        return self.http.stats()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DeepgramClient(
+                pool_size=int(os.getenv('DEEPGRAM_POOL_SIZE', 8)),
+                max_concurrency=int(os.getenv('DEEPGRAM_MAX_CONCURRENCY', 16)),
+                connect_timeout=float(os.getenv('DEEPGRAM_CONNECT_TIMEOUT', 10)),
+                read_timeout=float(os.getenv('DEEPGRAM_READ_TIMEOUT', 300)),
+                retries=int(os.getenv('DEEPGRAM_RETRIES', 2)),
+                backoff=float(os.getenv('DEEPGRAM_BACKOFF', 0.5))
+            )
+        return _client
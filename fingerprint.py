@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Content fingerprints for audio files: a key that stays the same when only
+# tags change, shared by the transcription cache, batch_analyze and the API.
+#
+#   python fingerprint.py track.wav other.flac
+#   python fingerprint.py --quick /stems/*.wav
+#
+# The key covers the format description (WAV fmt chunk, FLAC STREAMINFO) and
+# the encoded audio payload, never ID3/INFO/bext/Vorbis comment blocks. Full
+# mode hashes every payload byte straight out of an mmap. Quick
+# mode hashes the payload length plus evenly spaced blocks, which is enough
+# to tell masters apart and reads a few MB regardless of file size.
+#
+# The hash is SHA-256 by default: with SHA extensions (current x86 and ARM
+# servers) it runs 2-3x faster than hashlib's BLAKE2b, which has no SIMD path.
+# FINGERPRINT_ALGORITHM=blake2b switches; the algorithm is part of the key.
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import riff
+
+ALGORITHM = os.getenv('FINGERPRINT_ALGORITHM', 'sha256')
+CHUNK_SIZE = 8 * 1024 * 1024
+QUICK_BLOCK = 256 * 1024
+QUICK_SAMPLES = 16
+
+
+def audio_payload(path):
+    # (container, format description bytes, payload offset, payload size)
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        magic = f.read(10)
+        if magic[:4] in (b'RIFF', b'RF64') and magic[8:10] == b'WA':
+            with riff.RiffFile(path) as wav:
+                fmt = wav.find(b'fmt ')
+                data = wav.find(b'data')
+                if fmt is None or data is None:
+                    raise riff.RiffError('WAV file without fmt/data chunks')
+                return 'wav', wav.read(fmt), data.data_offset, min(data.size, size - data.data_offset)
+        if magic[:4] == b'fLaC':
+            f.seek(4)
+            description = b''
+            while True:
+                header = f.read(4)
+                if len(header) < 4:
+                    raise ValueError('FLAC metadata runs past the end of the file')
+                length = int.from_bytes(header[1:4], 'big')
+                if header[0] & 0x7F == 0:
+                    description = f.read(length)
+                else:
+                    f.seek(length, 1)
+                if header[0] & 0x80:
+                    break
+            return 'flac', description, f.tell(), size - f.tell()
+        start = 0
+        if magic[:3] == b'ID3' and len(magic) == 10:
+            # Tag size is syncsafe, plus a 10-byte footer when flagged
+            start = 10 + ((magic[6] << 21) | (magic[7] << 14) | (magic[8] << 7) | magic[9])
+            if magic[5] & 0x10:
+                start += 10
+        end = size
+        if size >= 128:
+            f.seek(size - 128)
+            if f.read(3) == b'TAG':
+                end = size - 128  # ID3v1 trailer
+        container = 'mp3' if start or end < size or path.lower().endswith('.mp3') else 'file'
+        return container, b'', min(start, size), max(end - start, 0)
+
+
+def _sample_offsets(size):
+    # First and last block plus evenly spaced ones in between
+    last = size - QUICK_BLOCK
+    return [round(last * i / (QUICK_SAMPLES - 1)) for i in range(QUICK_SAMPLES)]
+
+
+def fingerprint(path, quick=False):
+    """Fingerprint the audio in ``path``; returns a dict whose ``key`` is the content key.
+
+    Quick mode only differs from full mode for payloads larger than
+    QUICK_SAMPLES * QUICK_BLOCK; smaller files get the full key either way.
+    """
+    start = time.perf_counter()
+    container, description, offset, size = audio_payload(path)
+    quick = quick and size > QUICK_SAMPLES * QUICK_BLOCK
+    mode = 'quick' if quick else 'full'
+    digest = hashlib.new(ALGORITHM)
+    digest.update(mode.encode() + struct.pack('<Q', len(description)) + description + struct.pack('<Q', size))
+    hashed = 0
+    if size:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                if quick:
+                    for position in _sample_offsets(size):
+                        digest.update(view[offset + position:offset + position + QUICK_BLOCK])
+                    hashed = QUICK_SAMPLES * QUICK_BLOCK
+                else:
+                    for position in range(offset, offset + size, CHUNK_SIZE):
+                        digest.update(view[position:min(position + CHUNK_SIZE, offset + size)])
+                    hashed = size
+            finally:
+                view.release()
+    return {
+        'key': f'{ALGORITHM}-{mode}:{digest.hexdigest()}',
+        'mode': mode,
+        'container': container,
+        'payloadOffset': offset,
+        'payloadBytes': size,
+        'hashedBytes': hashed,
+        'seconds': round(time.perf_counter() - start, 4)
+    }
+
+
+def content_key(path, quick=False):
+    return fingerprint(path, quick)['key']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print audio content fingerprints')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--quick', action='store_true', help='sample large payloads instead of reading them fully')
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.paths:
+        try:
+            print(json.dumps(dict(fingerprint(path, args.quick), path=path)))
+        except (OSError, ValueError) as e:
+            print(f'{path}: {e}', file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
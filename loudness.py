@@ -0,0 +1,251 @@
+import math
+
+import numpy as np
+from scipy import signal
+
+from audio_io import open_audio, BLOCK_FRAMES
+
+# Constants for ITU-R BS.1770-4, as used by audiodata/static/js/loudness.js
+PRE_FILTER_B = [1.53512485958697, -2.69169618940638, 1.19839281085285]
+PRE_FILTER_A = [1, -1.69065929318241, 0.73248077421585]
+HIGH_SHELF_B = [1.0, -2.0, 1.0]
+HIGH_SHELF_A = [1.0, -1.99004745483398, 0.99007225036621]
+
+# 'js' reproduces LoudnessAnalyzer's numbers (fixed 48 kHz coefficients, no
+# -0.691 offset, gating averaged in the dB domain, 0.75 s short-term hop).
+# 'bs1770' follows BS.1770-4 / EBU Tech 3342 to the letter.
+MODES = ('js', 'bs1770')
+
+
+def k_weighting_sos(samplerate, mode='js'):
+    if mode == 'js':
+        return np.array([PRE_FILTER_B + PRE_FILTER_A, HIGH_SHELF_B + HIGH_SHELF_A])
+
+    # Coefficients recomputed for the actual sample rate (same derivation as libebur128)
+    f0 = 1681.974450955533
+    gain = 3.999843853973347
+    q = 0.7071752369554196
+    k = math.tan(math.pi * f0 / samplerate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    f0 = 38.13547087602444
+    q = 0.5003270373238773
+    k = math.tan(math.pi * f0 / samplerate)
+    a0 = 1 + k / q + k * k
+    highpass_b = [1.0, -2.0, 1.0]
+    highpass_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf_b + shelf_a, highpass_b + highpass_a])
+
+
+def channel_weights(channels):
+    # Same layout rules as the JS: LFE (index 3) skipped, surrounds (4, 5) at +1.5 dB
+    weights = np.ones(channels)
+    if channels > 2:
+        weights[3] = 0.0
+        if channels > 4:
+            weights[4] = 1.41
+        if channels > 5:
+            weights[5] = 1.41
+    return weights
+
+
+def _db(value):
+    return 20 * math.log10(value) if value > 0 else None
+
+
+class TruePeakMeter:
+    """Polyphase FIR oversampler tracking the inter-sample peak.
+
+    Each phase of the interpolation filter runs at the input rate with its own
+    carried state, so blocks can be fed one after another.
+    """
+
+    def __init__(self, channels, oversampling=4, taps_per_phase=12):
+        self.oversampling = oversampling
+        taps = signal.firwin(oversampling * taps_per_phase, 1.0 / oversampling) * oversampling
+        self.phases = [taps[p::oversampling] for p in range(oversampling)]
+        self.state = [np.zeros((len(h) - 1, channels)) for h in self.phases]
+        self.peak = 0.0
+
+    def process(self, block):
+        for p, h in enumerate(self.phases):
+            filtered, self.state[p] = signal.lfilter(h, 1.0, block, axis=0, zi=self.state[p])
+            if filtered.size:
+                self.peak = max(self.peak, float(np.max(np.abs(filtered))))
+
+
+class _BlockPowers:
+    """Mean-square power of every ``block``-sample window starting at a multiple of ``hop``.
+
+    Windows are closed as the energy stream passes their end, from running
+    sums taken at their start, so only the finished powers (one per hop) and
+    the few windows still open are kept. Running sums restart at every call,
+    which keeps them small enough not to lose precision over long files.
+    """
+
+    def __init__(self, block, hop):
+        self.block = block
+        self.hop = hop
+        self.frames = 0
+        self._next_start = 0
+        self._ends = np.zeros(0, dtype=np.int64)
+        self._sums = np.zeros(0)  # Energy from each open window's start up to self.frames
+        self._powers = []
+
+    def process(self, energy):
+        # cumulative[i] is the energy in frames [self.frames, self.frames + i)
+        cumulative = np.concatenate(([0.0], np.cumsum(energy)))
+        end = self.frames + len(energy)
+        starts = np.arange(self._next_start, end + 1, self.hop)
+        if len(starts):
+            self._next_start = int(starts[-1]) + self.hop
+            self._ends = np.concatenate((self._ends, starts + self.block))
+            self._sums = np.concatenate((self._sums, -cumulative[starts - self.frames]))
+        closing = np.searchsorted(self._ends, end, side='right')
+        if closing:
+            sums = self._sums[:closing] + cumulative[self._ends[:closing] - self.frames]
+            self._powers.append(sums / self.block)
+            self._ends = self._ends[closing:]
+            self._sums = self._sums[closing:]
+        self._sums += cumulative[-1]
+        self.frames = end
+
+    def powers(self):
+        return np.concatenate(self._powers) if self._powers else np.zeros(0)
+
+
+class LoudnessMeter:
+    """Streaming BS.1770 loudness meter.
+
+    K-weighted energy goes straight into the gating and short-term block
+    powers as blocks arrive; nothing per sample is kept, so memory grows with
+    duration / hop whatever the sample rate.
+    """
+
+    def __init__(self, samplerate, channels, mode='js', oversampling=4):
+        if mode not in MODES:
+            raise ValueError(f'Unknown loudness mode: {mode}')
+        self.samplerate = samplerate
+        self.channels = channels
+        self.mode = mode
+        self.weights = channel_weights(channels)
+        self.sos = k_weighting_sos(samplerate, mode)
+        self.zi = np.zeros((self.sos.shape[0], 2, channels))
+        self.true_peak = TruePeakMeter(channels, oversampling)
+        self.sample_peak = 0.0
+        self.frames = 0
+
+        # Block geometry mirrors the JS integer arithmetic
+        self.gate_block = int(0.4 * samplerate)
+        self.gate_hop = self.gate_block - int(self.gate_block * 0.75)
+        self.short_block = int(3.0 * samplerate)
+        if mode == 'js':
+            self.short_hop = self.short_block - int(self.short_block * 0.75)
+        else:
+            self.short_hop = self.gate_hop
+        self._gate = _BlockPowers(self.gate_block, self.gate_hop)
+        self._short = _BlockPowers(self.short_block, self.short_hop)
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if not len(block):
+            return
+        self.frames += len(block)
+        self.sample_peak = max(self.sample_peak, float(np.max(np.abs(block))))
+        self.true_peak.process(block)
+
+        filtered, self.zi = signal.sosfilt(self.sos, block, axis=0, zi=self.zi)
+        energy = np.square(filtered) @ self.weights
+        self._gate.process(energy)
+        self._short.process(energy)
+
+    def _loudness(self, power):
+        with np.errstate(divide='ignore'):
+            values = 10 * np.log10(power)
+        if self.mode == 'bs1770':
+            values = values - 0.691
+        return values
+
+    def result(self):
+        gate_power = self._gate.powers()
+        short_power = self._short.powers()
+        gate_values = self._loudness(gate_power)
+        short_values = self._loudness(short_power)
+
+        if self.mode == 'js':
+            integrated, loudness_range, short_max = self._js_stats(gate_values, short_values)
+        else:
+            integrated, loudness_range, short_max = self._bs1770_stats(
+                gate_power, gate_values, short_power, short_values)
+
+        return {
+            'truePeak': _db(self.true_peak.peak),
+            'samplePeak': _db(self.sample_peak),
+            'shortTermMax': short_max,
+            'integratedLoudness': integrated,
+            'loudnessRange': loudness_range,
+            'duration': self.frames / self.samplerate,
+            'sampleRate': self.samplerate,
+            'channels': self.channels,
+            'mode': self.mode
+        }
+
+    def _js_stats(self, gate_values, short_values):
+        gate_values = gate_values[np.isfinite(gate_values)]
+        short_values = short_values[np.isfinite(short_values)]
+
+        absolute_gated = gate_values[gate_values >= -70]
+        if not len(absolute_gated):
+            integrated = -70.0
+        else:
+            absolute_mean = float(absolute_gated.mean())
+            relative_gated = absolute_gated[absolute_gated >= absolute_mean - 10]
+            integrated = float(relative_gated.mean()) if len(relative_gated) else absolute_mean
+
+        gated_short = short_values[short_values >= -40]
+        short_max = float(gated_short.max()) if len(gated_short) else None
+
+        loudness_range = 0.0
+        if len(short_values) >= 2 and len(gated_short) >= 2:
+            relative = np.sort(gated_short[gated_short >= gated_short.mean() - 20])
+            if len(relative) >= 2:
+                low = relative[max(0, int(len(relative) * 0.1))]
+                high = relative[min(len(relative) - 1, int(len(relative) * 0.95))]
+                loudness_range = float(high - low)
+        return integrated, loudness_range, short_max
+
+    def _bs1770_stats(self, gate_power, gate_values, short_power, short_values):
+        absolute = gate_values >= -70
+        if not absolute.any():
+            integrated = -70.0
+        else:
+            threshold = self._loudness(gate_power[absolute].mean()) - 10
+            gated = absolute & (gate_values >= threshold)
+            integrated = float(self._loudness(gate_power[gated].mean()))
+
+        finite_short = short_values[np.isfinite(short_values)]
+        short_max = float(finite_short.max()) if len(finite_short) else None
+
+        loudness_range = 0.0
+        absolute = short_values >= -70
+        if absolute.sum() >= 2:
+            threshold = self._loudness(short_power[absolute].mean()) - 20
+            gated = short_values[absolute & (short_values >= threshold)]
+            if len(gated) >= 2:
+                low, high = np.percentile(gated, [10, 95])
+                loudness_range = float(high - low)
+        return integrated, loudness_range, short_max
+
+
+def analyze_file(path, mode='js', block_frames=BLOCK_FRAMES):
+    with open_audio(path) as reader:
+        meter = LoudnessMeter(reader.samplerate, reader.channels, mode)
+        for block in reader.blocks(block_frames):
+            meter.process(block)
+    return meter.result()
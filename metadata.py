@@ -0,0 +1,154 @@
+import struct
+
+from riff import RiffError, RiffFile
+
+ID3_FIELDS = {
+    'TIT2': 'Title',
+    'TPE1': 'Artist',
+    'TALB': 'Album',
+    'TCON': 'Genre',
+    'TYER': 'Year',
+    'TDRC': 'Year',
+    'TCOM': 'Composer',
+    'TPUB': 'Publisher',
+    'TENC': 'Engineer',
+    'TCOP': 'Copyright',
+    'TSRC': 'ISRC',
+    'TSSE': 'Encoder',
+    'TBPM': 'BPM',
+    'TKEY': 'Key',
+    'COMM': 'Comments'
+}
+
+VORBIS_FIELDS = {
+    'TITLE': 'Title',
+    'ARTIST': 'Artist',
+    'ALBUM': 'Album',
+    'GENRE': 'Genre',
+    'DATE': 'Year',
+    'COMPOSER': 'Composer',
+    'ORGANIZATION': 'Publisher',
+    'COPYRIGHT': 'Copyright',
+    'ISRC': 'ISRC',
+    'ENCODER': 'Encoder',
+    'BPM': 'BPM',
+    'COMMENT': 'Comments'
+}
+
+ID3_ENCODINGS = ('latin-1', 'utf-16', 'utf-16-be', 'utf-8')
+
+
+def _clean(value):
+    return value.replace('\x00', ' ').strip()
+
+
+def _normalize_year(tags):
+    # The JS keeps only the four-digit year
+    year = tags.get('Year')
+    if year:
+        for i in range(len(year) - 3):
+            if year[i:i + 4].isdigit():
+                tags['Year'] = year[i:i + 4]
+                break
+    return tags
+
+
+def _syncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _id3_text(frame_id, data):
+    if not data:
+        return ''
+    encoding = ID3_ENCODINGS[data[0]] if data[0] < len(ID3_ENCODINGS) else 'latin-1'
+    body = data[1:]
+    if frame_id == 'COMM' and len(body) >= 3:
+        # Language code, then a short description and the comment text
+        body = body[3:]
+        terminator = b'\x00\x00' if data[0] in (1, 2) else b'\x00'
+        split = body.find(terminator)
+        while data[0] in (1, 2) and split % 2:
+            split = body.find(terminator, split + 1)
+        body = body[split + len(terminator):] if split >= 0 else body
+    return _clean(body.decode(encoding, 'replace'))
+
+
+def read_id3v2(f):
+    tags = {}
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return tags
+    version = header[3]
+    size = _syncsafe(header[6:10])
+    data = f.read(size)
+    pos = 0
+    if header[5] & 0x40 and len(data) >= 4:
+        # Skip the extended header
+        pos = _syncsafe(data[:4]) if version == 4 else struct.unpack('>I', data[:4])[0] + 4
+
+    if version == 2:
+        return tags  # ID3v2.2 uses three-letter frame IDs; too rare in our masters to bother
+
+    while pos + 10 <= len(data):
+        frame_id = data[pos:pos + 4]
+        if frame_id[0] == 0:
+            break  # Padding
+        frame_size = _syncsafe(data[pos + 4:pos + 8]) if version == 4 else struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        frame = data[pos + 10:pos + 10 + frame_size]
+        name = ID3_FIELDS.get(frame_id.decode('latin-1', 'replace'))
+        if name and name not in tags:
+            text = _id3_text(frame_id.decode('latin-1'), frame)
+            if text:
+                tags[name] = text
+        pos += 10 + frame_size
+    return _normalize_year(tags)
+
+
+def read_flac_comments(f):
+    tags = {}
+    if f.read(4) != b'fLaC':
+        return tags
+    while True:
+        header = f.read(4)
+        if len(header) < 4:
+            break
+        last = header[0] & 0x80
+        block_type = header[0] & 0x7F
+        length = int.from_bytes(header[1:4], 'big')
+        if block_type != 4:
+            f.seek(length, 1)
+        else:
+            data = f.read(length)
+            vendor_length = struct.unpack_from('<I', data, 0)[0]
+            pos = 4 + vendor_length
+            count = struct.unpack_from('<I', data, pos)[0]
+            pos += 4
+            for _ in range(count):
+                comment_length = struct.unpack_from('<I', data, pos)[0]
+                comment = data[pos + 4:pos + 4 + comment_length].decode('utf-8', 'replace')
+                pos += 4 + comment_length
+                key, _, value = comment.partition('=')
+                name = VORBIS_FIELDS.get(key.upper())
+                if name and value.strip() and name not in tags:
+                    tags[name] = value.strip()
+        if last:
+            break
+    return _normalize_year(tags)
+
+
+def read_metadata(path):
+    # Tag fields only; reads headers and tag blocks, never the audio payload
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+        f.seek(0)
+        try:
+            if magic in (b'RIFF', b'RF64'):
+                with RiffFile(path) as riff:
+                    return riff.info()
+            if magic[:3] == b'ID3':
+                return read_id3v2(f)
+            if magic == b'fLaC':
+                return read_flac_comments(f)
+        except (struct.error, IndexError, RiffError):
+            pass  # Truncated or malformed tags: report what the audio analysis finds instead
+    return {}
@@ -6,6 +6,8 @@ let isHolding = false;
 let allTimePeakSPL = 0;  // Track all-time peak
 let spectrumAnalyzer = null;
 let spectrogram = null;
+let fileSpectrogram = null;  // Whole-file view, created the first time it is shown
+let fileName = '';
 let vuMeter = null;
 let heldValues = {
     current: 0,
@@ -246,7 +248,7 @@ function animate(timestamp) {
         // Update visualizations with actual sample rate
         if (currentView === 'spectrum' && spectrumAnalyzer) {
             spectrumAnalyzer.draw(frequencyData, audioProcessor.sampleRate);
-        } else if (spectrogram) {
+        } else if (currentView !== 'file' && spectrogram) {
             spectrogram.draw(frequencyData);
         }
         
@@ -299,14 +301,17 @@ function updateView(view) {
     const spectrumCanvas = document.getElementById('spectrum');
     const spectrogramCanvas = document.getElementById('spectrogram');
     const vuMeterCanvas = document.getElementById('vuMeter');
+    const fileCanvas = document.getElementById('fileSpectrogram');
     const spectrumButton = document.getElementById('spectrumButton');
     const spectrogramButton = document.getElementById('spectrogramButton');
+    const fileButton = document.getElementById('fileButton');
+    const fileStatus = document.getElementById('fileStatus');
     
     // Remove active class from all canvases and buttons
-    [spectrumCanvas, spectrogramCanvas, vuMeterCanvas].forEach(canvas => {
+    [spectrumCanvas, spectrogramCanvas, vuMeterCanvas, fileCanvas, fileStatus].forEach(canvas => {
         if (canvas) canvas.classList.remove('active');
     });
-    [spectrumButton, spectrogramButton].forEach(button => {
+    [spectrumButton, spectrogramButton, fileButton].forEach(button => {
         if (button) button.classList.remove('active');
     });
     
@@ -323,9 +328,109 @@ function updateView(view) {
         case 'vuMeter':
             if (vuMeterCanvas) vuMeterCanvas.classList.add('active');
             break;
+        case 'file':
+            if (fileCanvas) fileCanvas.classList.add('active');
+            if (fileButton) fileButton.classList.add('active');
+            if (fileStatus) fileStatus.classList.add('active');
+            break;
     }
     
     currentView = view;
+    if (view === 'file') showFileView();
+}
+
+// File view: server-side spectrogram tiles of a whole recording
+function showFileView() {
+    if (!fileSpectrogram) {
+        fileSpectrogram = new TileSpectrogram('fileSpectrogram');
+        initializeFileViewListeners();
+    } else {
+        // Sized while hidden; measure again now the canvas is laid out
+        fileSpectrogram.resizeCanvas();
+    }
+    if (fileSpectrogram.info) {
+        renderFileView(fileSpectrogram.view(fileSpectrogram.start, fileSpectrogram.end));
+    } else {
+        updateFileStatus();
+    }
+}
+
+async function loadFile(file) {
+    // A File from the picker, or the id of a file already on the server
+    fileName = typeof file === 'string' ? file : file.name;
+    updateFileStatus(`Analyzing ${fileName}...`);
+    try {
+        await fileSpectrogram.load(file);
+        updateFileStatus();
+    } catch (error) {
+        console.error('Error loading spectrogram:', error);
+        updateFileStatus(`Could not analyze ${fileName}: ${error.message}`);
+    }
+}
+
+async function renderFileView(rendering) {
+    await rendering;
+    updateFileStatus();
+}
+
+function updateFileStatus(message) {
+    const fileStatus = document.getElementById('fileStatus');
+    if (!fileStatus) return;
+    if (message) {
+        fileStatus.textContent = message;
+    } else if (!fileSpectrogram?.info) {
+        fileStatus.textContent = 'Choose a recording with the File button';
+    } else {
+        const { start, end, info } = fileSpectrogram;
+        const span = end - start;
+        fileStatus.textContent = `${fileName}: ${fileSpectrogram.formatTime(start, span)} - ` +
+            `${fileSpectrogram.formatTime(end, span)} of ${fileSpectrogram.formatTime(info.duration, span)} ` +
+            '(wheel to zoom, drag to scroll, double-click for the whole file)';
+    }
+}
+
+function initializeFileViewListeners() {
+    const canvas = document.getElementById('fileSpectrogram');
+    let drag = null;
+
+    canvas.addEventListener('wheel', event => {
+        if (!fileSpectrogram.info) return;
+        event.preventDefault();
+        const rect = canvas.getBoundingClientRect();
+        const span = fileSpectrogram.end - fileSpectrogram.start;
+        const spectrogramWidth = rect.width - fileSpectrogram.margin.left - fileSpectrogram.margin.right;
+        if (event.shiftKey || Math.abs(event.deltaX) > Math.abs(event.deltaY)) {
+            const delta = event.deltaX || event.deltaY;
+            renderFileView(fileSpectrogram.scroll(delta / spectrogramWidth * span));
+        } else {
+            const anchor = fileSpectrogram.xToTime(event.clientX - rect.left);
+            renderFileView(fileSpectrogram.zoom(Math.exp(event.deltaY * 0.002), anchor));
+        }
+    }, { passive: false });
+
+    canvas.addEventListener('pointerdown', event => {
+        if (!fileSpectrogram.info) return;
+        canvas.setPointerCapture(event.pointerId);
+        drag = { x: event.clientX, start: fileSpectrogram.start, span: fileSpectrogram.end - fileSpectrogram.start };
+    });
+    canvas.addEventListener('pointermove', event => {
+        if (!drag) return;
+        const spectrogramWidth = fileSpectrogram.width - fileSpectrogram.margin.left - fileSpectrogram.margin.right;
+        const seconds = (drag.x - event.clientX) / spectrogramWidth * drag.span;
+        renderFileView(fileSpectrogram.scrollTo(drag.start + seconds, drag.span));
+    });
+    ['pointerup', 'pointercancel'].forEach(type => canvas.addEventListener(type, () => { drag = null; }));
+
+    canvas.addEventListener('dblclick', () => {
+        if (fileSpectrogram.info) renderFileView(fileSpectrogram.view(0, fileSpectrogram.info.duration));
+    });
+
+    window.addEventListener('resize', () => {
+        // The base class has already resized the canvas; draw the same range into it
+        if (currentView === 'file' && fileSpectrogram.info) {
+            renderFileView(fileSpectrogram.view(fileSpectrogram.start, fileSpectrogram.end));
+        }
+    });
 }
 
 // Initialize when DOM is ready
@@ -341,6 +446,8 @@ function initializeEventListeners() {
     const holdButton = document.getElementById('holdButton');
     const spectrumButton = document.getElementById('spectrumButton');
     const spectrogramButton = document.getElementById('spectrogramButton');
+    const fileButton = document.getElementById('fileButton');
+    const fileInput = document.getElementById('fileInput');
     
     if (startButton) {
         startButton.addEventListener('click', toggleAudio);
@@ -354,6 +461,24 @@ function initializeEventListeners() {
     if (spectrogramButton) {
         spectrogramButton.addEventListener('click', () => updateView('spectrogram'));
     }
+    if (fileButton && fileInput) {
+        // First click switches to the file view, clicking it again picks a recording
+        fileButton.addEventListener('click', () => {
+            if (currentView === 'file' || !fileSpectrogram?.info) fileInput.click();
+            updateView('file');
+        });
+        fileInput.addEventListener('change', () => {
+            if (fileInput.files.length) loadFile(fileInput.files[0]);
+            fileInput.value = '';
+        });
+    }
+
+    // meter/?file=<id> opens a file the server already has
+    const storedId = new URLSearchParams(window.location.search).get('file');
+    if (storedId) {
+        updateView('file');
+        loadFile(storedId);
+    }
 }
 
 // Initialize event listeners when DOM is ready
@@ -178,7 +178,7 @@ class Spectrogram {
         // Draw time labels
         this.ctx.textAlign = 'center';
         this.ctx.textBaseline = 'top';
-        const timeLabels = ['0s', '1s', '2s', '3s', '4s'];
+        const timeLabels = this.timeLabels();
         const spectrogramWidth = this.width - this.margin.left - this.margin.right;
         const timeStep = spectrogramWidth / (timeLabels.length - 1);
         
@@ -188,6 +188,10 @@ class Spectrogram {
         });
     }
 
+    timeLabels() {
+        return ['0s', '1s', '2s', '3s', '4s'];
+    }
+
     hslToRgb(h, s, l) {
         let r, g, b;
         
@@ -223,5 +227,162 @@ class Spectrogram {
     }
 }
 
+// Whole-file view drawn from the server's precomputed tiles (/api/spectrogram).
+// Each tile is bands x tileWidth bytes, lowest band first; 0 = minDb, 255 = maxDb.
+class TileSpectrogram extends Spectrogram {
+    constructor(containerId) {
+        super(containerId);
+        this.info = null;
+        this.tiles = new Map();  // "level/index" -> Promise<Uint8Array>
+        this.maxTiles = 256;
+        this.start = 0;
+        this.end = 0;
+        this.renders = 0;
+    }
+
+    async load(file) {
+        // Upload a File, or pass the id of an already stored one
+        const response = typeof file === 'string'
+            ? await fetch(`/api/spectrogram/${file}`)
+            : await fetch('/api/spectrogram', { method: 'POST', body: this.formData(file) });
+        if (!response.ok) {
+            throw new Error(`Spectrogram request failed: ${response.status}`);
+        }
+        this.info = await response.json();
+        this.tiles.clear();
+        await this.view(0, this.info.duration);
+        return this.info;
+    }
+
+    formData(file) {
+        const form = new FormData();
+        form.append('file', file);
+        return form;
+    }
+
+    tile(level, index) {
+        const key = `${level}/${index}`;
+        if (!this.tiles.has(key)) {
+            if (this.tiles.size >= this.maxTiles) {
+                this.tiles.delete(this.tiles.keys().next().value);
+            }
+            const url = this.info.tileUrl.replace('{level}', level).replace('{index}', index);
+            this.tiles.set(key, fetch(url)
+                .then(response => response.arrayBuffer())
+                .then(buffer => new Uint8Array(buffer)));
+        }
+        return this.tiles.get(key);
+    }
+
+    async view(start, end) {
+        // Show seconds start..end using the coarsest level with at least one column per pixel
+        if (!this.info) return;
+        const render = ++this.renders;
+        this.start = Math.max(0, start);
+        this.end = Math.min(this.info.duration, end);
+        const spectrogramWidth = this.width - this.margin.left - this.margin.right;
+        const spectrogramHeight = this.height - this.margin.top - this.margin.bottom;
+        const secondsPerPixel = (this.end - this.start) / spectrogramWidth;
+        let level = 0;
+        while (level + 1 < this.info.levels.length &&
+               this.info.levels[level + 1].columnSeconds <= secondsPerPixel) {
+            level++;
+        }
+
+        const { columnSeconds } = this.info.levels[level];
+        const { tileWidth, bands } = this.info;
+        const firstColumn = Math.floor(this.start / columnSeconds);
+        const lastColumn = Math.ceil(this.end / columnSeconds);
+        const indices = [];
+        for (let i = Math.floor(firstColumn / tileWidth); i <= Math.floor(lastColumn / tileWidth); i++) {
+            if (i < this.info.levels[level].tiles) indices.push(i);
+        }
+        const tiles = new Map(await Promise.all(indices.map(async i => [i, await this.tile(level, i)])));
+        if (render !== this.renders) return;  // A newer view was asked for while tiles loaded
+        const palette = this.palette();
+        const rowBand = new Int32Array(spectrogramHeight);
+        const bandSpan = Math.log(this.info.maxFreq / this.info.minFreq);
+        for (let y = 0; y < spectrogramHeight; y++) {
+            const freq = this.yToFreq(y, spectrogramHeight);
+            rowBand[y] = Math.min(bands - 1, Math.max(0,
+                Math.floor(Math.log(freq / this.info.minFreq) / bandSpan * bands)));
+        }
+
+        const data = this.imageData.data;
+        for (let x = 0; x < spectrogramWidth; x++) {
+            const column = Math.floor((this.start + x * secondsPerPixel) / columnSeconds);
+            const tile = tiles.get(Math.floor(column / tileWidth));
+            const offset = column % tileWidth;
+            for (let y = 0; y < spectrogramHeight; y++) {
+                const value = tile ? tile[rowBand[y] * tileWidth + offset] : 0;
+                const index = (y * spectrogramWidth + x) * 4;
+                data[index] = palette[value * 3];
+                data[index + 1] = palette[value * 3 + 1];
+                data[index + 2] = palette[value * 3 + 2];
+                data[index + 3] = 255;
+            }
+        }
+        this.ctx.fillStyle = '#1e1e1e';
+        this.ctx.fillRect(0, 0, this.width, this.height);
+        this.ctx.putImageData(this.imageData, this.margin.left, this.margin.top);
+        this.drawGrid();
+    }
+
+    zoom(factor, anchor) {
+        // Scale the visible span by factor, keeping the time at anchor in place
+        const span = this.end - this.start;
+        const minSpan = this.info.levels[0].columnSeconds * 16;
+        const newSpan = Math.min(this.info.duration, Math.max(minSpan, span * factor));
+        const start = anchor - (anchor - this.start) * newSpan / span;
+        return this.scrollTo(start, newSpan);
+    }
+
+    scroll(seconds) {
+        return this.scrollTo(this.start + seconds, this.end - this.start);
+    }
+
+    scrollTo(start, span) {
+        start = Math.min(Math.max(0, start), this.info.duration - span);
+        return this.view(start, start + span);
+    }
+
+    xToTime(x) {
+        // Canvas x (CSS pixels) to seconds in the current view
+        const spectrogramWidth = this.width - this.margin.left - this.margin.right;
+        const fraction = Math.min(1, Math.max(0, (x - this.margin.left) / spectrogramWidth));
+        return this.start + fraction * (this.end - this.start);
+    }
+
+    timeLabels() {
+        const span = this.end - this.start;
+        return Array.from({ length: 5 }, (_, i) => this.formatTime(this.start + span * i / 4, span));
+    }
+
+    formatTime(seconds, span) {
+        const decimals = span < 10 ? 2 : span < 60 ? 1 : 0;
+        if (seconds < 60) return `${seconds.toFixed(decimals)}s`;
+        const minutes = Math.floor(seconds / 60);
+        const rest = (seconds - minutes * 60).toFixed(decimals).padStart(decimals ? decimals + 3 : 2, '0');
+        return `${minutes}:${rest}`;
+    }
+
+    palette() {
+        // Same colour mapping as draw(), indexed by tile byte
+        const palette = new Uint8Array(256 * 3);
+        for (let i = 0; i < 256; i++) {
+            const value = Math.min(1, Math.max(0, i / 255 * (1 + (this.sensitivity + 90) / 45)));
+            const rgb = this.hslToRgb((240 - value * 180) / 360, 0.8 + value * 0.2, 0.3 + value * 0.4);
+            palette.set(rgb, i * 3);
+        }
+        return palette;
+    }
+
+    yToFreq(y, height) {
+        // Inverse of freqToY
+        return 20 * Math.pow(20000 / 20, 1 - y / height);
+    }
+}
+
 // Export for use in main.js
-window.Spectrogram = Spectrogram; 
\ No newline at end of file
+window.Spectrogram = Spectrogram;
+window.TileSpectrogram = TileSpectrogram;
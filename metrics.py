@@ -0,0 +1,309 @@
+# Request and upstream instrumentation, exposed at /metrics in the Prometheus
+# text format (version 0.0.4) without any client library.
+#
+# Handlers mix in MetricsMixin to get per-route counts, latency histograms and
+# bytes in/out; upstream calls report through observe_upstream(); caches and
+# stores register their stats() with register_stats() and are read at scrape
+# time. sample_stacks() is a small sampling profiler over sys._current_frames()
+# that returns collapsed stacks (flamegraph.pl / speedscope input); servers
+# only expose it when started with the profiler enabled.
+from collections import Counter as _Tally
+import re
+import sys
+import threading
+import time
+import urllib.parse
+
+PREFIX = 'loum'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+MAX_PROFILE_SECONDS = 60
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _snake(name):
+    return re.sub(r'(?<=[a-z0-9])([A-Z])', r'_\1', name).lower()
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.label_names, key)} {_number(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._series = {}  # labels -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, key, [("le", _number(bound))])} '
+                             f'{cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {_number(values[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._stats = []  # (prefix, stats function)
+        self._lock = threading.Lock()
+
+    def add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, name, stats):
+        # Numeric fields of stats() become gauges named <PREFIX>_<name>_<field>, read at scrape time
+        with self._lock:
+            self._stats = [(n, s) for n, s in self._stats if n != name] + [(name, stats)]
+
+    def render(self):
+        with self._lock:
+            metrics, stats_sources = list(self._metrics), list(self._stats)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, stats in stats_sources:
+            try:
+                values = stats()
+            except Exception as e:
+                lines.append(f'# {name} stats unavailable: {_escape(e)}')
+                continue
+            for field, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric_name = f'{PREFIX}_{name}_{_snake(field)}'
+                lines.append(f'# TYPE {metric_name} gauge')
+                lines.append(f'{metric_name} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.add(Counter(f'{PREFIX}_http_requests_total', 'HTTP requests handled',
+                                ('server', 'method', 'route', 'status')))
+REQUEST_SECONDS = registry.add(Histogram(f'{PREFIX}_http_request_duration_seconds',
+                                         'Time from request line to handler return', ('server', 'method', 'route')))
+REQUEST_BYTES = registry.add(Counter(f'{PREFIX}_http_bytes_total', 'Request and response body bytes',
+                                     ('server', 'route', 'direction')))
+IN_FLIGHT = registry.add(Gauge(f'{PREFIX}_http_requests_in_flight', 'Requests being handled', ('server',)))
+UPSTREAM_SECONDS = registry.add(Histogram(f'{PREFIX}_upstream_duration_seconds',
+                                          'Upstream calls (Deepgram, proxied files)', ('upstream', 'outcome')))
+UPSTREAM_BYTES = registry.add(Counter(f'{PREFIX}_upstream_bytes_total', 'Bytes received from upstreams',
+                                      ('upstream',)))
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def observe_upstream(upstream, outcome, seconds, received=0):
+    UPSTREAM_SECONDS.observe(seconds, upstream=upstream, outcome=str(outcome))
+    if received:
+        UPSTREAM_BYTES.inc(received, upstream=upstream)
+
+
+def register_stats(name, stats):
+    registry.register_stats(name, stats)
+
+
+class MetricsMixin:
+    """Per-route metrics for BaseHTTPRequestHandler subclasses; list it before the handler base.
+
+    ``route_patterns`` maps request paths to low-cardinality route labels:
+    (regex, template) pairs tried in order, the template expanded with the
+    match groups. Unmatched GETs count as 'static', anything else as 'other'.
+    """
+
+    metrics_server = 'server'
+    route_patterns = ()
+    profiler_enabled = False
+
+    def parse_request(self):
+        # Runs once the request line is in, so idle keep-alive time isn't counted
+        self._metrics_start = time.perf_counter()
+        self._metrics_status = None
+        self._metrics_bytes_out = 0
+        self._adjust_in_flight(1)
+        return super().parse_request()
+
+    def handle_one_request(self):
+        self._metrics_start = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self._metrics_start is not None:
+                self._adjust_in_flight(-1)
+                self._record()
+
+    def send_response_only(self, code, message=None):
+        self._metrics_status = code
+        super().send_response_only(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == 'content-length' and str(value).isdigit():
+            self._metrics_bytes_out += int(value)
+        super().send_header(keyword, value)
+
+    def _adjust_in_flight(self, delta):
+        with _in_flight_lock:
+            _in_flight[self.metrics_server] = _in_flight.get(self.metrics_server, 0) + delta
+            IN_FLIGHT.set(_in_flight[self.metrics_server], server=self.metrics_server)
+
+    def route_label(self):
+        path = urllib.parse.urlsplit(getattr(self, 'path', '') or '').path
+        cls = type(self)
+        compiled = cls.__dict__.get('_compiled_routes')
+        if compiled is None:
+            compiled = [(re.compile(pattern), template) for pattern, template in self.route_patterns]
+            cls._compiled_routes = compiled
+        for pattern, template in compiled:
+            match = pattern.match(path)
+            if match:
+                return match.expand(template)
+        return 'static' if getattr(self, 'command', None) in ('GET', 'HEAD') else 'other'
+
+    def _record(self):
+        if self._metrics_status is None or not getattr(self, 'command', None):
+            return  # Nothing parsed, or the client went away before a response
+        route = self.route_label()
+        elapsed = time.perf_counter() - self._metrics_start
+        REQUESTS.inc(server=self.metrics_server, method=self.command, route=route, status=str(self._metrics_status))
+        REQUEST_SECONDS.observe(elapsed, server=self.metrics_server, method=self.command, route=route)
+        length = self.headers.get('Content-Length', '') if self.headers else ''
+        if length.isdigit():
+            REQUEST_BYTES.inc(int(length), server=self.metrics_server, route=route, direction='in')
+        if self._metrics_bytes_out:
+            REQUEST_BYTES.inc(self._metrics_bytes_out, server=self.metrics_server, route=route, direction='out')
+
+    def send_metrics(self):
+        content = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', len(content))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_profile(self):
+        # GET /debug/profile?seconds=10&interval=0.005 -> collapsed stacks of every other thread
+        if not self.profiler_enabled:
+            self.send_error(404, 'Profiler not enabled')
+            return
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        try:
+            seconds = min(float(query.get('seconds', ['10'])[0]), MAX_PROFILE_SECONDS)
+            interval = max(float(query.get('interval', ['0.005'])[0]), 0.001)
+        except ValueError:
+            self.send_error(400, 'Invalid profile parameters')
+            return
+        content = sample_stacks(seconds, interval, exclude=threading.get_ident()).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', len(content))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+_profile_lock = threading.Lock()
+
+
+def sample_stacks(seconds, interval=0.005, exclude=None):
+    """Sample every thread's stack for ``seconds``; returns collapsed stack lines.
+
+    Each line is ``thread;outer;...;inner count``. Idle threads (blocked in
+    the accept/queue wait) show up too, which is useful for pool sizing. One
+    profile runs at a time.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return '# another profile is running\n'
+    try:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        tally = _Tally()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == exclude or ident == threading.get_ident():
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{frame.f_lineno})')
+                    frame = frame.f_back
+                # Pool threads share a name prefix; fold them together
+                name = re.sub(r'[-_]?\d+$', '', names.get(ident, 'thread')) or 'thread'
+                tally[';'.join([name] + stack[::-1])] += 1
+            samples += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+    lines = [f'# {samples} samples every {interval}s over {seconds}s']
+    lines.extend(f'{stack} {count}' for stack, count in tally.most_common())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,170 @@
+# In-memory mixer collection configs (mixer/configs/<name>.json) for the
+# long-running mixer server.
+#
+# Every config is parsed and validated once; the served bytes, an ETag and a
+# summary for the collection index are kept in memory. A background thread
+# polls the directory's mtimes and reloads only what changed, so editing a
+# config shows up on the next request without a restart. A config that stops
+# validating keeps serving its last good version and is listed under errors.
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_name_re = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+
+
+def validate_config(config):
+    # Raise ValueError unless ``config`` has the shape main.js relies on
+    if not isinstance(config, dict):
+        raise ValueError('config must be a JSON object')
+    tracks = config.get('tracks')
+    if not isinstance(tracks, list) or not tracks:
+        raise ValueError('"tracks" must be a non-empty list')
+    for i, track in enumerate(tracks):
+        if not isinstance(track, dict):
+            raise ValueError(f'track {i} must be an object')
+        if not isinstance(track.get('url'), str) or not track['url']:
+            raise ValueError(f'track {i} needs a "url"')
+        bpm = track.get('bpm')
+        if bpm is not None and (isinstance(bpm, bool) or not isinstance(bpm, (int, float)) or bpm <= 0):
+            raise ValueError(f'track {i} has an invalid "bpm"')
+    info = config.get('collection_info')
+    if info is not None and not isinstance(info, dict):
+        raise ValueError('"collection_info" must be an object')
+
+
+def _etag(content):
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+class ConfigStore:
+    """Validated collection configs keyed by lowercase name, hot-reloaded from ``config_dir``."""
+
+    def __init__(self, config_dir, poll_interval=1.0):
+        self.config_dir = config_dir
+        self.poll_interval = poll_interval
+        self._configs = {}
+        self._stamps = {}  # name -> (mtime_ns, size) last seen on disk
+        self._errors = {}
+        self._index = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.reload()
+
+        if poll_interval:
+            self._watcher = threading.Thread(target=self._watch_loop, name='mixer-config-watcher', daemon=True)
+            self._watcher.start()
+
+    def _scan(self):
+        stamps = {}
+        try:
+            entries = list(os.scandir(self.config_dir))
+        except FileNotFoundError:
+            return stamps
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if ext != '.json' or not entry.is_file():
+                continue
+            stat = entry.stat()
+            stamps[stem] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _load(self, stem):
+        path = os.path.join(self.config_dir, f'{stem}.json')
+        with open(path, 'rb') as f:
+            content = f.read()
+        config = json.loads(content)
+        validate_config(config)
+        info = config.get('collection_info') or {}
+        name = stem.lower()
+        return {
+            'content': content,
+            'etag': _etag(content),
+            'config': config,
+            'summary': {
+                'name': name,
+                'title': info.get('title') or config.get('title') or name,
+                'artist': info.get('artist'),
+                'artwork': info.get('artwork'),
+                'tracks': len(config['tracks']),
+                'url': f'/mixer/{name}',
+                'configUrl': f'/mixer/configs/{name}.json'
+            }
+        }
+
+    def reload(self):
+        # Re-read configs whose mtime or size changed and drop deleted ones; returns changed names
+        stamps = self._scan()
+        changed = []
+        with self._lock:
+            previous = dict(self._stamps)
+        for stem, stamp in stamps.items():
+            name = stem.lower()
+            if previous.get(stem) == stamp:
+                continue
+            changed.append(name)
+            if not _name_re.match(name):
+                with self._lock:
+                    self._errors[name] = 'invalid collection name'
+                continue
+            try:
+                entry = self._load(stem)
+            except (OSError, ValueError) as e:
+                logger.warning(f'Invalid mixer config {stem}.json: {e}')
+                with self._lock:
+                    self._errors[name] = str(e)
+                continue
+            with self._lock:
+                self._configs[name] = entry
+                self._errors.pop(name, None)
+        for stem in set(previous) - set(stamps):
+            name = stem.lower()
+            changed.append(name)
+            with self._lock:
+                self._configs.pop(name, None)
+                self._errors.pop(name, None)
+        with self._lock:
+            self._stamps = stamps
+            if changed or self._index is None:
+                self._index = None
+                self.reloads += 1
+        if changed:
+            logger.info(f'Reloaded mixer configs: {", ".join(sorted(changed))}')
+        return changed
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f'Mixer config reload failed: {e}')
+
+    def get(self, name):
+        with self._lock:
+            return self._configs.get(name.lower())
+
+    def index(self):
+        # (content, etag) of the collection index, rebuilt after a reload
+        with self._lock:
+            if self._index is None:
+                content = json.dumps({
+                    'collections': [self._configs[name]['summary'] for name in sorted(self._configs)],
+                    'errors': dict(sorted(self._errors.items()))
+                }).encode()
+                self._index = (content, _etag(content))
+            return self._index
+
+    def stats(self):
+        with self._lock:
+            return {
+                'collections': len(self._configs),
+                'errors': len(self._errors),
+                'reloads': self.reloads
+            }
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Precompute min/max waveform peak pyramids for every track in mixer/configs/*.json.
+#
+#   python mixer/peaks.py                 # all collections
+#   python mixer/peaks.py hungryghost -j 8 --force
+#
+# Writes mixer/peaks/<collection>/<track index>.peaks plus an index.json per
+# collection; mixer/static/js/waveform.js draws straight from these files.
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import glob
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from audio_io import open_audio
+
+MIXER_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.join(MIXER_DIR, 'configs')
+PEAKS_DIR = os.path.join(MIXER_DIR, 'peaks')
+
+# File layout (little-endian):
+#   'LPKS' | u16 version | u16 level count | u32 sample rate | u32 frames
+#   per level: u32 samples per peak | u32 peak count | u32 data offset
+#   per level data: int8 min, int8 max for each peak
+MAGIC = b'LPKS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+LEVEL = struct.Struct('<III')
+
+BASE_SAMPLES_PER_PEAK = 256
+LEVEL_FACTOR = 4
+MIN_PEAKS = 256
+
+
+def min_max_buckets(reader, samples_per_peak):
+    # Min/max of channel 0 (what the JS waveform draws) over fixed-size buckets
+    mins, maxs = [], []
+    frames = 0
+    carry = np.zeros(0, dtype=np.float32)
+    for block in reader.blocks():
+        frames += len(block)
+        data = np.concatenate((carry, block[:, 0])) if len(carry) else block[:, 0]
+        full = len(data) // samples_per_peak * samples_per_peak
+        if full:
+            buckets = data[:full].reshape(-1, samples_per_peak)
+            mins.append(buckets.min(axis=1))
+            maxs.append(buckets.max(axis=1))
+        carry = data[full:]
+    if len(carry):
+        mins.append(carry.min(keepdims=True))
+        maxs.append(carry.max(keepdims=True))
+    if not mins:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32), 0
+    return np.concatenate(mins), np.concatenate(maxs), frames
+
+
+def build_pyramid(mins, maxs):
+    levels = [(BASE_SAMPLES_PER_PEAK, mins, maxs)]
+    while len(mins) > MIN_PEAKS:
+        pad = -len(mins) % LEVEL_FACTOR
+        if pad:
+            mins = np.concatenate((mins, np.full(pad, mins[-1])))
+            maxs = np.concatenate((maxs, np.full(pad, maxs[-1])))
+        mins = mins.reshape(-1, LEVEL_FACTOR).min(axis=1)
+        maxs = maxs.reshape(-1, LEVEL_FACTOR).max(axis=1)
+        levels.append((levels[-1][0] * LEVEL_FACTOR, mins, maxs))
+    return levels
+
+
+def encode_peaks(samplerate, frames, levels):
+    offset = HEADER.size + LEVEL.size * len(levels)
+    table = []
+    payload = []
+    for samples_per_peak, mins, maxs in levels:
+        interleaved = np.empty(len(mins) * 2, dtype=np.int8)
+        interleaved[0::2] = np.clip(np.floor(mins * 127), -127, 127)
+        interleaved[1::2] = np.clip(np.ceil(maxs * 127), -127, 127)
+        table.append(LEVEL.pack(samples_per_peak, len(mins), offset))
+        payload.append(interleaved.tobytes())
+        offset += len(interleaved)
+    frames = min(frames, 0xFFFFFFFF)
+    return HEADER.pack(MAGIC, VERSION, len(levels), samplerate, frames) + b''.join(table) + b''.join(payload)
+
+
+def download(url, path):
+    req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0', 'Accept': '*/*'})
+    with urllib.request.urlopen(req) as response, open(path, 'wb') as f:
+        shutil.copyfileobj(response, f, 256 * 1024)
+
+
+def generate_peaks(source):
+    # Worker entry point: source is a URL or a local path; returns (bytes, metadata)
+    tmp_path = None
+    try:
+        if source.startswith(('http://', 'https://')):
+            fd, tmp_path = tempfile.mkstemp(prefix='peaks-')
+            os.close(fd)
+            download(source, tmp_path)
+            path = tmp_path
+        else:
+            path = source
+        with open_audio(path) as reader:
+            mins, maxs, frames = min_max_buckets(reader, BASE_SAMPLES_PER_PEAK)
+            samplerate = reader.samplerate
+        levels = build_pyramid(mins, maxs)
+        return encode_peaks(samplerate, frames, levels), {
+            'sampleRate': samplerate,
+            'frames': frames,
+            'duration': frames / samplerate,
+            'levels': [samples_per_peak for samples_per_peak, _, _ in levels]
+        }
+    finally:
+        if tmp_path:
+            os.remove(tmp_path)
+
+
+def load_index(collection):
+    try:
+        with open(os.path.join(PEAKS_DIR, collection, 'index.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate waveform peak files for mixer collections')
+    parser.add_argument('collections', nargs='*', help='collection names (default: every config)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--force', action='store_true', help='regenerate files that are already up to date')
+    args = parser.parse_args()
+
+    names = args.collections or sorted(os.path.splitext(os.path.basename(p))[0]
+                                       for p in glob.glob(os.path.join(CONFIG_DIR, '*.json')))
+
+    # Several collections can list the same URL; generate each source once
+    wanted = {}
+    indexes = {}
+    for name in names:
+        with open(os.path.join(CONFIG_DIR, f'{name}.json')) as f:
+            config = json.load(f)
+        previous = {track['url']: track for track in load_index(name).get('tracks', [])}
+        indexes[name] = {'collection': name, 'tracks': []}
+        for i, track in enumerate(config.get('tracks', [])):
+            entry = {'index': i, 'title': track.get('title'), 'url': track['url'], 'file': f'{i}.peaks'}
+            indexes[name]['tracks'].append(entry)
+            old = previous.get(track['url'])
+            up_to_date = (old is not None and old.get('file') == entry['file']
+                          and os.path.exists(os.path.join(PEAKS_DIR, name, entry['file'])))
+            if up_to_date and not args.force:
+                entry.update({k: v for k, v in old.items() if k not in entry})
+            else:
+                wanted.setdefault(track['url'], []).append((name, entry))
+
+    print(f'Generating peaks for {len(wanted)} tracks across {len(names)} collections...')
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(generate_peaks, url): url for url in wanted}
+        for done, future in enumerate(as_completed(futures), 1):
+            url = futures[future]
+            try:
+                content, metadata = future.result()
+            except Exception as e:
+                print(f'[{done}/{len(futures)}] Error generating peaks for {url}: {e}')
+                continue
+            for name, entry in wanted[url]:
+                os.makedirs(os.path.join(PEAKS_DIR, name), exist_ok=True)
+                with open(os.path.join(PEAKS_DIR, name, entry['file']), 'wb') as f:
+                    f.write(content)
+                entry.update(metadata)
+                entry['bytes'] = len(content)
+            print(f'[{done}/{len(futures)}] {entry["title"]}: {len(content)} bytes, '
+                  f'{metadata["duration"]:.1f}s')
+
+    for name, index in indexes.items():
+        os.makedirs(os.path.join(PEAKS_DIR, name), exist_ok=True)
+        with open(os.path.join(PEAKS_DIR, name, 'index.json'), 'w') as f:
+            json.dump(index, f, indent=2)
+    print('Peak files written to', PEAKS_DIR)
+
+
+if __name__ == '__main__':
+    main()
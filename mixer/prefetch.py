@@ -0,0 +1,188 @@
+# Warm the /proxy/ cache for a mixer collection ahead of the first page load.
+#
+#   python mixer/refresh.py prefetch hungryghost -j 8
+#
+# Every track and artwork URL in mixer/configs/<collection>.json is pulled
+# through the proxy cache with a bounded pool, each track is decoded once to
+# check its length and tempo against the config, and the result is written to
+# mixer/manifests/<collection>.json. main.js reads that manifest and loads
+# cached tracks from /proxy/ instead of going back to Dropbox.
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.parse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from audio_io import open_audio
+
+MIXER_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.join(MIXER_DIR, 'configs')
+MANIFEST_DIR = os.path.join(MIXER_DIR, 'manifests')
+
+# Onset envelope resolution and the tempo range we search
+HOP = 512
+MIN_BPM = 60
+MAX_BPM = 200
+BPM_TOLERANCE = 0.03
+
+
+def proxy_url(url):
+    return '/proxy/' + urllib.parse.quote(url, safe='')
+
+
+def estimate_tempo(reader):
+    # Decode once: frame energies per HOP samples, then autocorrelate the onset envelope
+    energies = []
+    carry = np.zeros(0, dtype=np.float32)
+    frames = 0
+    for block in reader.blocks():
+        frames += len(block)
+        mono = block.mean(axis=1)
+        data = np.concatenate((carry, mono)) if len(carry) else mono
+        full = len(data) // HOP * HOP
+        if full:
+            energies.append(np.square(data[:full]).reshape(-1, HOP).sum(axis=1))
+        carry = data[full:]
+
+    duration = frames / reader.samplerate if reader.samplerate else 0.0
+    if not energies:
+        return duration, None
+
+    envelope = np.log1p(1000 * np.concatenate(energies))
+    onsets = np.maximum(np.diff(envelope), 0)
+    onsets -= onsets.mean()
+    frame_rate = reader.samplerate / HOP
+    min_lag = int(frame_rate * 60 / MAX_BPM)
+    max_lag = int(frame_rate * 60 / MIN_BPM) + 1
+    if len(onsets) <= max_lag:
+        return duration, None
+
+    size = 1 << int(np.ceil(np.log2(2 * len(onsets))))
+    spectrum = np.fft.rfft(onsets, size)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), size)[:max_lag + 1]
+    if autocorr[0] <= 0:
+        return duration, None
+
+    # Weight lags towards ~120 BPM so we don't settle on half or double time
+    lags = np.arange(min_lag, max_lag)
+    prior = np.exp(-0.5 * np.square(np.log2(60 * frame_rate / lags / 120)))
+    lag = min_lag + int(np.argmax(autocorr[min_lag:max_lag] * prior))
+    # Parabolic interpolation around the peak for sub-frame lag resolution
+    if 0 < lag < len(autocorr) - 1:
+        a, b, c = autocorr[lag - 1], autocorr[lag], autocorr[lag + 1]
+        denominator = a - 2 * b + c
+        offset = 0.5 * (a - c) / denominator if denominator else 0.0
+    else:
+        offset = 0.0
+    return duration, round(float(60 * frame_rate / (lag + offset)), 1)
+
+
+def tempo_matches(expected, detected):
+    # Autocorrelation happily locks onto half or double time; accept either
+    if expected is None or detected is None:
+        return None
+    return any(abs(detected * factor - expected) <= expected * BPM_TOLERANCE for factor in (0.5, 1, 2))
+
+
+def warm(cache, url):
+    start = time.perf_counter()
+    was_cached = cache.contains(url)
+    meta = cache.fetch(url)
+    return {
+        'url': url,
+        'proxyUrl': proxy_url(url),
+        'contentType': meta['contentType'],
+        'bytes': meta['size'],
+        'etag': meta.get('etag'),
+        'cached': was_cached,
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def prefetch_track(cache, index, track):
+    entry = {'index': index, 'title': track.get('title'), 'bpm': track.get('bpm')}
+    entry.update(warm(cache, track['url']))
+    with open_audio(cache.body_path(track['url'])) as reader:
+        duration, detected = estimate_tempo(reader)
+        entry['sampleRate'] = reader.samplerate
+        entry['channels'] = reader.channels
+    entry['duration'] = round(float(duration), 3)
+    entry['detectedBpm'] = detected
+    entry['bpmMatches'] = tempo_matches(track.get('bpm'), detected)
+    if track.get('duration') is not None:
+        entry['durationMatches'] = abs(duration - float(track['duration'])) <= 1.0
+    return entry
+
+
+def prefetch_collection(cache, name, jobs=4):
+    with open(os.path.join(CONFIG_DIR, f'{name}.json')) as f:
+        config = json.load(f)
+
+    tracks = config.get('tracks', [])
+    artwork = (config.get('collection_info') or {}).get('artwork')
+    manifest = {
+        'collection': name,
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'tracks': [None] * len(tracks),
+        'artwork': None,
+        'errors': []
+    }
+
+    total = len(tracks) + (1 if artwork else 0)
+    print(f'Prefetching {total} files for {name} with {jobs} workers...')
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(prefetch_track, cache, i, track): i for i, track in enumerate(tracks)}
+        if artwork:
+            futures[pool.submit(warm, cache, artwork)] = 'artwork'
+        for done, future in enumerate(as_completed(futures), 1):
+            slot = futures[future]
+            label = 'artwork' if slot == 'artwork' else tracks[slot].get('title')
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f'[{done}/{total}] Error prefetching {label}: {e}')
+                manifest['errors'].append({'item': slot, 'error': str(e)})
+                continue
+            status = 'cached' if entry['cached'] else f'{entry["bytes"] / 1e6:.1f} MB in {entry["seconds"]:.1f}s'
+            if slot == 'artwork':
+                manifest['artwork'] = entry
+                print(f'[{done}/{total}] artwork: {status}')
+                continue
+            manifest['tracks'][slot] = entry
+            print(f'[{done}/{total}] {label}: {status}, {entry["duration"]:.1f}s, '
+                  f'config {entry["bpm"]} BPM / detected {entry["detectedBpm"]} BPM')
+            if entry['bpmMatches'] is False:
+                print(f'  Warning: detected tempo of {label} does not match the config')
+            if entry.get('durationMatches') is False:
+                print(f'  Warning: duration of {label} does not match the config')
+
+    manifest['seconds'] = round(time.perf_counter() - start, 3)
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    path = os.path.join(MANIFEST_DIR, f'{name}.json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f'Manifest written to {path} ({manifest["seconds"]:.1f}s, {len(manifest["errors"])} errors)')
+    return manifest
+
+
+def main(argv, cache):
+    parser = argparse.ArgumentParser(prog='refresh.py prefetch',
+                                     description='Warm the proxy cache for mixer collections')
+    parser.add_argument('collections', nargs='+', help='collection names (mixer/configs/<name>.json)')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='concurrent downloads')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in args.collections:
+        manifest = prefetch_collection(cache, name.lower(), args.jobs)
+        failed = failed or bool(manifest['errors'])
+    return 1 if failed else 0
@@ -0,0 +1,408 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from audio_store import parse_range, send_file_range
+import metrics
+
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = 'Mozilla/5.0'
+
+
+class Download:
+    # One upstream fetch shared by every request for the same URL
+    def __init__(self, url, key, part_path):
+        self.url = url
+        self.key = key
+        self.part_path = part_path
+        self.condition = threading.Condition()
+        self.status = None
+        self.content_type = None
+        self.content_length = None
+        self.written = 0
+        self.done = False
+        self.error = None
+        self.response = None  # Upstream response already opened by a revalidation, if any
+
+
+class ProxyCache:
+    """On-disk, size-capped cache behind the mixer's /proxy/ route.
+
+    The first request for a URL starts a background download into a .part
+    file; that request and any concurrent ones for the same URL stream from
+    the file as it grows, so upstream is only hit once. Completed entries are
+    revalidated with ETag/Last-Modified after ``max_age`` seconds and evicted
+    least recently used first once ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, root, max_bytes=2 * 1024 ** 3, max_age=3600, timeout=30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.timeout = timeout
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._downloads = {}
+        # Leftovers from downloads a crash or restart cut short
+        for entry in os.scandir(root):
+            if entry.name.endswith(('.part', '.tmp')):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(root)
+                               if entry.name.endswith('.body'))
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'collapsed': 0,
+            'revalidated': 0,
+            'passthrough': 0,
+            'upstreamFetches': 0,
+            'upstreamSeconds': 0.0,
+            'evictions': 0
+        }
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.root, f'{key}.body')
+
+    def _meta_path(self, key):
+        return os.path.join(self.root, f'{key}.json')
+
+    def _load_meta(self, key):
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+            meta['size'] = os.path.getsize(self._body_path(key))
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, key, meta):
+        tmp_path = f'{self._meta_path(key)}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(key))
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['bytes'] = self.total_bytes
+            stats['activeDownloads'] = len(self._downloads)
+        lookups = stats['hits'] + stats['misses']
+        stats['hitRate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def contains(self, url):
+        return self._load_meta(self._key(url)) is not None
+
+    def serve(self, handler, url):
+        key = self._key(url)
+        range_header = handler.headers.get('Range')
+
+        meta = self._load_meta(key)
+        response = None
+        if meta is not None:
+            valid, response = self._revalidate(url, key, meta)
+            if valid:
+                self._count('hits')
+                self._serve_cached(handler, key, meta)
+                return
+
+        if range_header:
+            # Ranges are only answered from a complete entry; while there is none (or it is
+            # still downloading) they go straight through rather than getting the whole body
+            if response is not None:
+                self._start_download(url, key, response)  # Refill the changed entry meanwhile
+            self._count('passthrough')
+            self._serve_passthrough(handler, url, range_header)
+            return
+
+        self._count('misses')
+        download = self._start_download(url, key, response)
+        self._serve_download(handler, download)
+
+    def fetch(self, url):
+        # Populate the cache without a client attached; returns the cache metadata
+        key = self._key(url)
+        meta = self._load_meta(key)
+        response = None
+        if meta is not None:
+            valid, response = self._revalidate(url, key, meta)
+            if valid:
+                return meta
+        download = self._start_download(url, key, response)
+        with download.condition:
+            while not download.done:
+                download.condition.wait()
+        if download.error is not None:
+            raise download.error
+        return self._load_meta(key)
+
+    def body_path(self, url):
+        return self._body_path(self._key(url))
+
+    def _revalidate(self, url, key, meta):
+        # (still valid, open 200 response or None); a changed resource's response
+        # becomes the download, so it isn't requested a second time
+        if time.time() - meta.get('validated', 0) < self.max_age:
+            return True, None
+
+        headers = {'User-Agent': USER_AGENT, 'Accept': '*/*'}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('lastModified'):
+            headers['If-Modified-Since'] = meta['lastModified']
+        if len(headers) == 2:
+            return False, None
+
+        try:
+            req = urllib.request.Request(url, headers=headers)
+            # 200 means the resource changed
+            return False, urllib.request.urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            e.close()
+            if e.code != 304:
+                return False, None
+        except OSError:
+            # Upstream unreachable: a stale copy beats an error
+            return True, None
+
+        meta['validated'] = time.time()
+        self._save_meta(key, meta)
+        self._count('revalidated')
+        return True, None
+
+    def _start_download(self, url, key, response=None):
+        with self._lock:
+            download = self._downloads.get(key)
+            if download is not None:
+                self.counters['collapsed'] += 1
+                if response is not None:
+                    response.close()
+                return download
+            part_path = os.path.join(self.root, f'{key}.{threading.get_ident()}.part')
+            download = Download(url, key, part_path)
+            download.response = response
+            open(part_path, 'wb').close()
+            self._downloads[key] = download
+
+        thread = threading.Thread(target=self._download, args=(download,), daemon=True)
+        thread.start()
+        return download
+
+    def _download(self, download):
+        start = time.perf_counter()
+        self._count('upstreamFetches')
+        try:
+            response, download.response = download.response, None
+            if response is None:
+                req = urllib.request.Request(download.url, headers={'User-Agent': USER_AGENT, 'Accept': '*/*'})
+                response = urllib.request.urlopen(req, timeout=self.timeout)
+            with response, open(download.part_path, 'wb') as f:
+                length = response.getheader('Content-Length')
+                with download.condition:
+                    download.status = response.status
+                    download.content_type = response.getheader('Content-Type') or 'application/octet-stream'
+                    download.content_length = int(length) if length else None
+                    download.condition.notify_all()
+                meta = {
+                    'url': download.url,
+                    'contentType': download.content_type,
+                    'etag': response.getheader('ETag'),
+                    'lastModified': response.getheader('Last-Modified'),
+                    'validated': time.time()
+                }
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    f.flush()
+                    with download.condition:
+                        download.written += len(chunk)
+                        download.condition.notify_all()
+
+            if download.content_length is not None and download.written != download.content_length:
+                raise IOError(f'Upstream sent {download.written} of {download.content_length} bytes')
+
+            os.replace(download.part_path, self._body_path(download.key))
+            self._save_meta(download.key, meta)
+            self._evict()
+        except Exception as e:
+            download.error = e
+            try:
+                os.remove(download.part_path)
+            except OSError:
+                pass
+        finally:
+            elapsed = time.perf_counter() - start
+            self._count('upstreamSeconds', elapsed)
+            metrics.observe_upstream('proxy', 'error' if download.error else download.status, elapsed,
+                                     download.written)
+            with self._lock:
+                self._downloads.pop(download.key, None)
+            with download.condition:
+                download.done = True
+                download.condition.notify_all()
+
+    def _evict(self):
+        with self._lock:
+            # Sized from disk every time: `refresh.py prefetch` fills the same
+            # directory from another process
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.name.endswith('.body'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            self.total_bytes = sum(size for _, size, _ in entries)
+            if self.total_bytes <= self.max_bytes:
+                return
+            active = set(self._downloads)
+            for _, size, path in sorted(entries):
+                if self.total_bytes <= self.max_bytes * 0.9:
+                    break
+                key = os.path.basename(path)[:-len('.body')]
+                if key in active:
+                    continue
+                try:
+                    os.remove(path)
+                    os.remove(self._meta_path(key))
+                except OSError:
+                    continue
+                self.total_bytes -= size
+                self.counters['evictions'] += 1
+
+    def _serve_cached(self, handler, key, meta):
+        size = meta['size']
+        etag = meta.get('etag')
+        if etag and handler.headers.get('If-None-Match') == etag:
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.end_headers()
+            return
+
+        byte_range = parse_range(handler.headers.get('Range'), size)
+        if byte_range is False:
+            handler.send_response(416)
+            handler.send_header('Content-Range', f'bytes */{size}')
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        start, end = byte_range or (0, size - 1)
+
+        try:
+            f = open(self._body_path(key), 'rb')
+        except OSError:
+            handler.send_error(404, 'Cached file disappeared')
+            return
+        with f:
+            # Touch so eviction treats this entry as recently used
+            os.utime(self._body_path(key))
+            handler.send_response(206 if byte_range else 200)
+            handler.send_header('Content-Type', meta['contentType'])
+            handler.send_header('Content-Length', end - start + 1 if size else 0)
+            handler.send_header('Accept-Ranges', 'bytes')
+            if etag:
+                handler.send_header('ETag', etag)
+            if meta.get('lastModified'):
+                handler.send_header('Last-Modified', meta['lastModified'])
+            if byte_range:
+                handler.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            handler.end_headers()
+            if size:
+                send_file_range(handler, f, start, end - start + 1)
+
+    def _serve_download(self, handler, download):
+        with download.condition:
+            while download.status is None and not download.done:
+                download.condition.wait()
+        if download.status is None:
+            self._send_download_error(handler, download)
+            return
+
+        try:
+            f = open(download.part_path, 'rb')
+        except FileNotFoundError:
+            # Finished (or failed) before we got here; once the metadata is
+            # written too, serve the completed entry instead
+            with download.condition:
+                while not download.done:
+                    download.condition.wait()
+            meta = self._load_meta(download.key)
+            if meta is None:
+                self._send_download_error(handler, download)
+                return
+            self._serve_cached(handler, download.key, meta)
+            return
+
+        with f:
+            handler.send_response(200)
+            handler.send_header('Content-Type', download.content_type)
+            if download.content_length is not None:
+                handler.send_header('Content-Length', download.content_length)
+            handler.end_headers()
+
+            sent = 0
+            while True:
+                with download.condition:
+                    while download.written <= sent and not download.done:
+                        download.condition.wait()
+                    available = download.written - sent
+                    finished = download.done
+                    error = download.error
+                if available > 0:
+                    data = f.read(available)
+                    handler.wfile.write(data)
+                    sent += len(data)
+                elif finished:
+                    if error is not None:
+                        # Headers are gone already; dropping the connection signals failure
+                        handler.close_connection = True
+                    return
+
+    def _send_download_error(self, handler, download):
+        # Upstream's own 4xx/5xx goes through as is (a dead Dropbox link is a 404, not a proxy failure)
+        if isinstance(download.error, urllib.error.HTTPError):
+            handler.send_error(download.error.code, f'Error proxying file: {download.error.reason}')
+        else:
+            handler.send_error(502, f'Error proxying file: {download.error}')
+
+    def _serve_passthrough(self, handler, url, range_header):
+        req = urllib.request.Request(url, headers={
+            'User-Agent': USER_AGENT,
+            'Accept': '*/*',
+            'Range': range_header
+        })
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                handler.send_response(response.status)
+                for name in ('Content-Type', 'Content-Length', 'Content-Range', 'Accept-Ranges',
+                             'ETag', 'Last-Modified'):
+                    value = response.getheader(name)
+                    if value:
+                        handler.send_header(name, value)
+                handler.end_headers()
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    handler.wfile.write(chunk)
+        except urllib.error.HTTPError as e:
+            handler.send_error(e.code, f'Error proxying file: {e.reason}')
+        except OSError as e:
+            handler.send_error(502, f'Error proxying file: {e}')
@@ -1,106 +1,142 @@
 #!/usr/bin/env python3
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from http.server import SimpleHTTPRequestHandler
+import argparse
+import hashlib
 import os
 import re
 import json
-import urllib.request
+import logging
+import threading
 import urllib.parse
 import webbrowser
-import time
 import sys
 
-class RefreshMixerHandler(SimpleHTTPRequestHandler):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pool_server import ThreadPoolHTTPServer
+from proxy_cache import ProxyCache
+from config_store import ConfigStore
+import prefetch
+import static_assets
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MIXER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+proxy_cache = ProxyCache(
+    os.getenv('MIXER_PROXY_CACHE_DIR', os.path.join(MIXER_DIR, '.proxy_cache')),
+    max_bytes=int(os.getenv('MIXER_PROXY_CACHE_BYTES', 2 * 1024 ** 3)),
+    max_age=float(os.getenv('MIXER_PROXY_CACHE_MAX_AGE', 3600))
+)
+assets = static_assets.assets_from_env(os.getcwd())
+config_store = ConfigStore(
+    os.path.join(MIXER_DIR, 'configs'),
+    poll_interval=float(os.getenv('MIXER_CONFIG_POLL_INTERVAL', 1.0))
+)
+
+metrics.register_stats('proxy_cache', proxy_cache.stats)
+metrics.register_stats('mixer_configs', config_store.stats)
+metrics.register_stats('static_assets', assets.stats)
+
+mixer_pages = {}  # collection name -> (index.html mtime_ns, content, etag)
+mixer_pages_lock = threading.Lock()
+
+
+def mixer_page(name):
+    # mixer/index.html with the collection preset, so /mixer/<name> needs no ?collection= or #hash
+    path = os.path.join(MIXER_DIR, 'index.html')
+    mtime_ns = os.stat(path).st_mtime_ns
+    with mixer_pages_lock:
+        cached = mixer_pages.get(name)
+    if cached is None or cached[0] != mtime_ns:
+        with open(path, 'rb') as f:
+            content = f.read()
+        preset = f'<head>\n    <script>window.mixerCollection = {json.dumps(name)};</script>'.encode()
+        content = content.replace(b'<head>', preset, 1)
+        cached = (mtime_ns, content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+        with mixer_pages_lock:
+            mixer_pages[name] = cached
+    return cached[1], cached[2]
+
+
+class RefreshMixerHandler(metrics.MetricsMixin, SimpleHTTPRequestHandler):
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **{
+        '.peaks': 'application/octet-stream'
+    })
+    metrics_server = 'mixer'
+    route_patterns = [
+        (r'^/proxy/', '/proxy/:url'),
+        (r'^/mixer/configs/[^/]+\.json$', '/mixer/configs/:name.json'),
+        (r'^/mixer/[^/]+/?$', '/mixer/:collection'),
+        (r'^/api/collections$', '/api/collections'),
+        (r'^/(metrics|debug/profile)$', r'/\1')
+    ]
+
     def do_GET(self):
-        print(f'Handling request for: {self.path}')
-        
+        logger.debug(f'Handling request for: {self.path}')
+        route = urllib.parse.urlsplit(self.path)
+
         # Check if this is a mixer route
-        mixer_match = re.match(r'^/mixer/([^/]+)/?$', self.path)
-        config_match = re.match(r'^/mixer/configs/([^/]+)\.json$', self.path)
+        mixer_match = re.match(r'^/mixer/([^/]+)/?$', route.path)
+        config_match = re.match(r'^/mixer/configs/([^/]+)\.json$', route.path)
         proxy_match = re.match(r'^/proxy/(.+)$', self.path)
-        
-        if mixer_match:
-            print('Serving mixer app')
-            collection_name = mixer_match.group(1)
-            print(f'Collection name: {collection_name}')
-            
-            # Check if config exists
-            config_path = os.path.join('mixer', 'configs', f'{collection_name}.json')
-            if not os.path.exists(config_path):
-                print(f'Warning: Config file not found: {config_path}')
-            
-            # Serve the mixer's index.html with refresh header
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.send_header('Refresh', '1;url=' + self.path)  # Add refresh header
-            self.end_headers()
-            
-            # Read and serve the file
-            try:
-                with open(os.path.join(os.getcwd(), 'mixer/index.html'), 'rb') as f:
-                    self.wfile.write(f.read())
-            except:
-                self.send_error(404, 'File not found')
+
+        if route.path == '/metrics':
+            self.send_metrics()
             return
-            
+
+        elif route.path == '/debug/profile':
+            self.send_profile()
+            return
+
+        elif route.path == '/api/collections':
+            content, etag = config_store.index()
+            self.send_cached(content, etag, 'application/json')
+            return
+
         elif config_match:
-            print('Serving config file')
-            config_name = config_match.group(1)
-            config_path = os.path.join('mixer', 'configs', f'{config_name}.json')
-            
-            if os.path.exists(config_path):
-                print(f'Found config file: {config_path}')
-                try:
-                    with open(config_path, 'rb') as f:
-                        content = f.read()
-                    self.send_response(200)
-                    self.send_header('Content-Type', 'application/json')
-                    self.send_header('Content-Length', len(content))
-                    self.end_headers()
-                    self.wfile.write(content)
-                    return
-                except Exception as e:
-                    print(f'Error reading config file: {e}')
-                    self.send_error(500, f'Error reading config file: {str(e)}')
-                    return
-            else:
-                print(f'Config file not found: {config_path}')
-                self.send_error(404, f'Config file not found: {config_name}')
+            entry = config_store.get(config_match.group(1))
+            if entry is None:
+                self.send_error(404, f'Config file not found: {config_match.group(1)}')
                 return
-                
+            self.send_cached(entry['content'], entry['etag'], 'application/json')
+            return
+
+        elif mixer_match and config_store.get(mixer_match.group(1)):
+            # Known collection: the mixer app with it preselected
+            content, etag = mixer_page(mixer_match.group(1).lower())
+            self.send_cached(content, etag, 'text/html')
+            return
+
         elif proxy_match:
-            print('Proxying file request')
             encoded_url = proxy_match.group(1)
             url = urllib.parse.unquote(encoded_url)
             
-            try:
-                # Create request with headers to handle redirects
-                req = urllib.request.Request(
-                    url,
-                    headers={
-                        'User-Agent': 'Mozilla/5.0',
-                        'Accept': '*/*'
-                    }
-                )
-                
-                # Open URL and follow redirects
-                with urllib.request.urlopen(req) as response:
-                    content = response.read()
-                    content_type = response.getheader('Content-Type')
-                    
-                    self.send_response(200)
-                    self.send_header('Content-Type', content_type)
-                    self.send_header('Content-Length', len(content))
-                    self.end_headers()
-                    self.wfile.write(content)
-                    return
-            except Exception as e:
-                print(f'Error proxying file: {e}')
-                self.send_error(500, f'Error proxying file: {str(e)}')
-                return
+            # Streamed through the on-disk cache; repeat loads never leave the machine
+            proxy_cache.serve(self, url)
+            return
         
-        # Handle the request normally (serve static files)
+        # Static files, with validators and precompressed variants
+        if assets.serve(self):
+            return
         return SimpleHTTPRequestHandler.do_GET(self)
 
+    def send_cached(self, content, etag, content_type):
+        # In-memory response with an ETag; clients revalidate and usually get a 304
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', len(content))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(content)
+
     def end_headers(self):
         # Add CORS headers
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -109,22 +145,37 @@ class RefreshMixerHandler(SimpleHTTPRequestHandler):
         SimpleHTTPRequestHandler.end_headers(self)
 
 def main():
-    # Start server on port 8765
-    port = 8765
-    server = HTTPServer(('localhost', port), RefreshMixerHandler)
-    print(f'Starting refresh server on port {port}...')
-    
-    # Open browser to the mixer app
-    collection = sys.argv[1] if len(sys.argv) > 1 else 'hungryghost'
-    url = f'http://localhost:{port}/mixer/{collection}'
-    webbrowser.open(url)
-    
-    # Run server for a short time to handle the refresh
-    timeout = time.time() + 5  # 5 second timeout
-    while time.time() < timeout:
-        server.handle_request()
-    
-    print('Refresh complete')
+    # `refresh.py prefetch <collection>` warms the proxy cache instead of serving
+    if len(sys.argv) > 1 and sys.argv[1] == 'prefetch':
+        sys.exit(prefetch.main(sys.argv[2:], proxy_cache))
+
+    parser = argparse.ArgumentParser(description='Serve the mixer with its collections')
+    parser.add_argument('collection', nargs='?', default='hungryghost', help='collection to open in the browser')
+    parser.add_argument('--host', default=os.getenv('MIXER_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('MIXER_PORT', 8765)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MIXER_WORKERS', 8)),
+                        help='number of worker threads handling requests')
+    parser.add_argument('--no-browser', action='store_true', help="don't open the collection in a browser")
+    parser.add_argument('--profiler', action='store_true', default=os.getenv('ENABLE_PROFILER') == '1',
+                        help='serve a sampling profile at /debug/profile?seconds=N')
+    args = parser.parse_args()
+    RefreshMixerHandler.profiler_enabled = args.profiler
+
+    server = ThreadPoolHTTPServer((args.host, args.port), RefreshMixerHandler, workers=args.workers)
+    metrics.register_stats('server', server.stats)
+    print(f'Starting mixer server on http://{args.host}:{args.port}/ '
+          f'({config_store.stats()["collections"]} collections, {args.workers} workers)...')
+    static_assets.warm_in_background(assets)
+
+    if not args.no_browser:
+        webbrowser.open(f'http://{args.host}:{args.port}/mixer/{args.collection}')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
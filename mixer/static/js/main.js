@@ -1,5 +1,7 @@
 // Utility function to format time
 const formatTime = (seconds) => {
+    // Collection tracks without a peak file have no duration until they're decoded
+    if (seconds == null || isNaN(seconds)) return '--:--';
     const mins = Math.floor(seconds / 60);
     const secs = Math.floor(seconds % 60);
     return `${mins.toString().padStart(2, '0')}:${secs.toString().padStart(2, '0')}`;
@@ -123,7 +125,50 @@ async function loadCollectionConfig(collectionName) {
 }
 
 // Function to load collection tracks
-async function loadCollectionTracks(trackConfigs, addTrackToList, loadTrackToDeck, audioProcessor) {
+// Function to load a precomputed waveform peak file (generated by mixer/peaks.py)
+async function loadTrackPeaks(collectionName, index) {
+    if (!collectionName) return null;
+    try {
+        const response = await fetch(`peaks/${collectionName.toLowerCase()}/${index}.peaks`);
+        if (!response.ok) return null;
+        return parsePeaks(await response.arrayBuffer());
+    } catch (error) {
+        console.warn('No precomputed peaks for track', index, error);
+        return null;
+    }
+}
+
+// Function to load the prefetch manifest (written by `mixer/refresh.py prefetch`)
+async function loadCollectionManifest(collectionName) {
+    if (!collectionName) return null;
+    try {
+        const response = await fetch(`manifests/${collectionName.toLowerCase()}.json`);
+        if (!response.ok) return null;
+        return await response.json();
+    } catch (error) {
+        console.warn('No prefetch manifest for collection', collectionName, error);
+        return null;
+    }
+}
+
+// Download a collection track the first time it goes to a deck; decoding is left to loadAudio
+async function fetchTrackFile(track) {
+    if (!track.file) {
+        track.loading = track.loading || fetch(track.url).then(async response => {
+            if (!response.ok) throw new Error(`Failed to load track: ${track.title}`);
+            const blob = await response.blob();
+            return new File([blob], track.title + '.mp3', { type: 'audio/mpeg' });
+        });
+        try {
+            track.file = await track.loading;
+        } finally {
+            track.loading = null;
+        }
+    }
+    return track.file;
+}
+
+async function loadCollectionTracks(trackConfigs, addTrackToList, loadTrackToDeck, audioProcessor, collectionName = null) {
     console.log('Loading collection tracks...');
     const trackList = document.getElementById('track-list');
     trackList.innerHTML = '<div class="track-item">Loading collection...</div>';
@@ -131,49 +176,27 @@ async function loadCollectionTracks(trackConfigs, addTrackToList, loadTrackToDec
     // Clear existing tracks
     tracks.length = 0;
     
-    // Create an array to store tracks in their original order
-    const loadedTracks = new Array(trackConfigs.length).fill(null);
-    
-    // Load all tracks in parallel but maintain order
-    await Promise.all(trackConfigs.map(async (trackConfig, index) => {
-        try {
-            console.log('Fetching track:', trackConfig.title);
-            const response = await fetch(trackConfig.url);
-            if (!response.ok) throw new Error(`Failed to load track: ${trackConfig.title}`);
-            
-            const blob = await response.blob();
-            const file = new File([blob], trackConfig.title + '.mp3', { type: 'audio/mpeg' });
-            
-            // Initialize audio context if needed
-            if (!audioProcessor.isInitialized) {
-                await audioProcessor.initialize();
-            }
-
-            const arrayBuffer = await file.arrayBuffer();
-            const audioBuffer = await audioProcessor.audioContext.decodeAudioData(arrayBuffer);
-            
-            // Create track object with predefined BPM from config
-            const track = {
-                file,
-                title: trackConfig.title,
-                artist: 'Unknown',
-                bpm: trackConfig.bpm,
-                duration: audioBuffer.duration,
-                buffer: audioBuffer
-            };
-            
-            // Store track in its original position
-            loadedTracks[index] = track;
-            console.log('Track loaded:', track.title, 'BPM:', track.bpm);
-        } catch (error) {
-            console.error('Error loading track:', trackConfig.title, error);
-        }
+    // The list only needs the config and the small peak files; audio is fetched
+    // and decoded when a track is loaded to a deck
+    const [manifest, allPeaks] = await Promise.all([
+        loadCollectionManifest(collectionName),
+        Promise.all(trackConfigs.map((trackConfig, index) => loadTrackPeaks(collectionName, index)))
+    ]);
+    tracks.push(...trackConfigs.map((trackConfig, index) => {
+        // Prefetched tracks come from the local proxy cache instead of Dropbox
+        const cached = manifest && manifest.tracks[index];
+        const peaks = allPeaks[index];
+        return {
+            file: null,
+            url: cached && cached.url === trackConfig.url ? cached.proxyUrl : trackConfig.url,
+            title: trackConfig.title,
+            artist: 'Unknown',
+            bpm: trackConfig.bpm,
+            duration: peaks ? peaks.duration : null,
+            peaks
+        };
     }));
     
-    // Add successfully loaded tracks to the tracks array in order
-    tracks.push(...loadedTracks.filter(track => track !== null));
-    
-    // Update track list after all tracks are loaded
     trackList.innerHTML = '';
     tracks.forEach((track, index) => {
         const trackElement = document.createElement('div');
@@ -644,8 +667,9 @@ function initializeMixer(audioProcessor) {
             trackElement.className = 'track-item';
             
             // Check if track is loaded in any deck
-            const deckA = audioProcessor.currentTrack.a === track.file ? '1' : '';
-            const deckB = audioProcessor.currentTrack.b === track.file ? '2' : '';
+            // Collection tracks have no file until they're first loaded to a deck
+            const deckA = track.file && audioProcessor.currentTrack.a === track.file ? '1' : '';
+            const deckB = track.file && audioProcessor.currentTrack.b === track.file ? '2' : '';
             const deckIndicator = deckA || deckB;
             
             // Ensure BPM is a number and has a valid value
@@ -668,12 +692,12 @@ function initializeMixer(audioProcessor) {
                     if (!isNaN(parsedBPM) && parsedBPM > 0) {
                         track.bpm = parsedBPM;
                         // Update BPM in deck if this track is loaded
-                        if (audioProcessor.currentTrack.a === track.file) {
+                        if (track.file && audioProcessor.currentTrack.a === track.file) {
                             audioProcessor.bpm.a = parsedBPM;
                             const bpmDisplayA = document.getElementById('bpm-a');
                             if (bpmDisplayA) bpmDisplayA.textContent = parsedBPM.toFixed(1);
                         }
-                        if (audioProcessor.currentTrack.b === track.file) {
+                        if (track.file && audioProcessor.currentTrack.b === track.file) {
                             audioProcessor.bpm.b = parsedBPM;
                             const bpmDisplayB = document.getElementById('bpm-b');
                             if (bpmDisplayB) bpmDisplayB.textContent = parsedBPM.toFixed(1);
@@ -760,6 +784,10 @@ function initializeMixer(audioProcessor) {
             // Clear existing waveform and reset state
             if (waveforms[deck]) {
                 waveforms[deck].clear();
+                // Show precomputed peaks right away while the audio loads
+                if (track.peaks) {
+                    waveforms[deck].drawPeaks(track.peaks);
+                }
             }
 
             // Reset audio processor state for this deck
@@ -770,8 +798,9 @@ function initializeMixer(audioProcessor) {
             audioProcessor.cuePoints[deck] = 0;
             audioProcessor.playbackRate[deck] = 1;
             
-            // Load the new audio
-            const audioBuffer = await audioProcessor.loadAudio(deck, track.file);
+            // Load the new audio (collection tracks are downloaded on first use)
+            const audioBuffer = await audioProcessor.loadAudio(deck, await fetchTrackFile(track));
+            track.duration = audioBuffer.duration;
             
             // Draw new waveform only after loading is complete
             if (waveforms[deck]) {
@@ -2044,7 +2073,7 @@ function initializeMixer(audioProcessor) {
         
         const footer = '\n' + '='.repeat(70) + '\n' +
                       `Total Tracks: ${tracks.length}\n` +
-                      `Total Duration: ${formatTime(tracks.reduce((sum, track) => sum + track.duration, 0))}`;
+                      `Total Duration: ${formatTime(tracks.reduce((sum, track) => sum + (track.duration || 0), 0))}`;
         
         const content = header + trackList + footer;
         
@@ -2106,7 +2135,7 @@ window.addEventListener('load', async () => {
         console.log('Loading collection:', collectionName);
         const config = await loadCollectionConfig(collectionName);
         if (config && config.tracks) {
-            await loadCollectionTracks(config.tracks, mixer.addTrackToList, mixer.loadTrackToDeck, audioProcessor);
+            await loadCollectionTracks(config.tracks, mixer.addTrackToList, mixer.loadTrackToDeck, audioProcessor, collectionName);
         }
     }
 });
@@ -2120,7 +2149,7 @@ window.addEventListener('hashchange', async () => {
         
         const config = await loadCollectionConfig(collectionName);
         if (config && config.tracks) {
-            await loadCollectionTracks(config.tracks, mixer.addTrackToList, mixer.loadTrackToDeck, audioProcessor);
+            await loadCollectionTracks(config.tracks, mixer.addTrackToList, mixer.loadTrackToDeck, audioProcessor, collectionName);
         }
     }
 }); 
\ No newline at end of file
@@ -80,6 +80,8 @@ class Waveform {
             this.setupCanvas();
             if (this.audioBuffer) {
                 this.drawWaveform(this.audioBuffer);
+            } else if (this.peaks) {
+                this.drawPeaks(this.peaks);
             }
         });
 
@@ -363,49 +365,51 @@ class Waveform {
         this.detailCanvas.style.display = 'block';
     }
 
-    preCalculateWaveformData() {
-        const data = this.audioBuffer.getChannelData(0);
-        const overviewWidth = this.overviewCanvas.width / (window.devicePixelRatio || 1);
-        const detailWidth = this.detailCanvas.width / (window.devicePixelRatio || 1);
-        const duration = this.audioBuffer.duration;
-        const sampleRate = this.audioBuffer.sampleRate;
-        const totalSamples = data.length;
+    drawPeaks(peaks) {
+        // Draw from a precomputed peak file before (or instead of) decoding the audio
+        if (!peaks) return;
 
-        // Calculate samples per pixel to ensure we cover the entire duration
-        const overviewSamplesPerPixel = Math.floor(totalSamples / overviewWidth);
-        const detailSamplesPerPixel = Math.floor(totalSamples / detailWidth);
+        this.peaks = peaks;
+        this.setupCanvas();
+        this.preCalculateWaveformData();
+        this.drawOverviewWaveform();
+        this.drawDetailWaveform();
+        this.updatePositions(0);
+        this.overviewCanvas.style.display = 'block';
+        this.detailCanvas.style.display = 'block';
+    }
 
-        // Calculate overview data
-        this.overviewData = new Array(Math.ceil(overviewWidth));
-        
-        for (let i = 0; i < overviewWidth; i++) {
-            let min = 1.0;
-            let max = -1.0;
-            const startSample = Math.floor(i * overviewSamplesPerPixel);
-            const endSample = Math.min(startSample + overviewSamplesPerPixel, totalSamples);
-            
-            if (startSample < totalSamples) {
-                for (let j = startSample; j < endSample; j++) {
-                    const datum = data[j];
-                    if (datum < min) min = datum;
-                    if (datum > max) max = datum;
+    calculateColumns(columns, totalSamples, data) {
+        const samplesPerPixel = Math.floor(totalSamples / columns);
+        const result = new Array(columns);
+
+        if (!data && this.peaks) {
+            // Pick the coarsest pyramid level that still has a peak per pixel
+            let level = this.peaks.levels[0];
+            for (const candidate of this.peaks.levels) {
+                if (candidate.samplesPerPeak <= samplesPerPixel) level = candidate;
+            }
+            for (let i = 0; i < columns; i++) {
+                let min = 1.0;
+                let max = -1.0;
+                const first = Math.floor(i * samplesPerPixel / level.samplesPerPeak);
+                const last = Math.max(first + 1, Math.floor((i + 1) * samplesPerPixel / level.samplesPerPeak));
+                for (let j = first; j < last && j < level.count; j++) {
+                    const peakMin = level.data[j * 2] / 127;
+                    const peakMax = level.data[j * 2 + 1] / 127;
+                    if (peakMin < min) min = peakMin;
+                    if (peakMax > max) max = peakMax;
                 }
+                result[i] = { min, max };
             }
-            
-            this.overviewData[i] = { min, max };
+            return result;
         }
 
-        // Calculate detail data
-        // Ensure we have enough pixels to represent the entire duration
-        const requiredDetailWidth = Math.ceil(detailWidth * (duration / 60)); // Scale based on duration
-        this.detailData = new Array(requiredDetailWidth);
-        const adjustedDetailSamplesPerPixel = Math.floor(totalSamples / requiredDetailWidth);
-        
-        for (let i = 0; i < requiredDetailWidth; i++) {
+        for (let i = 0; i < columns; i++) {
             let min = 1.0;
             let max = -1.0;
-            const startSample = Math.floor(i * adjustedDetailSamplesPerPixel);
-            const endSample = Math.min(startSample + adjustedDetailSamplesPerPixel, totalSamples);
+            const startSample = Math.floor(i * samplesPerPixel);
+            const endSample = Math.min(startSample + samplesPerPixel, totalSamples);
             
             if (startSample < totalSamples) {
                 for (let j = startSample; j < endSample; j++) {
@@ -415,8 +419,26 @@ class Waveform {
                 }
             }
             
-            this.detailData[i] = { min, max };
+            result[i] = { min, max };
         }
+        return result;
+    }
+
+    preCalculateWaveformData() {
+        // Precomputed peaks avoid walking the decoded buffer entirely
+        const data = this.peaks ? null : this.audioBuffer.getChannelData(0);
+        const overviewWidth = this.overviewCanvas.width / (window.devicePixelRatio || 1);
+        const detailWidth = this.detailCanvas.width / (window.devicePixelRatio || 1);
+        const duration = this.peaks ? this.peaks.duration : this.audioBuffer.duration;
+        const totalSamples = this.peaks ? this.peaks.frames : data.length;
+
+        // Calculate overview data
+        this.overviewData = this.calculateColumns(Math.ceil(overviewWidth), totalSamples, data);
+
+        // Calculate detail data
+        // Ensure we have enough pixels to represent the entire duration
+        const requiredDetailWidth = Math.ceil(detailWidth * (duration / 60)); // Scale based on duration
+        this.detailData = this.calculateColumns(requiredDetailWidth, totalSamples, data);
 
         // Update detail canvas width to match the required width
         const dpr = window.devicePixelRatio || 1;
@@ -603,6 +625,7 @@ class Waveform {
 
         // Reset state
         this.audioBuffer = null;
+        this.peaks = null;
         this.overviewData = null;
         this.detailData = null;
         this.loopStart = null;
@@ -618,4 +641,31 @@ class Waveform {
         this.overviewCanvas.style.display = 'none';
         this.detailCanvas.style.display = 'none';
     }
-} 
\ No newline at end of file
+} 
+
+// Parse a .peaks file written by mixer/peaks.py
+function parsePeaks(arrayBuffer) {
+    const view = new DataView(arrayBuffer);
+    const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== 'LPKS' || view.getUint16(4, true) !== 1) {
+        throw new Error('Unsupported peak file');
+    }
+
+    const levelCount = view.getUint16(6, true);
+    const sampleRate = view.getUint32(8, true);
+    const frames = view.getUint32(12, true);
+    const levels = [];
+    for (let i = 0; i < levelCount; i++) {
+        const base = 16 + i * 12;
+        const samplesPerPeak = view.getUint32(base, true);
+        const count = view.getUint32(base + 4, true);
+        const offset = view.getUint32(base + 8, true);
+        levels.push({
+            samplesPerPeak,
+            count,
+            data: new Int8Array(arrayBuffer, offset, count * 2)
+        });
+    }
+
+    return { sampleRate, frames, duration: frames / sampleRate, levels };
+}
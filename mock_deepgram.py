@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# Local stand-in for the Deepgram /v1/listen endpoint.
+#
+#   python mock_deepgram.py --port 8766 --delay 0.5
+#   DEEPGRAM_URL=http://localhost:8766/v1/listen DEEPGRAM_API_KEY=test python server.py
+#
+# GET /stats reports connection and concurrency counters so pooling can be checked offline.
+#
+# With --words the audio is decoded and every tone burst becomes a word named
+# after its frequency (see tone_words), with start/end times, so segmented
+# transcription and stitching can be checked against a known word sequence.
+# --realtime-factor adds that many seconds of delay per second of audio.
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import io
+import json
+import random
+import threading
+import time
+
+import numpy as np
+
+from multipart_stream import request_body_reader
+
+try:
+    import soundfile
+except ImportError:  # optional: only --words and --realtime-factor decode the audio
+    soundfile = None
+
+
+def tone_words(samples, samplerate):
+    # One word per burst of sound: 10 ms frames above -40 dBFS, at least 50 ms long,
+    # named by the burst's peak frequency rounded to 20 Hz
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+    frame = max(samplerate // 100, 1)
+    count = len(mono) // frame
+    energy = (mono[:count * frame].reshape(count, frame) ** 2).mean(axis=1)
+    active = np.concatenate([[False], energy > 1e-4, [False]])
+    edges = np.flatnonzero(active[1:] != active[:-1])
+    words = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start < 5:
+            continue
+        burst = mono[start * frame:end * frame]
+        spectrum = np.abs(np.fft.rfft(burst * np.hanning(len(burst))))
+        frequency = np.argmax(spectrum) * samplerate / len(burst)
+        word = str(int(round(frequency / 20) * 20))
+        words.append({
+            'word': word,
+            'punctuated_word': word,
+            'start': round(start * frame / samplerate, 3),
+            'end': round(end * frame / samplerate, 3),
+            'confidence': 0.99
+        })
+    return words
+
+
+class MockDeepgramHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.counters['connections'] += 1
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, data):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', len(content))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.server.lock:
+                self.send_json(200, dict(self.server.counters))
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if not self.path.startswith('/v1/listen'):
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        body = request_body_reader(self.rfile, self.headers)
+        decode = self.server.words or self.server.realtime_factor
+        received = 0
+        chunks = []
+        while True:
+            data = body.read()
+            if not data:
+                break
+            received += len(data)
+            if decode:
+                chunks.append(data)
+
+        words = None
+        duration = 0.0
+        if decode and soundfile is not None:
+            try:
+                samples, samplerate = soundfile.read(io.BytesIO(b''.join(chunks)), dtype='float32')
+                duration = len(samples) / samplerate
+                if self.server.words:
+                    words = tone_words(samples, samplerate)
+            except RuntimeError:
+                pass  # Not audio soundfile can read: answer like the plain mock
+
+        counters = self.server.counters
+        with self.server.lock:
+            counters['requests'] += 1
+            counters['bytes'] += received
+            counters['inFlight'] += 1
+            counters['maxInFlight'] = max(counters['maxInFlight'], counters['inFlight'])
+        try:
+            time.sleep(self.server.delay + duration * self.server.realtime_factor)
+            if random.random() < self.server.fail_rate:
+                with self.server.lock:
+                    counters['failures'] += 1
+                self.send_json(503, {'error': 'Simulated upstream failure'})
+                return
+            self.send_json(200, {
+                'metadata': {'request_id': f'mock-{counters["requests"]}'},
+                'results': {
+                    'channels': [{
+                        'alternatives': [{
+                            'transcript': ' '.join(word['word'] for word in words) if words is not None
+                            else f'mock transcript of {received} bytes',
+                            'confidence': 0.99,
+                            'words': words or []
+                        }]
+                    }]
+                }
+            })
+        finally:
+            with self.server.lock:
+                counters['inFlight'] -= 1
+
+
+def start_mock_server(port=0, delay=0.0, fail_rate=0.0, verbose=False, words=False, realtime_factor=0.0):
+    # Start the mock in a background thread; returns (server, base_url)
+    server = ThreadingHTTPServer(('localhost', port), MockDeepgramHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.words = words
+    server.realtime_factor = realtime_factor
+    server.fail_rate = fail_rate
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.counters = {
+        'connections': 0,
+        'requests': 0,
+        'bytes': 0,
+        'failures': 0,
+        'inFlight': 0,
+        'maxInFlight': 0
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://localhost:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Deepgram transcription endpoint')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--delay', type=float, default=0.5, help='seconds to wait before answering')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--words', action='store_true', help='decode the audio and answer with one word per tone burst')
+    parser.add_argument('--realtime-factor', type=float, default=0.0,
+                        help='extra seconds of delay per second of audio')
+    args = parser.parse_args()
+
+    server, url = start_mock_server(args.port, args.delay, args.fail_rate, verbose=True,
+                                    words=args.words, realtime_factor=args.realtime_factor)
+    print(f'Mock Deepgram listening on {url}/v1/listen')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
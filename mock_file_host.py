@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Local stand-in for the hosts the mixer proxies tracks from (/proxy/<url>).
+#
+#   python mock_file_host.py --port 8767 --files 8 --size-kb 4096
+#   curl localhost:8765/proxy/http%3A%2F%2Flocalhost%3A8767%2Ftrack0.mp3
+#
+# Serves /track<i>.mp3 with deterministic bodies, ETag/Last-Modified (and 304s),
+# and single byte ranges. The query string is ignored, so ?n=<anything> gives a
+# cold proxy-cache miss for the same bytes. GET /stats reports counters.
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+from audio_store import parse_range
+
+CHUNK_SIZE = 64 * 1024
+
+
+class MockFileHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def count(self, name, amount=1):
+        with self.server.lock:
+            self.server.counters[name] += amount
+
+    def send_json(self, status, data):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', len(content))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/stats':
+            with self.server.lock:
+                self.send_json(200, dict(self.server.counters))
+            return
+        match = re.match(r'^/track(\d+)\.mp3$', path)
+        if not match or int(match.group(1)) >= len(self.server.files):
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        body, etag = self.server.files[int(match.group(1))]
+        self.count('requests')
+        if self.headers.get('If-None-Match') == etag:
+            self.count('notModified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        start, end = 0, len(body) - 1
+        byte_range = parse_range(self.headers.get('Range'), len(body))
+        if byte_range is False:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{len(body)}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if byte_range:
+            start, end = byte_range
+            self.count('rangeRequests')
+
+        time.sleep(self.server.delay)
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Content-Length', end - start + 1)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.server.last_modified)
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        view = memoryview(body)
+        try:
+            for offset in range(start, end + 1, CHUNK_SIZE):
+                chunk = view[offset:min(offset + CHUNK_SIZE, end + 1)]
+                self.wfile.write(chunk)
+                self.count('bytes', len(chunk))
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+def track_body(index, size):
+    # Deterministic stand-in bytes: an ID3 tag header followed by noise
+    return b'ID3\x04\x00\x00\x00\x00\x00\x00' + random.Random(index).randbytes(max(size - 10, 0))
+
+
+def start_file_host(port=0, files=8, size_kb=4096, delay=0.0, verbose=False):
+    # Start the host in a background thread; returns (server, base_url)
+    server = ThreadingHTTPServer(('localhost', port), MockFileHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.last_modified = formatdate(time.time(), usegmt=True)
+    server.files = []
+    for i in range(files):
+        body = track_body(i, size_kb * 1024)
+        server.files.append((body, f'"{hashlib.sha256(body).hexdigest()[:16]}"'))
+    server.counters = {
+        'requests': 0,
+        'rangeRequests': 0,
+        'notModified': 0,
+        'bytes': 0
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://localhost:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock host for proxied mixer tracks')
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--files', type=int, default=8, help='tracks served as /track0.mp3 ...')
+    parser.add_argument('--size-kb', type=int, default=4096, help='size of each track')
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait before each response body')
+    args = parser.parse_args()
+
+    server, url = start_file_host(args.port, args.files, args.size_kb, args.delay, verbose=True)
+    print(f'Mock file host serving {url}/track0.mp3 .. /track{args.files - 1}.mp3')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+import re
+
+CHUNK_SIZE = 64 * 1024
+MAX_HEADER_SIZE = 16 * 1024
+
+_boundary_re = re.compile(r'boundary=(?:"([^"]+)"|([^;\s]+))', re.IGNORECASE)
+_param_re = re.compile(r';\s*([\w-]+)=(?:"([^"]*)"|([^;\s]*))')
+
+
+class LengthBodyReader:
+    # Reads exactly Content-Length bytes from the request stream
+    def __init__(self, rfile, length):
+        self.rfile = rfile
+        self.remaining = length
+
+    def read(self, size=CHUNK_SIZE):
+        if self.remaining <= 0:
+            return b''
+        data = self.rfile.read(min(size, self.remaining))
+        if not data:
+            raise ValueError('Request body ended before Content-Length bytes were read')
+        self.remaining -= len(data)
+        return data
+
+
+class ChunkedBodyReader:
+    # Decodes a Transfer-Encoding: chunked request stream
+    def __init__(self, rfile):
+        self.rfile = rfile
+        self.remaining = 0
+        self.done = False
+
+    def read(self, size=CHUNK_SIZE):
+        if self.done:
+            return b''
+        if self.remaining == 0:
+            line = self.rfile.readline(1024)
+            try:
+                chunk_size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise ValueError(f'Invalid chunk size line: {line!r}')
+            if chunk_size == 0:
+                # Skip any trailer headers up to the terminating blank line
+                while line not in (b'\r\n', b'\n', b''):
+                    line = self.rfile.readline(MAX_HEADER_SIZE)
+                self.done = True
+                return b''
+            self.remaining = chunk_size
+        data = self.rfile.read(min(size, self.remaining))
+        if not data:
+            raise ValueError('Request body ended inside a chunk')
+        self.remaining -= len(data)
+        if self.remaining == 0:
+            self.rfile.readline(1024)  # CRLF closing the chunk
+        return data
+
+
+def request_body_reader(rfile, headers):
+    if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        return ChunkedBodyReader(rfile)
+    return LengthBodyReader(rfile, int(headers.get('Content-Length', 0)))
+
+
+def multipart_boundary(content_type):
+    if not content_type.lower().startswith('multipart/'):
+        return None
+    match = _boundary_re.search(content_type)
+    if not match:
+        return None
+    return (match.group(1) or match.group(2)).encode()
+
+
+def copy_stream(reader, fileobj, chunk_size=CHUNK_SIZE):
+    total = 0
+    while True:
+        data = reader.read(chunk_size)
+        if not data:
+            return total
+        fileobj.write(data)
+        total += len(data)
+
+
+class MultipartPart:
+    def __init__(self, parser, headers):
+        self.parser = parser
+        self.headers = headers
+        self.content_type = headers.get('content-type', '').strip()
+        disposition = headers.get('content-disposition', '')
+        params = {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3)
+                  for m in _param_re.finditer(disposition)}
+        self.name = params.get('name')
+        self.filename = params.get('filename')
+        self.finished = False
+
+    def read(self, size=CHUNK_SIZE):
+        if self.finished:
+            return b''
+        data = self.parser._read_part_data(size)
+        if not data:
+            self.finished = True
+        return data
+
+    def copy_to(self, fileobj, chunk_size=CHUNK_SIZE):
+        return copy_stream(self, fileobj, chunk_size)
+
+    def drain(self):
+        while self.read():
+            pass
+
+
+class MultipartParser:
+    """Boundary-aware multipart/form-data reader over a byte stream.
+
+    Only a window of roughly one chunk plus the delimiter is buffered, so part
+    bodies of any size can be copied out without holding them in memory.
+    """
+
+    def __init__(self, stream, boundary, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.delimiter = b'\r\n--' + boundary
+        # Prefix a CRLF so the opening boundary matches the same delimiter as the rest
+        self.buffer = bytearray(b'\r\n')
+        self.eof = False
+        self.done = False
+        self.current = None
+
+    def _fill(self):
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer += data
+        return True
+
+    def _read_part_data(self, size):
+        keep = len(self.delimiter) - 1
+        while True:
+            index = self.buffer.find(self.delimiter)
+            if index == 0:
+                return b''
+            if index > 0:
+                available = index
+            else:
+                # Hold back enough bytes that a delimiter split across reads is still found
+                available = len(self.buffer) - keep
+            if available > 0:
+                data = bytes(self.buffer[:min(size, available)])
+                del self.buffer[:len(data)]
+                return data
+            if not self._fill():
+                raise ValueError('Multipart body ended before the closing boundary')
+
+    def _skip_to_delimiter(self):
+        keep = len(self.delimiter) - 1
+        while True:
+            index = self.buffer.find(self.delimiter)
+            if index >= 0:
+                del self.buffer[:index + len(self.delimiter)]
+                return
+            if len(self.buffer) > keep:
+                del self.buffer[:len(self.buffer) - keep]
+            if not self._fill():
+                raise ValueError('Multipart body ended before the closing boundary')
+
+    def _read_until(self, marker, limit):
+        while True:
+            index = self.buffer.find(marker)
+            if index >= 0:
+                data = bytes(self.buffer[:index])
+                del self.buffer[:index + len(marker)]
+                return data
+            if len(self.buffer) > limit:
+                raise ValueError('Multipart part headers are too large')
+            if not self._fill():
+                raise ValueError('Multipart body ended inside part headers')
+
+    def next_part(self):
+        if self.done:
+            return None
+        if self.current is not None:
+            self.current.drain()
+        self._skip_to_delimiter()
+
+        while len(self.buffer) < 2:
+            if not self._fill():
+                raise ValueError('Multipart body ended after a boundary')
+        if self.buffer[:2] == b'--':
+            self.done = True
+            return None
+        # Rest of the boundary line (transport padding) then the part headers
+        self._read_until(b'\r\n', 1024)
+        while len(self.buffer) < 2 and self._fill():
+            pass
+        if self.buffer[:2] == b'\r\n':
+            raw_headers = b''
+            del self.buffer[:2]
+        else:
+            raw_headers = self._read_until(b'\r\n\r\n', MAX_HEADER_SIZE)
+
+        headers = {}
+        for line in raw_headers.decode('latin-1').split('\r\n'):
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        self.current = MultipartPart(self, headers)
+        return self.current
+
+    def __iter__(self):
+        while True:
+            part = self.next_part()
+            if part is None:
+                return
+            yield part
+
+    def drain(self):
+        # Consume the rest of the body so the client sees a clean response
+        for _ in self:
+            pass
+        while self._fill():
+            del self.buffer[:]
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# Whole-recording pitch tracking and tuning statistics, mirroring the tuner's
+# PitchDetector (tuner/static/js/pitchDetector.js).
+#
+#   python pitch.py take.wav --range guitar --a4 440
+#
+# YIN runs on a batch of frames at a time: frames are strided views of the
+# signal copied into a preallocated matrix, and the difference function of
+# every frame comes out of one batched FFT instead of an O(N^2) loop each.
+import argparse
+import json
+import math
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft as sp_fft
+
+from audio_io import open_audio
+
+NOTES = ['C', 'C♯', 'D', 'D♯', 'E', 'F', 'F♯', 'G', 'G♯', 'A', 'A♯', 'B']
+A4_INDEX = 69
+
+# FILTER_RANGES from tuner/static/js/main.js
+RANGES = {
+    'normal': {'min': 20, 'max': 4000, 'clarityThreshold': 0.8},
+    'voice': {'min': 60, 'max': 1000, 'clarityThreshold': 0.85},
+    'guitar': {'min': 60, 'max': 1200, 'clarityThreshold': 0.8},
+    'bass': {'min': 30, 'max': 400, 'clarityThreshold': 0.8}
+}
+
+# 'js' reproduces PitchDetector.detectPitch (Hann window, lowest normalized
+# difference under the threshold, integer lag). 'yin' is de Cheveigné & Kawahara:
+# first dip under the threshold, parabolic interpolation, no window.
+MODES = ('js', 'yin')
+YIN_THRESHOLD = 0.15
+
+FRAME_SIZE = 2048
+HOP = 512
+MAX_HOP = 65536  # Larger hops leave too few frames to say anything about pitch
+BATCH_FRAMES = 512
+SILENCE_DB = -70  # SETTINGS.silenceThreshold
+PEAK_THRESHOLD = 0.001  # SETTINGS.peakThreshold
+
+
+def note_info(frequency, a4=440.0):
+    # getNoteInfo() from the JS
+    midi = 12 * math.log2(frequency / a4) + A4_INDEX
+    rounded = round(midi)
+    return {
+        'note': NOTES[rounded % 12],
+        'octave': (rounded - 12) // 12,
+        'cents': round((midi - rounded) * 100)
+    }
+
+
+class PitchTracker:
+    """Streaming YIN over fixed frames of a mono signal.
+
+    ``process`` accepts blocks of any length, shaped (frames, channels) or
+    (frames,); channels are averaged. ``result()`` returns the per-frame
+    track as arrays and the tuning summary.
+    """
+
+    def __init__(self, samplerate, mode='js', frequency_range='normal', a4=440.0, frame_size=FRAME_SIZE,
+                 hop=HOP, batch_frames=BATCH_FRAMES):
+        if mode not in MODES:
+            raise ValueError(f'Unknown pitch mode: {mode}')
+        if frequency_range not in RANGES:
+            raise ValueError(f'Unknown frequency range: {frequency_range}')
+        self.samplerate = samplerate
+        self.mode = mode
+        self.range = RANGES[frequency_range]
+        self.a4 = a4
+        self.frame_size = frame_size
+        self.hop = hop
+        self.half = frame_size // 2
+        self.min_tau = max(1, int(samplerate / self.range['max']))
+        self.max_tau = min(self.half, math.ceil(samplerate / self.range['min']))
+
+        # Work buffers reused for every batch
+        self.batch_frames = batch_frames
+        self.frames = np.empty((batch_frames, frame_size), dtype=np.float32)
+        self.fft_size = sp_fft.next_fast_len(frame_size + self.half, real=True)
+        self.taus = np.arange(self.half, dtype=np.float32)
+        self.window = (0.5 * (1 - np.cos(2 * np.pi * np.arange(frame_size) / (frame_size - 1)))).astype(np.float32)
+
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+        self.frequencies = []
+        self.clarities = []
+
+    def process(self, block):
+        mono = block.mean(axis=1, dtype=np.float32) if block.ndim == 2 else block.astype(np.float32)
+        self.samples += len(mono)
+        data = np.concatenate([self.pending, mono]) if len(self.pending) else mono
+        count = (len(data) - self.frame_size) // self.hop + 1 if len(data) >= self.frame_size else 0
+        if count:
+            view = sliding_window_view(data, self.frame_size)[::self.hop][:count]
+            for start in range(0, count, self.batch_frames):
+                self._analyze(view[start:start + self.batch_frames])
+        self.pending = data[count * self.hop:].copy()
+
+    def _analyze(self, view):
+        n = len(view)
+        frames = self.frames[:n]
+        raw_peak = np.abs(view).max(axis=1)
+        np.copyto(frames, view)
+        rms_db = 10 * np.log10(np.maximum(np.einsum('ij,ij->i', frames, frames) / self.frame_size, 1e-20))
+        if self.mode == 'js':
+            frames *= self.window
+
+        # d(tau) = sum_i (x[i] - x[i + tau])^2 over the first half, via energies and one FFT correlation
+        spectrum_head = sp_fft.rfft(frames[:, :self.half], self.fft_size, axis=1)
+        spectrum = sp_fft.rfft(frames, self.fft_size, axis=1)
+        correlation = sp_fft.irfft(np.conj(spectrum_head) * spectrum, self.fft_size, axis=1)[:, :self.half]
+        squares = np.cumsum(frames.astype(np.float64) ** 2, axis=1)
+        squares = np.concatenate([np.zeros((n, 1)), squares], axis=1)
+        head_energy = squares[:, self.half:self.half + 1]
+        shifted_energy = squares[:, self.half:2 * self.half] - squares[:, :self.half]
+        difference = head_energy + shifted_energy - 2 * correlation
+        np.maximum(difference, 0, out=difference)
+
+        # Cumulative mean normalized difference
+        running = np.cumsum(difference[:, 1:], axis=1)
+        cmnd = np.ones_like(difference)
+        np.divide(difference[:, 1:] * self.taus[1:], running, out=cmnd[:, 1:], where=running > 0)
+
+        search = cmnd[:, self.min_tau:self.max_tau]
+        rows = np.arange(n)
+        if self.mode == 'js':
+            # absoluteThreshold(): lowest value under the threshold anywhere in range
+            masked = np.where(search < self.range['clarityThreshold'], search, np.inf)
+            index = np.argmin(masked, axis=1)
+            found = np.isfinite(masked[rows, index])
+            tau = (index + self.min_tau).astype(np.float64)
+            value = search[rows, index]
+        else:
+            # First dip under the threshold, then down to its local minimum
+            below = search < YIN_THRESHOLD
+            found = below.any(axis=1)
+            index = np.where(found, np.argmax(below, axis=1), np.argmin(search, axis=1))
+            last = search.shape[1] - 1
+            while True:
+                step = (index < last) & (search[rows, np.minimum(index + 1, last)] < search[rows, index])
+                if not step.any():
+                    break
+                index += step
+            value = search[rows, index]
+            tau = (index + self.min_tau).astype(np.float64)
+            inner = (index > 0) & (index < last)
+            left = search[rows, np.maximum(index - 1, 0)]
+            right = search[rows, np.minimum(index + 1, last)]
+            denominator = left - 2 * value + right
+            shift = np.where(inner & (denominator > 0), 0.5 * (left - right) / np.where(denominator > 0, denominator, 1), 0)
+            tau += shift
+
+        clarity = 1 - value
+        frequency = self.samplerate / tau
+        voiced = (found & (clarity >= self.range['clarityThreshold'])
+                  & (frequency >= self.range['min']) & (frequency <= self.range['max'])
+                  & ((rms_db > SILENCE_DB) | (raw_peak > PEAK_THRESHOLD)))
+        self.frequencies.append(np.where(voiced, frequency, np.nan))
+        self.clarities.append(np.where(voiced, clarity, 0.0))
+
+    def result(self, include_track=True):
+        frequencies = np.concatenate(self.frequencies) if self.frequencies else np.zeros(0)
+        clarities = np.concatenate(self.clarities) if self.clarities else np.zeros(0)
+        voiced = ~np.isnan(frequencies)
+        summary = {
+            'mode': self.mode,
+            'sampleRate': self.samplerate,
+            'duration': self.samples / self.samplerate,
+            'frames': int(len(frequencies)),
+            'hopSeconds': self.hop / self.samplerate,
+            'voicedFrames': int(voiced.sum()),
+            'a4': self.a4
+        }
+        summary.update(tuning_stats(frequencies[voiced], clarities[voiced], self.a4))
+        if include_track:
+            # Frame times are frame centres; unvoiced frames are null
+            summary['track'] = {
+                'time': np.round((np.arange(len(frequencies)) * self.hop + self.frame_size / 2) / self.samplerate, 4).tolist(),
+                'frequency': [None if math.isnan(f) else round(float(f), 3) for f in frequencies],
+                'clarity': np.round(clarities, 4).tolist()
+            }
+        return summary
+
+
+def tuning_stats(frequencies, clarities, a4=440.0):
+    # How far the voiced frames sit from equal temperament at ``a4``
+    if len(frequencies) == 0:
+        return {'centsMedian': None, 'centsMean': None, 'centsStd': None, 'withinFiveCents': None,
+                'estimatedA4': None, 'notes': {}}
+    midi = 12 * np.log2(frequencies / a4) + A4_INDEX
+    rounded = np.round(midi).astype(int)
+    cents = (midi - rounded) * 100
+    weights = clarities / clarities.sum()
+    median = float(np.median(cents))
+    names, counts = np.unique(rounded, return_counts=True)
+    notes = {f'{NOTES[m % 12]}{(m - 12) // 12}': int(c) for m, c in sorted(zip(names, counts), key=lambda x: -x[1])}
+    return {
+        'centsMedian': round(median, 2),
+        'centsMean': round(float(np.dot(weights, cents)), 2),
+        'centsStd': round(float(np.sqrt(np.dot(weights, (cents - np.dot(weights, cents)) ** 2))), 2),
+        'withinFiveCents': round(float(np.mean(np.abs(cents) <= 5)), 4),
+        # Reference pitch that would put the median frame dead on
+        'estimatedA4': round(a4 * 2 ** (median / 1200), 2),
+        'notes': notes
+    }
+
+
+def analyze_file(path, mode='js', frequency_range='normal', a4=440.0, hop=HOP, include_track=True):
+    start = time.perf_counter()
+    with open_audio(path) as reader:
+        tracker = PitchTracker(reader.samplerate, mode, frequency_range, a4, hop=hop)
+        for block in reader.blocks():
+            tracker.process(block)
+    result = tracker.result(include_track)
+    elapsed = time.perf_counter() - start
+    result['seconds'] = round(elapsed, 3)
+    result['realtimeFactor'] = round(result['duration'] / elapsed, 1) if elapsed else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pitch track and tuning summary for a recording')
+    parser.add_argument('path')
+    parser.add_argument('--mode', choices=MODES, default='js')
+    parser.add_argument('--range', choices=sorted(RANGES), default='normal')
+    parser.add_argument('--a4', type=float, default=440.0)
+    parser.add_argument('--hop', type=int, default=HOP)
+    parser.add_argument('--track', action='store_true', help='include the per-frame track')
+    args = parser.parse_args()
+    try:
+        result = analyze_file(args.path, args.mode, args.range, args.a4, args.hop, args.track)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+from http.server import HTTPServer
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Response sent straight onto the socket when the accept queue is full.
+# Written by hand because no handler instance exists for a rejected request.
+REJECT_RESPONSE = (
+    b'HTTP/1.0 503 Service Unavailable\r\n'
+    b'Content-Type: text/plain\r\n'
+    b'Content-Length: 20\r\n'
+    b'Retry-After: 1\r\n'
+    b'Connection: close\r\n'
+    b'Access-Control-Allow-Origin: *\r\n'
+    b'Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n'
+    b'Access-Control-Allow-Headers: *\r\n'
+    b'\r\n'
+    b'Server is too busy.\n'
+)
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """HTTPServer that hands accepted connections to a fixed pool of workers.
+
+    Accepted sockets wait in a bounded queue; once it is full new connections
+    are answered with 503 instead of piling up behind slow requests.
+    """
+
+    def __init__(self, server_address, handler_class, workers=8, queue_size=64):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._requests = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._handled = 0
+        self._rejected = 0
+        self._threads = []
+        # Let the kernel hold at least as many pending connections as we queue
+        self.request_queue_size = max(self.request_queue_size, queue_size)
+        super().__init__(server_address, handler_class)
+
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f'http-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def process_request(self, request, client_address):
+        try:
+            self._requests.put_nowait((request, client_address))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            logger.warning(f'Request queue full, rejecting {client_address[0]}')
+            try:
+                request.sendall(REJECT_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _worker(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            request, client_address = item
+            with self._lock:
+                self._in_flight += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._lock:
+                    self._in_flight -= 1
+                    self._handled += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queueSize': self.queue_size,
+                'inFlight': self._in_flight,
+                'queued': self._requests.qsize(),
+                'handled': self._handled,
+                'rejected': self._rejected
+            }
+
+    def server_close(self):
+        super().server_close()
+        # Drain anything still waiting, then wake each worker so it exits
+        while True:
+            try:
+                request, _ = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            self.shutdown_request(request)
+        for _ in self._threads:
+            self._requests.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
@@ -1,40 +1,85 @@
-// Load albums from JSON file
+// Albums come from the sharded catalog (built by scraper/build_catalog.py);
+// bandcamp_albums.json is only read when the catalog is missing
+let catalog = null;
+const shards = new Map();
 let albums = [];
 let currentAlbumId = null;
 
+// Rows are [id, host, slug, artist?, tagIndexes?]; host is a subdomain of bandcamp.com or a full domain
+function albumFromRow(row) {
+    const [id, host, slug, artist, tags] = row;
+    const domain = host.includes('.') ? host : `${host}.bandcamp.com`;
+    return {
+        id: String(id),
+        url: `https://${domain}/album/${slug}`,
+        artist: artist || null,
+        tags: (tags || []).map(index => catalog.tags[index])
+    };
+}
+
+function loadShard(number) {
+    // Each shard is fetched at most once; the promise is shared by concurrent callers
+    if (!shards.has(number)) {
+        const file = catalog.shards[number].file;
+        shards.set(number, fetch(`catalog/${file}`).then(response => {
+            if (!response.ok) {
+                shards.delete(number);
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        }));
+    }
+    return shards.get(number);
+}
+
 // Function to get a random album (different from current)
-function getRandomAlbum() {
+async function getRandomAlbum() {
+    if (catalog && catalog.count > 0) {
+        // Uniform over the whole catalog, but only one shard has to be downloaded
+        let album = null;
+        for (let attempt = 0; attempt < 3 && (!album || album.id === currentAlbumId); attempt++) {
+            const index = Math.floor(Math.random() * catalog.count);
+            const rows = await loadShard(Math.floor(index / catalog.shardSize));
+            album = albumFromRow(rows[index % catalog.shardSize]);
+        }
+        currentAlbumId = album.id;
+        return album;
+    }
+
     if (!albums || albums.length === 0) {
         console.error('No albums available');
         return null;
     }
-    
-    // Filter out current album to prevent repeats
-    const availableAlbums = albums.filter(album => album.id !== currentAlbumId);
-    if (availableAlbums.length === 0) {
-        // If we've filtered out all albums, reset and use the full list
-        availableAlbums = albums;
+
+    // Skip past the current album by a random offset instead of filtering the whole list
+    let randomIndex = Math.floor(Math.random() * albums.length);
+    if (albums[randomIndex].id === currentAlbumId && albums.length > 1) {
+        randomIndex = (randomIndex + 1 + Math.floor(Math.random() * (albums.length - 1))) % albums.length;
     }
-    
-    const randomIndex = Math.floor(Math.random() * availableAlbums.length);
-    const newAlbum = availableAlbums[randomIndex];
+    const newAlbum = albums[randomIndex];
     currentAlbumId = newAlbum.id;
     return newAlbum;
 }
 
-function loadRandomAlbum() {
-    const album = getRandomAlbum();
+async function loadRandomAlbum() {
+    let album;
+    try {
+        album = await getRandomAlbum();
+    } catch (error) {
+        console.error('Error loading album:', error);
+        return;
+    }
     if (!album) return;  // Don't proceed if no album is available
-    
+
     const embed = document.getElementById('embed');
     if (!embed) {
         console.error('Embed container not found');
         return;
     }
-    
+
     // Clear existing content
     embed.innerHTML = '';
-    
+
     // Create new iframe
     const iframe = document.createElement('iframe');
     iframe.style.border = 0;
@@ -43,7 +88,7 @@ function loadRandomAlbum() {
     iframe.setAttribute('src', `https://bandcamp.com/EmbeddedPlayer/album=${album.id}/size=large/bgcol=333333/linkcol=0f91ff/tracklist=false/transparent=true/`);
     iframe.setAttribute('seamless', '');
     embed.appendChild(iframe);
-    
+
     // Update link to album
     const albumLink = document.getElementById('album-link');
     if (albumLink) {
@@ -51,34 +96,50 @@ function loadRandomAlbum() {
     }
 }
 
+async function loadAlbumList() {
+    // Legacy flat list, used when no catalog has been built
+    const response = await fetch('bandcamp_albums.json');
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    if (!Array.isArray(data) || data.length === 0) {
+        throw new Error('No albums found in JSON file');
+    }
+    albums = data;
+    console.log(`Loaded ${albums.length} albums`);
+}
+
+async function loadCatalog() {
+    try {
+        const response = await fetch('catalog/index.json');
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        catalog = await response.json();
+        console.log(`Catalog has ${catalog.count} albums in ${catalog.shards.length} shards`);
+        return;
+    } catch (error) {
+        console.warn('Catalog unavailable, falling back to bandcamp_albums.json:', error);
+        catalog = null;
+    }
+
+    try {
+        await loadAlbumList();
+    } catch (error) {
+        console.error('Error loading albums:', error);
+        // Fallback to a default album if loading fails
+        albums = [{
+            id: "1618145259",
+            url: "https://cloudcore.bandcamp.com/album/bad-posture"
+        }];
+    }
+}
+
 // Initialize the app when the DOM is loaded
 document.addEventListener('DOMContentLoaded', () => {
-    // Load albums from JSON file
-    fetch('bandcamp_albums.json')
-        .then(response => {
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-        })
-        .then(data => {
-            if (!Array.isArray(data) || data.length === 0) {
-                throw new Error('No albums found in JSON file');
-            }
-            albums = data;
-            console.log(`Loaded ${albums.length} albums`);
-            loadRandomAlbum();
-        })
-        .catch(error => {
-            console.error('Error loading albums:', error);
-            // Fallback to a default album if loading fails
-            albums = [{
-                id: "1618145259",
-                url: "https://cloudcore.bandcamp.com/album/bad-posture"
-            }];
-            loadRandomAlbum();
-        });
-    
+    loadCatalog().then(loadRandomAlbum);
+
     // Add click handler for next button
     const button = document.getElementById('next-button');
     if (button) {
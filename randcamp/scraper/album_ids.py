@@ -0,0 +1,333 @@
+"""Concurrent album ID extraction for Bandcamp album pages.
+
+Album pages are fetched on a thread pool that shares one keep-alive
+``requests.Session``. Each host gets a minimum interval between requests,
+and 429/5xx responses and connection errors are retried with backoff.
+Every result is appended to a JSON Lines file as soon as it arrives, so an
+interrupted run picks up where it stopped. A page that is gone (404, 410,
+any 4xx but 429) is logged with its status and not fetched again.
+``compact`` folds that log into the ``bandcamp_albums.json`` list the site
+loads.
+
+Pages are scanned as they stream in and the connection is dropped once an
+ID of the highest priority turns up, which on real album pages is the
+og:video embed or the bc-page-properties meta tag in the <head>.
+
+    python album_ids.py album_urls.json -j 32 --rate 4
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# The original extract_album_id's four patterns as one pass over the raw bytes,
+# plus the data-tralbum blob; the group that matched gives the priority
+# (album= first, as before). Keeping the shared 'album' prefix outside the
+# alternation lets re skip ahead by literal search, which a plain alternation
+# of the patterns would not, and costs about what one of the old passes did.
+ALBUM_ID_PATTERN = re.compile(
+    rb'album(?:=(?P<embed>\d+)'  # Standard embed code (og:video meta in the head)
+    rb'|_id=(?P<alt>\d+)'  # Alternative embed code
+    rb'|/(?P<path>\d+)'  # URL pattern
+    rb'|_id&quot;:(?P<json>\d+)'  # JSON data
+    rb'|(?<=&quot;item_type&quot;:&quot;album)&quot;,&quot;id&quot;:(?P<tralbum>\d+))'  # data-tralbum
+)
+# <meta name="bc-page-properties">, only looked for until </head>
+HEAD_PATTERN = re.compile(rb'&quot;item_type&quot;:&quot;a&quot;,&quot;item_id&quot;:(?P<properties>\d+)')
+PRIORITY = {'embed': 0, 'tralbum': 0, 'properties': 0, 'alt': 1, 'path': 2, 'json': 3}
+SCAN_CHUNK = 16 * 1024
+# After an early exit, a remainder up to this many bytes on the wire is read
+# and discarded so the connection can be reused; past that it is dropped
+DRAIN_BYTES = 64 * 1024
+# Carried between chunks so a match split across them is still seen whole
+OVERLAP = 128
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36')
+
+
+class AlbumIdScanner:
+    """find_album_id over a page that arrives in chunks.
+
+    ``feed`` returns the ID once a top-priority form has been seen, the cue to
+    stop reading; otherwise the best lower-priority match so far is kept for
+    ``result()``.
+    """
+
+    def __init__(self):
+        self.tail = b''
+        self.best = None  # (priority, album_id)
+        self.bytes = 0
+        self.in_head = True
+
+    def feed(self, chunk, final=False):
+        self.bytes += len(chunk)
+        data = self.tail + chunk if self.tail else chunk
+        # Digits running into the end of the data may continue in the next chunk
+        limit = len(data) if final else len(data) - 1
+        if self.in_head:
+            head_end = data.find(b'</head>')
+            self.in_head = head_end < 0
+            if self._search(HEAD_PATTERN, data, limit, len(data) if self.in_head else head_end):
+                return self.best[1]
+        if self._search(ALBUM_ID_PATTERN, data, limit):
+            return self.best[1]
+        self.tail = data[-OVERLAP:]
+        return None
+
+    def _search(self, pattern, data, limit, endpos=None):
+        # Record matches ending by ``limit``; True once one has top priority
+        for match in pattern.finditer(data, 0, len(data) if endpos is None else endpos):
+            if match.end() > limit:
+                break
+            priority = PRIORITY[match.lastgroup]
+            if self.best is None or priority < self.best[0]:
+                self.best = (priority, match.group(match.lastgroup).decode())
+                if priority == 0:
+                    return True
+        return False
+
+    def result(self):
+        return self.best[1] if self.best else None
+
+
+def find_album_id(html):
+    # Album ID from a whole page, str or bytes
+    scanner = AlbumIdScanner()
+    return scanner.feed(html.encode() if isinstance(html, str) else html, final=True) or scanner.result()
+
+
+def scan_response(response, chunk_size=SCAN_CHUNK):
+    # Read a stream=True response until an ID is certain; returns (album_id, bytes read, stopped early)
+    scanner = AlbumIdScanner()
+    for chunk in response.iter_content(chunk_size):
+        if scanner.feed(chunk) is not None:
+            return scanner.result(), scanner.bytes, True
+    scanner.feed(b'', final=True)
+    return scanner.result(), scanner.bytes, False
+
+
+def fetch_album_id(url, session=None, timeout=20):
+    # One page, streamed; used by extract_ids.py for single URLs
+    with (session or requests).get(url, timeout=timeout, headers={'User-Agent': USER_AGENT},
+                                   stream=True) as response:
+        response.raise_for_status()
+        return scan_response(response)[0]
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least ``1 / rate`` seconds apart.
+
+    Slots are handed out under a lock and slept on outside it, so workers
+    waiting on one busy host never hold up requests to other hosts.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def defer(self, host, seconds):
+        # Push the host's next slot back, e.g. after a 429 with Retry-After
+        with self._lock:
+            self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + seconds)
+
+
+class AlbumIdExtractor:
+    def __init__(self, workers=16, rate=4.0, timeout=(5, 20), retries=3, backoff=1.0, drain_bytes=DRAIN_BYTES):
+        self.workers = workers
+        self.drain_bytes = drain_bytes
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = HostRateLimiter(rate)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=64, pool_maxsize=workers, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self.bytes_read = 0
+        self.early_exits = 0
+        self.dropped = 0
+
+    def open(self, url):
+        # Streamed response with the body unread, after rate limiting and retries
+        host = urllib.parse.urlsplit(url).netloc
+        attempt = 0
+        while True:
+            self.limiter.wait(host)
+            try:
+                response = self.session.get(url, timeout=self.timeout, stream=True)
+            except requests.RequestException:
+                if attempt >= self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    if not response.ok:
+                        response.close()
+                    response.raise_for_status()
+                    return response
+                response.close()
+                retry_after = response.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    self.limiter.defer(host, int(retry_after))
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    def fetch(self, url):
+        with self.open(url) as response:
+            return response.text
+
+    def extract(self, url):
+        try:
+            with self.open(url) as response:
+                album_id, read, early = scan_response(response)
+                dropped = early and not self._drain(response)
+            with self._lock:
+                self.bytes_read += read
+                self.early_exits += early
+                self.dropped += dropped
+            return {"url": url, "id": album_id}
+        except requests.HTTPError as e:
+            status = e.response.status_code
+            if 400 <= status < 500 and status not in RETRY_STATUSES:
+                return {"url": url, "id": None, "status": status}
+            return {"url": url, "id": None, "error": str(e)}
+        except Exception as e:
+            return {"url": url, "id": None, "error": str(e)}
+
+    def _drain(self, response):
+        # A connection only goes back to the pool once its body is read to the end;
+        # read a short remainder raw (no decoding, no scanning), leave a long one
+        length = response.headers.get('Content-Length', '')
+        if not length.isdigit() or int(length) - response.raw.tell() > self.drain_bytes:
+            return False
+        for _ in response.raw.stream(SCAN_CHUNK, decode_content=False):
+            pass
+        return True
+
+    def run(self, urls, log_path, progress=True):
+        """Extract IDs for ``urls`` not already settled in ``log_path``.
+
+        URLs with an ID, whose page loaded but had no ID, or that answered
+        with a permanent 4xx are skipped on later runs; connection errors and
+        429/5xx that outlast the retries are tried again. Returns the per-run
+        counts.
+        """
+        done = {url for url, record in read_log(log_path).items() if 'error' not in record}
+        pending = list(dict.fromkeys(url for url in urls if url not in done))
+        counts = {"total": len(pending), "found": 0, "missing": 0, "gone": 0, "errors": 0}
+        if not pending:
+            return counts
+
+        start = time.perf_counter()
+        with open(log_path, 'a') as log, ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self.extract, url) for url in pending]
+            for i, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                log.write(json.dumps(record) + '\n')
+                if 'error' in record:
+                    counts["errors"] += 1
+                elif 'status' in record:
+                    counts["gone"] += 1
+                elif record["id"]:
+                    counts["found"] += 1
+                else:
+                    counts["missing"] += 1
+                if progress and (i % 100 == 0 or i == len(pending)):
+                    log.flush()
+                    elapsed = time.perf_counter() - start
+                    print(f"[{i}/{len(pending)}] {counts['found']} found, {counts['missing']} without ID, "
+                          f"{counts['gone']} gone, {counts['errors']} errors ({i / elapsed:.1f} pages/s)")
+        counts["seconds"] = round(time.perf_counter() - start, 3)
+        counts["bytesRead"] = self.bytes_read
+        counts["earlyExits"] = self.early_exits
+        counts["connectionsDropped"] = self.dropped
+        return counts
+
+    def close(self):
+        self.session.close()
+
+
+def read_log(log_path):
+    # Later lines win, so a retried URL replaces its earlier error
+    records = {}
+    if not os.path.exists(log_path):
+        return records
+    with open(log_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn final line from an interrupted run
+            records[record["url"]] = record
+    return records
+
+
+def compact(log_path, output_path, urls=None):
+    # Write the site's [{id, url}] list, in input order when the URL list is known
+    records = read_log(log_path)
+    order = list(dict.fromkeys(urls)) if urls is not None else list(records)
+    albums = [{"id": records[url]["id"], "url": url}
+              for url in order if url in records and records[url].get("id")]
+    tmp_path = f'{output_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(albums, f, indent=2)
+    os.replace(tmp_path, output_path)
+    return albums
+
+
+def extract_album_ids(urls, output_path='bandcamp_albums.json', log_path=None, **options):
+    log_path = log_path or os.path.splitext(output_path)[0] + '.jsonl'
+    extractor = AlbumIdExtractor(**options)
+    try:
+        counts = extractor.run(urls, log_path)
+    finally:
+        extractor.close()
+    albums = compact(log_path, output_path, urls)
+    counts["albums"] = len(albums)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract Bandcamp album IDs from album page URLs')
+    parser.add_argument('urls', nargs='?', default='album_urls.json', help='JSON list of album URLs')
+    parser.add_argument('-o', '--output', default='bandcamp_albums.json')
+    parser.add_argument('-j', '--workers', type=int, default=16, help='concurrent requests')
+    parser.add_argument('--rate', type=float, default=4.0, help='requests per second per host (0 = unlimited)')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=20.0, help='read timeout in seconds')
+    parser.add_argument('--drain-kb', type=int, default=DRAIN_BYTES // 1024,
+                        help='read up to this much of a page past its ID to keep the connection')
+    args = parser.parse_args()
+
+    with open(args.urls) as f:
+        urls = json.load(f)
+    print(f"Loaded {len(urls)} URLs from {args.urls}")
+    counts = extract_album_ids(urls, args.output, workers=args.workers, rate=args.rate,
+                               retries=args.retries, timeout=(5, args.timeout), drain_bytes=args.drain_kb * 1024)
+    print(f"Found {counts['albums']} album IDs")
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
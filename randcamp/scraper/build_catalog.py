@@ -0,0 +1,135 @@
+"""Build the sharded album catalog that randcamp/app.js samples from.
+
+Input is any mix of ``bandcamp_albums.json`` lists and ``bandcamp_albums.jsonl``
+logs. Albums are deduplicated by ID, and URLs lose their query strings and
+trailing slashes. Any ``artist`` or ``tags`` fields picked up by the crawler
+are merged in. The output directory holds:
+
+- ``index.json``: album count, shard size, shard list, field names and the
+  shared tag table.
+- ``shard-NNNN.json``: fixed-size arrays of rows
+  ``[id, host, slug, artist, tag indexes]``, with empty trailing fields
+  dropped.
+
+``host`` is the bare subdomain for ``*.bandcamp.com`` and the full domain for
+custom ones, so a URL is ``https://{host}.bandcamp.com/album/{slug}`` or
+``https://{host}/album/{slug}``. Shards are the same size, apart from the
+last, so drawing a uniform index over ``count`` and fetching only its shard
+gives a uniform random album.
+
+    python build_catalog.py bandcamp_albums.json bandcamp_albums.jsonl -o ../catalog
+"""
+import argparse
+import json
+import os
+import random
+import urllib.parse
+
+SHARD_SIZE = 1000
+FIELDS = ['id', 'host', 'slug', 'artist', 'tags']
+
+
+def split_album_url(url):
+    # Returns (host, slug), or None for anything that isn't an album page
+    parts = urllib.parse.urlsplit(url.strip())
+    path = parts.path.rstrip('/')
+    if '/album/' not in path:
+        return None
+    host = parts.netloc.lower()
+    if host.endswith('.bandcamp.com'):
+        host = host[:-len('.bandcamp.com')]
+    return host, path.split('/album/', 1)[1]
+
+
+def album_url(host, slug):
+    domain = host if '.' in host else f'{host}.bandcamp.com'
+    return f'https://{domain}/album/{slug}'
+
+
+def read_albums(paths):
+    # Later inputs fill in fields earlier ones lacked; the first URL seen for an ID wins
+    albums = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            if path.endswith('.jsonl'):
+                records = []
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # Torn final line from an interrupted run, as album_ids.read_log skips
+            else:
+                records = json.load(f)
+        for record in records:
+            if not record.get('id'):
+                continue
+            album_id = int(record['id'])
+            entry = albums.setdefault(album_id, {'url': record['url'], 'artist': None, 'tags': []})
+            entry['artist'] = entry['artist'] or record.get('artist')
+            for tag in record.get('tags') or []:
+                if tag not in entry['tags']:
+                    entry['tags'].append(tag)
+    return albums
+
+
+def build_catalog(albums, output_dir, shard_size=SHARD_SIZE, seed=0):
+    # Rows are shuffled once at build time so shards don't cluster by label or crawl order
+    tags = sorted({tag for entry in albums.values() for tag in entry['tags']})
+    tag_index = {tag: i for i, tag in enumerate(tags)}
+    rows = []
+    for album_id, entry in albums.items():
+        parts = split_album_url(entry['url'])
+        if parts is None:
+            continue
+        row = [album_id, parts[0], parts[1], entry['artist'], [tag_index[tag] for tag in entry['tags']]]
+        while len(row) > 3 and not row[-1]:
+            row.pop()  # Optional trailing fields are left off entirely
+        rows.append(row)
+    rows.sort()
+    random.Random(seed).shuffle(rows)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name in os.listdir(output_dir):
+        if name.startswith('shard-') and name.endswith('.json'):
+            os.remove(os.path.join(output_dir, name))
+
+    shards = []
+    for number, start in enumerate(range(0, len(rows), shard_size)):
+        chunk = rows[start:start + shard_size]
+        name = f'shard-{number:04d}.json'
+        with open(os.path.join(output_dir, name), 'w') as f:
+            json.dump(chunk, f, separators=(',', ':'))
+        shards.append({'file': name, 'count': len(chunk)})
+
+    index = {
+        'version': 1,
+        'count': len(rows),
+        'shardSize': shard_size,
+        'fields': FIELDS,
+        'tags': tags,
+        'shards': shards
+    }
+    tmp_path = os.path.join(output_dir, 'index.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp_path, os.path.join(output_dir, 'index.json'))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the sharded randcamp album catalog')
+    parser.add_argument('inputs', nargs='*', default=['bandcamp_albums.json'],
+                        help='bandcamp_albums.json lists and/or .jsonl extraction logs')
+    parser.add_argument('-o', '--output', default=os.path.join('..', 'catalog'))
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+    args = parser.parse_args()
+
+    albums = read_albums(args.inputs)
+    index = build_catalog(albums, args.output, args.shard_size)
+    print(f"Wrote {index['count']} albums in {len(index['shards'])} shards to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""Browserless Bandcamp tag crawler with a resumable frontier.
+
+Tag listings are paged over plain HTTP instead of scrolling a headless
+Chrome. ``api`` mode pages the discover JSON endpoint by cursor, and its
+results already carry album IDs. ``html`` mode pages the server-rendered
+listing and picks album links out of the markup, the same way the Selenium
+scripts did.
+
+State lives in ``--state`` (default ``crawl_state/``):
+
+- ``seen.txt`` holds every album URL already collected, one per line.
+- ``frontier.json`` holds each tag's position in its current walk.
+
+A new walk starts at the newest releases and stops at the first page that
+adds nothing unseen, so reruns fetch only new releases. A walk that was
+interrupted, or that used up ``--pages`` before reaching the end, resumes
+from its saved position instead, so repeated runs keep backfilling.
+
+    python crawl_tags.py electronic ambient --pages 20
+    python crawl_tags.py --fixture page_source.html
+"""
+import argparse
+import html
+import json
+import os
+import re
+import time
+import urllib.parse
+
+import requests
+
+from album_ids import USER_AGENT, extract_album_ids
+
+ALBUM_LINK = re.compile(r'href="(https?://[^"]+/album/[^"]+)"')
+PAGE_SIZE = 60
+
+
+def normalize_url(url):
+    # Listings tack on ?from=discover_page and friends; the seen-set ignores them
+    parts = urllib.parse.urlsplit(url)
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc.lower(), parts.path.rstrip('/'), '', ''))
+
+
+def parse_listing_html(page):
+    # Album links from a rendered tag/discover page, e.g. page_source.html
+    items = []
+    for url in dict.fromkeys(html.unescape(url) for url in ALBUM_LINK.findall(page)):
+        items.append({"url": url, "id": None})
+    return items
+
+
+def parse_discover_json(data):
+    items = []
+    for result in data.get('results', []):
+        if result.get('item_type', 'a') != 'a' or not result.get('item_url'):
+            continue
+        album_id = result.get('id') or result.get('item_id')
+        items.append({"url": result['item_url'], "id": str(album_id) if album_id else None,
+                      "artist": result.get('band_name')})
+    return items, data.get('cursor') if data.get('more_available', True) else None
+
+
+class FrontierState:
+    """Seen-set and per-tag walk positions, checkpointed after every page."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.seen_path = os.path.join(directory, 'seen.txt')
+        self.frontier_path = os.path.join(directory, 'frontier.json')
+        self.seen = set()
+        if os.path.exists(self.seen_path):
+            with open(self.seen_path) as f:
+                self.seen = {line.strip() for line in f if line.strip()}
+        try:
+            with open(self.frontier_path) as f:
+                self.frontier = json.load(f)
+        except (OSError, ValueError):
+            self.frontier = {}
+
+    def unseen(self, items):
+        new = {}
+        for item in items:
+            new.setdefault(normalize_url(item["url"]), item)
+        return [item for key, item in new.items() if key not in self.seen]
+
+    def mark_seen(self, items):
+        if not items:
+            return
+        keys = [normalize_url(item["url"]) for item in items]
+        self.seen.update(keys)
+        with open(self.seen_path, 'a') as f:
+            f.writelines(key + '\n' for key in keys)
+
+    def save(self):
+        tmp_path = f'{self.frontier_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.frontier, f, indent=2)
+        os.replace(tmp_path, self.frontier_path)
+
+
+class TagCrawler:
+    def __init__(self, state, sink, base_url='https://bandcamp.com', mode='api', delay=1.0,
+                 timeout=(5, 20), retries=3):
+        self.state = state
+        self.sink = sink
+        self.base_url = base_url.rstrip('/')
+        self.mode = mode
+        self.delay = delay
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+
+    def request(self, method, url, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                if response.status_code not in (429, 500, 502, 503, 504) or attempt == self.retries:
+                    response.raise_for_status()
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+            time.sleep(self.delay * 2 ** attempt)
+
+    def fetch_page(self, tag, position):
+        # Returns (items, next position or None when the listing is exhausted)
+        if self.mode == 'api':
+            response = self.request('POST', f'{self.base_url}/api/discover/1/discover_web', json={
+                "category_id": 0,
+                "tag_norm_names": [tag],
+                "geoname_id": 0,
+                "slice": "new",
+                "time_facet_id": None,
+                "cursor": position or '*',
+                "size": PAGE_SIZE,
+                "include_result_types": ["a"]
+            })
+            return parse_discover_json(response.json())
+
+        page = position or 1
+        response = self.request('GET', f'{self.base_url}/tag/{urllib.parse.quote(tag)}',
+                                params={"tab": "all_releases", "sort_field": "date", "page": page})
+        items = parse_listing_html(response.text)
+        return items, page + 1 if items else None
+
+    def crawl_tag(self, tag, max_pages):
+        frontier = self.state.frontier
+        walk = frontier.get(tag)
+        resuming = walk is not None and not walk.get("done")
+        if not resuming:
+            walk = frontier[tag] = {"next": None, "pages": 0, "done": False, "found": 0}
+
+        collected = []
+        pages = 0  # This run's budget; walk["pages"] is the walk's running total
+        while pages < max_pages:
+            items, next_position = self.fetch_page(tag, walk["next"])
+            for item in items:
+                item["tags"] = [tag]
+            # Outputs, then seen-set, then frontier: a crash in between only repeats work
+            new = self.state.unseen(items)
+            self.sink(new)
+            self.state.mark_seen(new)
+            collected.extend(new)
+            pages += 1
+            walk["pages"] += 1
+            walk["found"] += len(new)
+            walk["next"] = next_position
+            walk["updated"] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            caught_up = not new and not resuming
+            if next_position is None or caught_up:
+                walk["done"] = True
+            self.state.save()
+            print(f"[{tag}] page {walk['pages']}: {len(items)} releases, {len(new)} new")
+            if walk["done"]:
+                break
+            time.sleep(self.delay)
+        return collected
+
+    def close(self):
+        self.session.close()
+
+
+def urls_log_path(urls_path):
+    # album_urls.json -> album_urls.jsonl, the append-only log of URLs found during a crawl
+    return os.path.splitext(urls_path)[0] + '.jsonl'
+
+
+def append_outputs(items, urls_path='album_urls.json', log_path='bandcamp_albums.jsonl'):
+    # Crawler sink, once per listing page: new URLs are appended to the URL log, and IDs
+    # that came with the listing go straight into the album_ids log so the extractor
+    # never has to fetch those pages
+    if not items:
+        return
+    with open(urls_log_path(urls_path), 'a') as f:
+        f.writelines(json.dumps(item["url"]) + '\n' for item in items)
+    with_ids = [item for item in items if item["id"]]
+    if with_ids:
+        with open(log_path, 'a') as f:
+            f.writelines(json.dumps({key: value for key, value in item.items() if value}) + '\n'
+                         for item in with_ids)
+
+
+def merge_outputs(items, urls_path='album_urls.json', log_path='bandcamp_albums.jsonl'):
+    # Fold the URL log (plus any ``items``) into album_urls.json in one rewrite; returns the URL list
+    append_outputs(items, urls_path, log_path)
+    pending_path = urls_log_path(urls_path)
+    try:
+        with open(urls_path) as f:
+            urls = json.load(f)
+    except (OSError, ValueError):
+        urls = []
+    if not os.path.exists(pending_path):
+        return urls
+
+    known = set(urls)
+    with open(pending_path) as f:
+        for line in f:
+            try:
+                url = json.loads(line)
+            except ValueError:
+                continue  # Torn final line from an interrupted run
+            if url not in known:
+                known.add(url)
+                urls.append(url)
+    tmp_path = f'{urls_path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(urls, f, indent=2)
+    os.replace(tmp_path, urls_path)
+    os.remove(pending_path)
+    return urls
+
+
+def crawl(tags, pages=10, state_dir='crawl_state', base_url='https://bandcamp.com', mode='api', delay=1.0,
+          urls_path='album_urls.json', log_path='bandcamp_albums.jsonl'):
+    state = FrontierState(state_dir)
+    crawler = TagCrawler(state, lambda items: append_outputs(items, urls_path, log_path), base_url, mode, delay)
+    collected = []
+    try:
+        for tag in tags:
+            try:
+                collected.extend(crawler.crawl_tag(tag, pages))
+            except requests.RequestException as e:
+                # The frontier still points at the failed page; the next run retries it
+                print(f"[{tag}] stopped: {e}")
+    finally:
+        crawler.close()
+        # album_urls.json is rewritten once per run; a crash leaves the URL log for the next merge
+        merge_outputs([], urls_path, log_path)
+    return collected
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl Bandcamp tag listings without a browser')
+    parser.add_argument('tags', nargs='*', default=['electronic'])
+    parser.add_argument('--pages', type=int, default=10, help='maximum listing pages per tag per run')
+    parser.add_argument('--mode', choices=['api', 'html'], default='api')
+    parser.add_argument('--base-url', default='https://bandcamp.com', help='e.g. a fixture_server.py host')
+    parser.add_argument('--state', default='crawl_state', help='frontier and seen-set directory')
+    parser.add_argument('--delay', type=float, default=1.0, help='seconds between listing pages')
+    parser.add_argument('--fixture', help='parse a saved listing page instead of crawling')
+    parser.add_argument('--extract', action='store_true', help='then extract missing IDs into bandcamp_albums.json')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.fixture:
+        state = FrontierState(args.state)
+        with open(args.fixture, encoding='utf-8') as f:
+            new = state.unseen(parse_listing_html(f.read()))
+        merge_outputs(new)
+        state.mark_seen(new)
+    else:
+        new = crawl(args.tags, args.pages, args.state, args.base_url, args.mode, args.delay)
+    urls = merge_outputs([])
+    print(f"Found {len(new)} new releases in {time.perf_counter() - start:.2f}s ({len(urls)} in album_urls.json)")
+
+    if args.extract:
+        counts = extract_album_ids(urls, 'bandcamp_albums.json')
+        print(f"Found {counts['albums']} album IDs")
+        print("Results saved to bandcamp_albums.json")
+
+
+if __name__ == '__main__':
+    main()
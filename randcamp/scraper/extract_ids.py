@@ -1,27 +1,16 @@
-import requests
-import re
 import json
 
+from album_ids import fetch_album_id, extract_album_ids
+from build_catalog import build_catalog, read_albums
+
 def extract_album_id(url):
     print(f"\nProcessing {url}")
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        # Look for album ID in various patterns
-        patterns = [
-            r'album=(\d+)',  # Standard embed code
-            r'album_id=(\d+)',  # Alternative embed code
-            r'album/(\d+)',  # URL pattern
-            r'album_id&quot;:(\d+)'  # JSON data
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, response.text)
-            if match:
-                album_id = match.group(1)
-                print(f"✓ Found album ID: {album_id}")
-                return album_id
+        # Streams the page and stops reading once the ID is found
+        album_id = fetch_album_id(url)
+        if album_id:
+            print(f"✓ Found album ID: {album_id}")
+            return album_id
         
         print("✗ Could not find album ID")
         return None
@@ -41,22 +30,15 @@ def main():
     
     print(f"Loaded {len(urls)} URLs from album_urls.json")
     
-    # Process each URL and collect results
-    albums = []
-    for i, url in enumerate(urls, 1):
-        print(f"\n[{i}/{len(urls)}]", end=" ")
-        album_id = extract_album_id(url)
-        if album_id:
-            albums.append({
-                "id": album_id,
-                "url": url
-            })
-            # Save progress after each successful album
-            with open('bandcamp_albums.json', 'w') as f:
-                json.dump(albums, f, indent=2)
+    # Fetch pages concurrently; progress goes to bandcamp_albums.jsonl and is compacted at the end
+    counts = extract_album_ids(urls, 'bandcamp_albums.json')
     
-    print(f"\nFound {len(albums)} album IDs")
+    print(f"\nFound {counts['albums']} album IDs")
     print("Results saved to bandcamp_albums.json")
+    
+    # Sharded catalog for the site (randcamp/catalog), built from the log so crawler fields survive
+    index = build_catalog(read_albums(['bandcamp_albums.json', 'bandcamp_albums.jsonl']), '../catalog')
+    print(f"Catalog of {index['count']} albums written to ../catalog")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# Local stand-in for Bandcamp album pages, for benchmarking the scrapers offline.
+#
+#   python fixture_server.py --hosts 8 --delay 0.05
+#   python album_ids.py fixture_urls.json --rate 0
+#
+# Every listening port acts as a separate "label" host. GET /album/<slug> returns
+# a page of roughly real size whose embed code carries a stable ID derived from
+# the slug, and GET /stats reports request and connection counters. The 'tail'
+# layout puts the embed code near the end of the page; 'bandcamp' mirrors real
+# album pages, with og:video and bc-page-properties in the head and the
+# data-tralbum blob in the body.
+#
+# Tag listings for crawl_tags.py come from the same fake catalog, newest first:
+# POST /api/discover/1/discover_web pages by cursor, GET /tag/<tag>?page=N is
+# the rendered version. Raising server.releases simulates new releases landing.
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+
+PAGE_PADDING = '<div class="filler">' + 'lorem ipsum dolor sit amet ' * 40 + '</div>\n'
+
+
+def album_id_for(slug):
+    return str(int(hashlib.sha1(slug.encode()).hexdigest()[:8], 16))
+
+
+LAYOUTS = ('tail', 'bandcamp')
+
+
+def album_page(slug, padding_kb=100, with_id=True, layout='tail'):
+    padding = PAGE_PADDING * max(1, padding_kb * 1024 // len(PAGE_PADDING))
+    album_id = album_id_for(slug)
+    embed = (f'<meta property="og:video" content="https://bandcamp.com/EmbeddedPlayer/v=2/'
+             f'album={album_id}/size=large/tracklist=false/artwork=small/">\n'
+             if with_id else '')
+    if layout == 'bandcamp':
+        properties = (f'<meta name="bc-page-properties" content="{{&quot;item_type&quot;:&quot;a&quot;,'
+                      f'&quot;item_id&quot;:{album_id}}}">\n' if with_id else '')
+        tralbum = (f'<script data-tralbum="{{&quot;current&quot;:{{&quot;title&quot;:&quot;{slug}&quot;}},'
+                   f'&quot;item_type&quot;:&quot;album&quot;,&quot;id&quot;:{album_id}}}"></script>\n'
+                   if with_id else '')
+        half = len(padding) // 2
+        return (f'<!DOCTYPE html>\n<html><head><title>{slug}</title>\n{properties}{embed}</head>\n<body>\n'
+                f'{padding[:half]}{tralbum}{padding[half:]}</body></html>\n').encode()
+    # Embed code near the end, so extractors have to scan most of the page
+    return (f'<!DOCTYPE html>\n<html><head><title>{slug}</title></head>\n<body>\n'
+            f'{padding}{embed}</body></html>\n').encode()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.counters['connections'] += 1
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Scrapers hang up mid-page once they have the ID
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_body(self, status, content, content_type='text/html; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', len(content))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def catalog(self, tag, offset, size):
+        # Newest release first; each one lives on one of the fixture hosts
+        base_urls = self.server.base_urls
+        newest = self.server.releases - 1
+        return [(f'{base_urls[i % len(base_urls)]}/album/{tag}-release-{i}?from=discover_page',
+                 album_id_for(f'{tag}-release-{i}'))
+                for i in range(newest - offset, max(-1, newest - offset - size), -1)]
+
+    def do_POST(self):
+        if self.path != '/api/discover/1/discover_web':
+            self.send_body(404, b'Not found')
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        tag = (request.get('tag_norm_names') or ['all'])[0]
+        cursor = request.get('cursor', '*')
+        offset = 0 if cursor == '*' else int(cursor)
+        size = request.get('size', 60)
+        with self.server.lock:
+            self.server.counters['listings'] += 1
+        items = self.catalog(tag, offset, size)
+        more = offset + size < self.server.releases
+        self.send_body(200, json.dumps({
+            'results': [{'id': int(album_id), 'item_type': 'a', 'item_url': url} for url, album_id in items],
+            'cursor': str(offset + size) if more else None,
+            'more_available': more
+        }).encode(), 'application/json')
+
+    def do_GET(self):
+        counters = self.server.counters
+        route = urllib.parse.urlsplit(self.path)
+        if self.path == '/stats':
+            with self.server.lock:
+                self.send_body(200, json.dumps(counters).encode(), 'application/json')
+            return
+        if route.path.startswith('/tag/'):
+            page = int(urllib.parse.parse_qs(route.query).get('page', ['1'])[0])
+            with self.server.lock:
+                counters['listings'] += 1
+            links = ''.join(f'<li class="item"><a href="{url}">{url}</a></li>\n'
+                            for url, _ in self.catalog(route.path[len('/tag/'):], (page - 1) * 60, 60))
+            self.send_body(200, f'<html><body><ul>\n{links}</ul></body></html>\n'.encode())
+            return
+        if not self.path.startswith('/album/'):
+            self.send_body(404, b'Not found')
+            return
+
+        with self.server.lock:
+            counters['requests'] += 1
+        time.sleep(self.server.delay)
+        if random.random() < self.server.fail_rate:
+            with self.server.lock:
+                counters['failures'] += 1
+            self.send_body(503, b'Simulated failure')
+            return
+        slug = self.path[len('/album/'):].split('?')[0]
+        self.send_body(200, album_page(slug, self.server.padding_kb, not slug.startswith('noid-'),
+                                       self.server.layout))
+
+
+def start_fixture_servers(hosts=4, delay=0.0, fail_rate=0.0, padding_kb=100, port=0, verbose=False, releases=1000,
+                          layout='tail'):
+    # One server per fake host, all sharing counters; returns (servers, base_urls)
+    lock = threading.Lock()
+    counters = {'connections': 0, 'requests': 0, 'listings': 0, 'failures': 0}
+    servers, base_urls = [], []
+    for i in range(hosts):
+        server = ThreadingHTTPServer(('localhost', port + i if port else 0), FixtureHandler)
+        server.daemon_threads = True
+        server.delay = delay
+        server.fail_rate = fail_rate
+        server.padding_kb = padding_kb
+        server.layout = layout
+        server.verbose = verbose
+        server.lock = lock
+        server.counters = counters
+        server.releases = releases
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        base_urls.append(f'http://localhost:{server.server_address[1]}')
+    for server in servers:
+        server.base_urls = base_urls
+    return servers, base_urls
+
+
+def fixture_urls(base_urls, count, missing_rate=0.0, seed=0):
+    rng = random.Random(seed)
+    urls = []
+    for i in range(count):
+        prefix = 'noid-' if rng.random() < missing_rate else ''
+        urls.append(f'{base_urls[i % len(base_urls)]}/album/{prefix}release-{i}?from=discover_page')
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Bandcamp album pages')
+    parser.add_argument('--port', type=int, default=8780, help='first port; hosts use consecutive ports')
+    parser.add_argument('--hosts', type=int, default=4)
+    parser.add_argument('--delay', type=float, default=0.05, help='seconds to wait before answering')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--padding-kb', type=int, default=100, help='approximate page size')
+    parser.add_argument('--urls', type=int, default=1000, help='number of URLs to write to fixture_urls.json')
+    parser.add_argument('--releases', type=int, default=1000, help='releases per tag in the listings')
+    parser.add_argument('--layout', choices=LAYOUTS, default='tail', help='where album pages carry the ID')
+    args = parser.parse_args()
+
+    servers, base_urls = start_fixture_servers(args.hosts, args.delay, args.fail_rate,
+                                               args.padding_kb, args.port, verbose=True,
+                                               releases=args.releases, layout=args.layout)
+    with open('fixture_urls.json', 'w') as f:
+        json.dump(fixture_urls(base_urls, args.urls), f, indent=2)
+    print(f'Serving {args.hosts} fixture hosts on {", ".join(base_urls)}')
+    print(f'Wrote {args.urls} album URLs to fixture_urls.json')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,22 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException
-import requests
 import json
+import sys
 import time
-import re
 
-def extract_album_id(url):
-    print(f"Processing {url}")
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        # Look for album ID in various patterns
-        patterns = [
-            r'album=(\d+)',  # Standard embed code
-            r'album_id=(\d+)',  # Alternative embed code
-            r'album/(\d+)',  # URL pattern
-            r'album_id&quot;:(\d+)'  # JSON data
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, response.text)
-            if match:
-                album_id = match.group(1)
-                print(f"✓ Found album ID: {album_id}")
-                return album_id
-        
-        print("✗ Could not find album ID")
-        return None
-        
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        return None
+from album_ids import extract_album_ids
+from build_catalog import build_catalog, read_albums
+from crawl_tags import crawl, merge_outputs
 
 def get_album_urls():
+    # Selenium is only imported for --browser runs; the default crawl never starts Chrome
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.common.exceptions import TimeoutException
+
     # Set up Chrome options
     chrome_options = Options()
     chrome_options.add_argument('--headless=new')
@@ -111,30 +88,29 @@ def get_album_urls():
 def main():
     # Step 1: Get album URLs
     print("Step 1: Getting album URLs...")
-    album_urls = get_album_urls()
+    if '--browser' in sys.argv:
+        album_urls = get_album_urls()
+        
+        # Save URLs for reference
+        with open('album_urls.json', 'w') as f:
+            json.dump(album_urls, f, indent=2)
+    else:
+        # Plain-HTTP crawl; reruns only pick up releases not in crawl_state/
+        tags = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or ['electronic']
+        crawl(tags)
+        album_urls = merge_outputs([])
     print(f"Found {len(album_urls)} album URLs")
     
-    # Save URLs for reference
-    with open('album_urls.json', 'w') as f:
-        json.dump(album_urls, f, indent=2)
-    
     # Step 2: Extract album IDs
     print("\nStep 2: Extracting album IDs...")
-    albums = []
-    for i, url in enumerate(album_urls, 1):
-        print(f"\n[{i}/{len(album_urls)}]", end=" ")
-        album_id = extract_album_id(url)
-        if album_id:
-            albums.append({
-                "id": album_id,
-                "url": url
-            })
-            # Save progress after each successful extraction
-            with open('bandcamp_albums.json', 'w') as f:
-                json.dump(albums, f, indent=2)
+    counts = extract_album_ids(album_urls, 'bandcamp_albums.json')
     
-    print(f"\nFinished! Found {len(albums)} albums with IDs")
+    print(f"\nFinished! Found {counts['albums']} albums with IDs")
     print("Results saved to bandcamp_albums.json")
+    
+    # Sharded catalog for the site (randcamp/catalog), built from the log so crawler fields survive
+    index = build_catalog(read_albums(['bandcamp_albums.json', 'bandcamp_albums.jsonl']), '../catalog')
+    print(f"Catalog of {index['count']} albums written to ../catalog")
 
 if __name__ == '__main__':
     main()
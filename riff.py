@@ -0,0 +1,411 @@
+import mmap
+import os
+import struct
+
+# Same field names as audiodata/static/js/metadata.js
+INFO_FIELDS = {
+    'INAM': 'Title',
+    'IART': 'Artist',
+    'IPRD': 'Album',
+    'IGNR': 'Genre',
+    'ICRD': 'Year',
+    'ICOM': 'Composer',
+    'IPUB': 'Publisher',
+    'ICOP': 'Copyright',
+    'ISRC': 'ISRC',
+    'IENG': 'Engineer',
+    'ISFT': 'Encoder',
+    'ICMT': 'Comments'
+}
+INFO_IDS = {name: chunk_id for chunk_id, name in INFO_FIELDS.items()}
+
+# EBU Tech 3285 broadcast extension: fixed fields, then free-form coding history
+BEXT = struct.Struct('<256s32s32s10s8sQH64s5h180s')
+BEXT_TEXT = [('description', 256), ('originator', 32), ('originatorReference', 32),
+             ('originationDate', 10), ('originationTime', 8)]
+BEXT_LOUDNESS = ['loudnessValue', 'loudnessRange', 'maxTruePeakLevel', 'maxMomentaryLoudness',
+                 'maxShortTermLoudness']
+
+FMT = struct.Struct('<HHIIHH')
+DS64 = struct.Struct('<QQQI')
+SIZE_PLACEHOLDER = 0xFFFFFFFF
+FILLER_IDS = (b'JUNK', b'PAD ', b'FLLR')
+
+
+class RiffError(ValueError):
+    pass
+
+
+class Chunk:
+    def __init__(self, chunk_id, offset, size):
+        self.id = chunk_id
+        self.offset = offset
+        self.size = size
+
+    @property
+    def data_offset(self):
+        return self.offset + 8
+
+    @property
+    def end(self):
+        # Chunks are word aligned; odd sizes are followed by a pad byte
+        return self.offset + 8 + self.size + (self.size & 1)
+
+    def to_dict(self):
+        return {'id': self.id.decode('latin-1'), 'offset': self.offset, 'size': self.size}
+
+
+class RiffFile:
+    """Chunk-level view of a RIFF or RF64 WAVE file through a memory map.
+
+    Only chunk headers are touched while walking, so opening a multi-GB file
+    costs a handful of page faults. ``read`` is meant for metadata chunks and
+    refuses the ``data`` chunk.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.file = open(path, 'r+b' if writable else 'rb')
+        self.file_size = os.fstat(self.file.fileno()).st_size
+        if self.file_size < 12:
+            self.file.close()
+            raise RiffError('File too short for a RIFF header')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        form, riff_size, wave = struct.unpack_from('<4sI4s', self.map, 0)
+        if form not in (b'RIFF', b'RF64') or wave != b'WAVE':
+            raise RiffError('Not a RIFF/RF64 WAVE file')
+        self.form = form.decode()
+        self.ds64 = None
+        self.chunks = []
+
+        sizes = {}
+        if form == b'RF64':
+            chunk_id, size = struct.unpack_from('<4sI', self.map, 12)
+            if chunk_id != b'ds64' or size < DS64.size:
+                raise RiffError('RF64 file without a ds64 chunk')
+            riff_size, data_size, sample_count, table_length = DS64.unpack_from(self.map, 20)
+            self.ds64 = {'riffSize': riff_size, 'dataSize': data_size, 'sampleCount': sample_count}
+            sizes[b'data'] = data_size
+            for i in range(table_length):
+                table_id, table_size = struct.unpack_from('<4sQ', self.map, 20 + DS64.size + i * 12)
+                sizes.setdefault(table_id, table_size)
+        self.riff_size = riff_size
+        self.riff_end = min(8 + riff_size, self.file_size)
+
+        offset = 12
+        while offset + 8 <= self.riff_end:
+            chunk_id, size = struct.unpack_from('<4sI', self.map, offset)
+            if size == SIZE_PLACEHOLDER and chunk_id in sizes:
+                size = sizes[chunk_id]
+            chunk = Chunk(chunk_id, offset, size)
+            self.chunks.append(chunk)
+            offset = chunk.end
+        if offset > self.riff_end + 1:
+            # Last chunk claims more than the file holds; keep it but remember the truncation
+            self.truncated = offset - self.riff_end
+        else:
+            self.truncated = 0
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def find(self, chunk_id, list_type=None):
+        for chunk in self.chunks:
+            if chunk.id == chunk_id and (list_type is None or self.map[chunk.data_offset:chunk.data_offset + 4] == list_type):
+                return chunk
+        return None
+
+    def read(self, chunk):
+        if chunk.id == b'data':
+            raise RiffError('Refusing to load the data chunk')
+        return bytes(self.map[chunk.data_offset:min(chunk.data_offset + chunk.size, self.file_size)])
+
+    def fmt(self):
+        chunk = self.find(b'fmt ')
+        if chunk is None or chunk.size < FMT.size:
+            return None
+        audio_format, channels, samplerate, byte_rate, block_align, bits = FMT.unpack_from(self.map, chunk.data_offset)
+        return {
+            'format': audio_format,
+            'channels': channels,
+            'sampleRate': samplerate,
+            'byteRate': byte_rate,
+            'blockAlign': block_align,
+            'bitsPerSample': bits
+        }
+
+    def info_fields(self):
+        # Raw (chunk id, bytes) pairs of the LIST/INFO chunk, unknown ids included
+        chunk = self.find(b'LIST', b'INFO')
+        if chunk is None:
+            return []
+        data = self.read(chunk)
+        fields = []
+        pos = 4
+        while pos + 8 <= len(data):
+            field_id, size = struct.unpack_from('<4sI', data, pos)
+            if not all(0x20 <= c <= 0x7E for c in field_id):
+                break
+            fields.append((field_id, data[pos + 8:pos + 8 + size]))
+            pos += 8 + size + (size & 1)
+        return fields
+
+    def info(self):
+        tags = {}
+        for field_id, value in self.info_fields():
+            name = INFO_FIELDS.get(field_id.decode('latin-1'))
+            text = value.decode('utf-8', 'replace').replace('\x00', ' ').strip()
+            if name and text:
+                tags[name] = text
+        year = tags.get('Year')
+        if year:
+            # The JS keeps only the four-digit year
+            digits = [year[i:i + 4] for i in range(len(year) - 3) if year[i:i + 4].isdigit()]
+            if digits:
+                tags['Year'] = digits[0]
+        return tags
+
+    def bext(self):
+        chunk = self.find(b'bext')
+        if chunk is None:
+            return None
+        data = self.read(chunk)
+        if len(data) < BEXT.size:
+            data = data.ljust(BEXT.size, b'\x00')
+        values = BEXT.unpack_from(data)
+        result = {}
+        for (name, _), value in zip(BEXT_TEXT, values[:5]):
+            result[name] = value.split(b'\x00', 1)[0].decode('latin-1').strip()
+        result['timeReference'] = values[5]
+        result['version'] = values[6]
+        result['umid'] = values[7].hex()
+        if values[6] >= 2:
+            for name, value in zip(BEXT_LOUDNESS, values[8:13]):
+                result[name] = value / 100
+        result['codingHistory'] = data[BEXT.size:].split(b'\x00', 1)[0].decode('latin-1')
+        return result
+
+    def verify(self):
+        # Structural checks in the spirit of verifyWAVStructure, without reading samples
+        errors = []
+        ids = [chunk.id for chunk in self.chunks]
+        if b'fmt ' not in ids:
+            errors.append('No fmt chunk')
+        if b'data' not in ids:
+            errors.append('No data chunk')
+        elif self.fmt() and self.fmt()['blockAlign'] and self.find(b'data').size % self.fmt()['blockAlign']:
+            errors.append('data size is not a whole number of frames')
+        if self.truncated:
+            errors.append(f'Last chunk runs {self.truncated} bytes past the end of the file')
+        if self.form == 'RIFF' and 8 + self.riff_size not in (self.file_size, self.file_size - 1):
+            errors.append(f'RIFF size {self.riff_size} does not match file size {self.file_size}')
+        return {'valid': not errors, 'errors': errors}
+
+    def summary(self):
+        return {
+            'form': self.form,
+            'fileSize': self.file_size,
+            'fmt': self.fmt(),
+            'chunks': [chunk.to_dict() for chunk in self.chunks],
+            'info': self.info(),
+            'bext': self.bext(),
+            'verify': self.verify()
+        }
+
+
+def build_info(fields, min_size=0):
+    # LIST/INFO payload; the last value is null-padded to reach min_size exactly when asked
+    parts = [b'INFO']
+    for i, (field_id, value) in enumerate(fields):
+        value = value.rstrip(b'\x00') + b'\x00'
+        if i == len(fields) - 1 and min_size:
+            used = sum(len(part) for part in parts) + 8
+            value = value.ljust(max(len(value), min_size - used), b'\x00')
+        parts.append(struct.pack('<4sI', field_id, len(value)) + value + b'\x00' * (len(value) & 1))
+    return b''.join(parts)
+
+
+def build_bext(current, updates, min_size=0):
+    values = dict(current or {})
+    values.update(updates)
+    version = values.get('version') or 0
+    if any(values.get(name) is not None for name in BEXT_LOUDNESS):
+        version = max(version, 2)
+    umid = bytes.fromhex(values.get('umid') or '').ljust(64, b'\x00')[:64]
+    loudness = [int(round((values.get(name) or 0) * 100)) if version >= 2 else 0 for name in BEXT_LOUDNESS]
+    payload = BEXT.pack(*[(values.get(name) or '').encode('latin-1', 'replace')[:length]
+                          for name, length in BEXT_TEXT],
+                        int(values.get('timeReference') or 0), version, umid, *loudness, b'')
+    history = (values.get('codingHistory') or '').encode('latin-1', 'replace')
+    return (payload + history).ljust(min_size, b'\x00')
+
+
+def _info_payload(riff, updates, min_size=0):
+    fields = dict(riff.info_fields())
+    for name, value in updates.items():
+        chunk_id = INFO_IDS.get(name)
+        if chunk_id is None:
+            raise RiffError(f'Unknown INFO field: {name}')
+        key = chunk_id.encode()
+        if value is None or not str(value).strip():
+            fields.pop(key, None)
+        else:
+            fields[key] = str(value).strip().encode('utf-8')
+    return build_info(list(fields.items()), min_size)
+
+
+def _write_chunk(riff, chunk_id, build, list_type=None):
+    """Write one metadata chunk without moving or copying the data chunk.
+
+    In order of preference: overwrite in place (splitting off a JUNK chunk
+    for leftover space), grow into trailing filler or the end of the file,
+    or retire the old chunk as JUNK and write the new one into filler left
+    by earlier edits or at the end. Returns how it was written.
+    """
+    existing = riff.find(chunk_id, list_type)
+    payload = build(0)
+
+    if existing is not None:
+        room = existing.end - existing.data_offset
+        # Filler chunks straight after the old one can be absorbed
+        following = [c for c in riff.chunks if c.offset >= existing.end]
+        for chunk in following:
+            if chunk.offset != existing.offset + 8 + room or chunk.id not in FILLER_IDS:
+                break
+            room = chunk.end - existing.data_offset
+        is_last = existing.offset + 8 + room >= riff.riff_end
+
+        padded = len(payload) + (len(payload) & 1)
+        if padded <= room and (room - padded >= 8 or room == padded):
+            _put(riff, existing.offset, chunk_id, payload)
+            if room - padded >= 8:
+                _put_header(riff, existing.data_offset + padded, b'JUNK', room - padded - 8)
+            return 'in-place'
+        if padded < room and len(build(room)) == room:
+            # Less than a JUNK header left over: pad the payload out to fill it exactly
+            _put(riff, existing.offset, chunk_id, build(room))
+            return 'in-place'
+        if is_last:
+            return _rewrite_tail(riff, existing.offset, chunk_id, payload)
+
+    # Reuse filler left behind by earlier edits before growing the file; the old
+    # chunk counts as filler but is only retired once the new one is written
+    padded = len(payload) + (len(payload) & 1)
+    for offset, room in _filler_runs(riff, existing):
+        if room == padded or room - padded >= 8:
+            _put(riff, offset, chunk_id, payload)
+            if room - padded >= 8:
+                _put_header(riff, offset + 8 + padded, b'JUNK', room - padded - 8)
+            if existing is not None and not offset <= existing.offset < offset + 8 + room:
+                _retire(riff, existing)
+            return 'filler'
+    riff.map.flush()
+    return _rewrite_tail(riff, riff.riff_end + (riff.riff_end & 1), chunk_id, payload,
+                         'appended' if existing is None else 'moved', retire=existing)
+
+
+def _retire(riff, chunk):
+    # Readers skip JUNK
+    riff.map[chunk.offset:chunk.offset + 4] = b'JUNK'
+
+
+def _filler_runs(riff, retired=None):
+    # (offset, payload room) for each run of adjacent filler chunks, counting a just-retired chunk
+    start = room = None
+    for chunk in riff.chunks:
+        if chunk.id in FILLER_IDS or chunk is retired:
+            if start is None:
+                start = chunk.offset
+            room = chunk.end - start - 8
+        elif start is not None:
+            yield start, room
+            start = None
+    if start is not None and start + 8 + room < riff.riff_end:
+        yield start, room
+
+
+def _put_header(riff, offset, chunk_id, size):
+    riff.map[offset:offset + 8] = struct.pack('<4sI', chunk_id, size)
+
+
+def _put(riff, offset, chunk_id, payload):
+    _put_header(riff, offset, chunk_id, len(payload))
+    end = offset + 8 + len(payload)
+    riff.map[offset + 8:end] = payload
+    if len(payload) & 1:
+        riff.map[end:end + 1] = b'\x00'
+
+
+def _rewrite_tail(riff, offset, chunk_id, payload, how='extended', retire=None):
+    # The map can't grow, so anything past the current end goes through the file.
+    # Size limits are checked before anything is written.
+    data = struct.pack('<4sI', chunk_id, len(payload)) + payload + b'\x00' * (len(payload) & 1)
+    new_size = offset + len(data)
+    if riff.form == 'RIFF' and new_size - 8 > SIZE_PLACEHOLDER:
+        raise RiffError('Metadata would push the file past the 4 GiB RIFF limit')
+    riff.map.flush()
+    riff.file.seek(offset)
+    riff.file.write(data)
+    riff.file.truncate(new_size)
+    riff.file.flush()
+    if riff.form == 'RIFF':
+        riff.file.seek(4)
+        riff.file.write(struct.pack('<I', new_size - 8))
+    else:
+        riff.file.seek(20)
+        riff.file.write(struct.pack('<Q', new_size - 8))
+    riff.file.flush()
+    if retire is not None:
+        _retire(riff, retire)
+    return how
+
+
+def update_metadata(path, info=None, bext=None):
+    """Rewrite the INFO and/or bext chunks of ``path`` in place.
+
+    ``info`` maps JS field names (Title, Artist, ...) to values. Empty
+    values remove a field and other existing fields are kept. ``bext`` maps
+    bext field names to values, merged into the existing chunk. Returns a
+    report with how each chunk was written and the post-write summary.
+    Raises RiffError if the file isn't a WAVE or the data chunk moved.
+    """
+    written = {}
+    for chunk_id, list_type, updates in ((b'LIST', b'INFO', info), (b'bext', None, bext)):
+        if not updates:
+            continue
+        with RiffFile(path, writable=True) as riff:
+            before = riff.find(b'data')
+            if chunk_id == b'LIST':
+                build = lambda min_size, riff=riff: _info_payload(riff, updates, min_size)
+            else:
+                current = riff.bext()
+                build = lambda min_size, current=current: build_bext(current, updates, min_size)
+            written[chunk_id.decode().strip()] = _write_chunk(riff, chunk_id, build, list_type)
+            riff.map.flush()
+            os.fsync(riff.file.fileno())
+
+        with RiffFile(path) as check:
+            after = check.find(b'data')
+            if before is None or after is None or (after.offset, after.size) != (before.offset, before.size):
+                raise RiffError('data chunk moved during metadata update')
+
+    with RiffFile(path) as riff:
+        summary = riff.summary()
+    summary['written'] = written
+    return summary
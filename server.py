@@ -1,136 +1,497 @@
 from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pool_server import ThreadPoolHTTPServer
+from multipart_stream import request_body_reader, multipart_boundary, MultipartParser, copy_stream
+from transcription_cache import HashingWriter, cache_key, cache_from_env
+from audio_store import store_from_env
+import deepgram_client
+import loudness
+import align
+import pitch
+import riff
+import fingerprint
+import spectrogram
+import static_assets
+import transcode
+import stream_transcribe
+import metrics
 import os
 import re
 import json
-import urllib.request
 import urllib.parse
-import io
 import uuid
-import tempfile
-import shutil
 import logging
-import asyncio
+import argparse
+import threading
+import contextlib
+from collections import OrderedDict
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class AudioTranscriptionHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        self.temp_dir = tempfile.mkdtemp()
-        super().__init__(*args, **kwargs)
+transcription_cache = cache_from_env()
+# Uploads are downmixed/resampled to FLAC before going to Deepgram (TRANSCODE_UPLOADS=0 to send them as-is)
+transcoder = transcode.transcoder_from_env()
+# Long recordings in overlapping segments, results pushed back as Server-Sent Events
+segmented_transcriber = stream_transcribe.transcriber_from_env()
+audio_store = store_from_env()
+# Metadata edits rewrite chunks of the stored file in place; one at a time
+metadata_lock = threading.Lock()
+assets = static_assets.assets_from_env(os.getcwd())
+# Rendered tiles are shared and keyed by audio fingerprint; pyramids (file
+# header + band layout) are kept for the most recently viewed stored files
+spectrogram_tiles = spectrogram.tile_cache_from_env()
+spectrogram_pyramids = OrderedDict()
+spectrogram_lock = threading.Lock()
+MAX_PYRAMIDS = 32
+
+
+def get_pyramid(file_id):
+    with spectrogram_lock:
+        pyramid = spectrogram_pyramids.get(file_id)
+        if pyramid is not None:
+            spectrogram_pyramids.move_to_end(file_id)
+            return pyramid
+    path = audio_store.path(file_id)
+    pyramid = spectrogram.SpectrogramPyramid(path, fingerprint.content_key(path, quick=True), spectrogram_tiles)
+    with spectrogram_lock:
+        spectrogram_pyramids[file_id] = pyramid
+        while len(spectrogram_pyramids) > MAX_PYRAMIDS:
+            spectrogram_pyramids.popitem(last=False)
+    return pyramid
+
+metrics.register_stats('transcription_cache', transcription_cache.stats)
+metrics.register_stats('audio_store', audio_store.stats)
+metrics.register_stats('spectrogram_tiles', spectrogram_tiles.stats)
+metrics.register_stats('static_assets', assets.stats)
+metrics.register_stats('transcode', transcoder.stats)
+metrics.register_stats('segmented_transcription', segmented_transcriber.stats)
+metrics.register_stats('deepgram', lambda: deepgram_client.get_client().stats())
+
+class AudioTranscriptionHandler(metrics.MetricsMixin, SimpleHTTPRequestHandler):
+    metrics_server = 'site'
+    route_patterns = [
+        (r'^(?:/audio2text)?/api/transcribe$', '/api/transcribe'),
+        (r'^(?:/audio2text)?/api/transcribe/stream/[^/]+$', '/api/transcribe/stream/:id'),
+        (r'^/api/spectrogram/[^/]+/\d+/\d+$', '/api/spectrogram/:id/:level/:index'),
+        (r'^/api/(fingerprint|metadata|spectrogram)/[^/]+$', r'/api/\1/:id'),
+        (r'^/api/(status|loudness|pitch|align|fingerprint|metadata|spectrogram)$', r'/api/\1'),
+        (r'^/temp/audio/[^/]+$', '/temp/audio/:id'),
+        (r'^/(metrics|debug/profile)$', r'/\1')
+    ]
 
     def do_GET(self):
         logger.info(f'Handling GET request for: {self.path}')
+        route = urllib.parse.urlsplit(self.path)
+
+        if route.path == '/metrics':
+            self.send_metrics()
+            return
+        if self.path.startswith('/debug/profile'):
+            self.send_profile()
+            return
+
+        if route.path == '/api/status':
+            stats = self.server.stats() if hasattr(self.server, 'stats') else {}
+            stats['deepgram'] = deepgram_client.get_client().stats()
+            stats['transcriptionCache'] = transcription_cache.stats()
+            stats['transcode'] = transcoder.stats()
+            stats['segmentedTranscription'] = segmented_transcriber.stats()
+            stats['audioStore'] = audio_store.stats()
+            stats['spectrogramTiles'] = spectrogram_tiles.stats()
+            stats['staticAssets'] = assets.stats()
+            self.send_json(stats)
+            return
         
         # Check if this is a request for a temporary audio file
-        audio_match = re.match(r'^/temp/audio/([^/]+)$', self.path)
+        audio_match = re.match(r'^/temp/audio/([^/]+)$', route.path)
         if audio_match:
-            file_id = audio_match.group(1)
-            file_path = os.path.join(self.temp_dir, file_id)
-            if os.path.exists(file_path):
-                self.send_response(200)
-                self.send_header('Content-Type', 'audio/wav')
-                self.send_header('Content-Length', os.path.getsize(file_path))
-                self.end_headers()
-                with open(file_path, 'rb') as f:
-                    shutil.copyfileobj(f, self.wfile)
+            audio_store.serve(self, audio_match.group(1))
+            return
+
+        # EventSource-friendly streaming transcription of an already uploaded file
+        stream_match = re.match(r'^(?:/audio2text)?/api/transcribe/stream/([^/]+)$', route.path)
+        if stream_match:
+            file_id = stream_match.group(1)
+            try:
+                file_path = audio_store.path(file_id)
+            except ValueError as e:
+                self.send_error(400, str(e))
                 return
-            else:
+            if audio_store.get(file_id) is None:
                 self.send_error(404, 'Audio file not found')
                 return
-                
-        return SimpleHTTPRequestHandler.do_GET(self)
+            try:
+                content = fingerprint.content_key(file_path)
+            except Exception:
+                content = f'file:{file_id}'
+            self.send_transcript_stream(file_id, file_path, content)
+            return
 
-    async def transcribe_with_deepgram(self, audio_content, content_type):
-        api_key = os.getenv('DEEPGRAM_API_KEY')
-        if not api_key:
-            raise ValueError('Deepgram API key not found in environment')
+        fingerprint_match = re.match(r'^/api/fingerprint/([^/]+)$', route.path)
+        if fingerprint_match:
+            self.send_fingerprint(fingerprint_match.group(1), urllib.parse.parse_qs(route.query))
+            return
 
-        url = 'https://api.deepgram.com/v1/listen?smart_format=true&model=general&language=en-US'
-        
-        headers = {
-            'Authorization': f'Token {api_key}',
-            'Content-Type': content_type
-        }
-        
+        spectrogram_match = re.match(r'^/api/spectrogram/([^/]+)(?:/(\d+)/(\d+))?$', route.path)
+        if spectrogram_match:
+            file_id, level, index = spectrogram_match.groups()
+            if level is None:
+                self.send_spectrogram(file_id)
+            else:
+                self.send_spectrogram_tile(file_id, int(level), int(index))
+            return
+
+        metadata_match = re.match(r'^/api/metadata/([^/]+)$', route.path)
+        if metadata_match:
+            self.send_metadata(metadata_match.group(1))
+            return
+
+        if assets.serve(self):
+            return
+        return SimpleHTTPRequestHandler.do_GET(self)
+
+    def transcribe_with_deepgram(self, audio_path, content_type):
+        # Runs on the shared Deepgram client's event loop so connections are pooled
         try:
-            req = urllib.request.Request(
-                url,
-                data=audio_content,
-                headers=headers,
-                method='POST'
-            )
-            
-            with urllib.request.urlopen(req) as response:
-                response_data = json.loads(response.read().decode())
-                
-                if 'results' in response_data and 'channels' in response_data['results']:
-                    transcript = response_data['results']['channels'][0]['alternatives'][0]
-                    return {
-                        'text': transcript['transcript'],
-                        'confidence': transcript['confidence']
-                    }
-                else:
-                    raise ValueError('Unexpected response format from Deepgram')
-                    
+            return deepgram_client.get_client().transcribe_sync(audio_path, content_type)
         except Exception as e:
             logger.error(f'Error calling Deepgram API: {e}')
             raise
 
+    def save_upload(self):
+        # Stream the uploaded audio into the audio store; returns (file_id, path, type, sha256)
+        return self.save_uploads(1)[0]
+
+    def save_uploads(self, max_files):
+        # Like save_upload, for up to max_files audio parts of one multipart body (in order)
+        content_type = self.headers.get('Content-Type', '')
+        body = request_body_reader(self.rfile, self.headers)
+        boundary = multipart_boundary(content_type)
+        saved = []
+        try:
+            if boundary:
+                parser = MultipartParser(body, boundary)
+                for part in parser:
+                    if part.filename is not None or part.content_type.startswith('audio/'):
+                        # Get the actual content type (audio/wav, audio/mp3, etc.)
+                        audio_type = part.content_type if part.content_type.startswith('audio/') else 'audio/wav'
+                        saved.append(self._store_stream(part, audio_type))
+                        if len(saved) == max_files:
+                            break
+                parser.drain()
+                if not saved:
+                    raise ValueError('No audio file found in upload')
+            else:
+                audio_type = content_type if content_type.startswith('audio/') else 'audio/wav'
+                saved.append(self._store_stream(body, audio_type))
+        except Exception:
+            for file_id, _, _, _ in saved:
+                audio_store.discard(audio_store.path(file_id))
+            raise
+        for file_id, _, audio_type, _ in saved:
+            audio_store.add(file_id, audio_type)
+        return saved
+
+    def _store_stream(self, stream, audio_type):
+        file_id = str(uuid.uuid4())
+        file_path = audio_store.path(file_id)
+        try:
+            with open(file_path, 'wb') as raw_file:
+                f = HashingWriter(raw_file)
+                copy_stream(stream, f)
+        except Exception:
+            audio_store.discard(file_path)
+            raise
+        # Browsers often send a generic or wrong type; the magic bytes know better
+        detected = transcode.sniff_file(file_path)
+        if detected:
+            audio_type = detected['mimeType']
+        return file_id, file_path, audio_type, f.hexdigest()
+
+    def send_metadata(self, file_id, status=200, summary=None):
+        # Chunk layout, fmt, INFO/bext tags and a structure check for a stored WAV
+        try:
+            if audio_store.get(file_id) is None:
+                self.send_error(404, 'Audio file not found')
+                return
+            if summary is None:
+                with riff.RiffFile(audio_store.path(file_id)) as wav:
+                    summary = wav.summary()
+        except (ValueError, OSError) as e:
+            self.send_error(400, f'Not a WAV file: {e}')
+            return
+        summary['id'] = file_id
+        summary['audioUrl'] = f'/temp/audio/{file_id}'
+        self.send_json(summary, status)
+
+    def send_fingerprint(self, file_id, query):
+        # Content key of a stored file; ?quick=1 samples large payloads instead of hashing them fully
+        quick = query.get('quick', ['0'])[0] in ('1', 'true')
+        try:
+            if audio_store.get(file_id) is None:
+                self.send_error(404, 'Audio file not found')
+                return
+            result = fingerprint.fingerprint(audio_store.path(file_id), quick)
+        except (ValueError, OSError) as e:
+            self.send_error(400, f'Cannot fingerprint file: {e}')
+            return
+        result['id'] = file_id
+        result['audioUrl'] = f'/temp/audio/{file_id}'
+        self.send_json(result)
+
+    def send_spectrogram(self, file_id):
+        # Pyramid layout for a stored file; tiles are fetched separately
+        try:
+            if audio_store.get(file_id) is None:
+                self.send_error(404, 'Audio file not found')
+                return
+            result = get_pyramid(file_id).info()
+        except (ValueError, OSError) as e:
+            self.send_error(400, f'Cannot read audio: {e}')
+            return
+        result['id'] = file_id
+        result['audioUrl'] = f'/temp/audio/{file_id}'
+        result['tileUrl'] = f'/api/spectrogram/{file_id}/{{level}}/{{index}}'
+        self.send_json(result)
+
+    def send_spectrogram_tile(self, file_id, level, index):
+        # One uint8 tile, BANDS rows of TILE_WIDTH columns; immutable for a given fingerprint
+        try:
+            if audio_store.get(file_id) is None:
+                self.send_error(404, 'Audio file not found')
+                return
+            pyramid = get_pyramid(file_id)
+            etag = f'"{pyramid.key}-{level}-{index}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            tile = pyramid.tile(level, index)
+        except IndexError as e:
+            self.send_error(404, str(e))
+            return
+        except (ValueError, OSError) as e:
+            self.send_error(400, f'Cannot read audio: {e}')
+            return
+        except Exception as e:
+            logger.error(f'Error rendering spectrogram tile: {e}')
+            self.send_error(500, f'Internal server error: {str(e)}')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', len(tile))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'private, max-age=86400')
+        self.send_header('X-Tile-Bands', pyramid.bands)
+        self.send_header('X-Tile-Width', pyramid.tile_width)
+        self.end_headers()
+        self.wfile.write(tile)
+
+    def send_event(self, event, data):
+        self.wfile.write(f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode())
+        self.wfile.flush()
+
+    def send_transcript_stream(self, file_id, file_path, content):
+        # Server-Sent Events: start, then segment/partial/error as segments finish, then done
+        client = deepgram_client.get_client()
+        key = cache_key(content, dict(client.params, **segmented_transcriber.params()))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            self.send_event('start', {'id': file_id, 'audioUrl': f'/temp/audio/{file_id}'})
+            cached = transcription_cache.get(key)
+            if cached is not None:
+                self.send_event('done', dict(cached, cached=True))
+                return
+            with contextlib.closing(segmented_transcriber.events(file_path, client)) as events:
+                for event, data in events:
+                    if event == 'done' and not data['failedSegments']:
+                        transcription_cache.put(key, {'text': data['text'], 'confidence': data['confidence']})
+                    self.send_event(event, data)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info(f'Transcript stream for {file_id} closed by the client')
+        except Exception as e:
+            # Headers are out already; report in-band
+            logger.error(f'Error streaming transcription: {e}')
+            try:
+                self.send_event('error', {'error': str(e)})
+            except OSError:
+                pass
+
+    def send_json(self, data, status=200):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', len(content))
+        self.end_headers()
+        self.wfile.write(content)
+
     def do_POST(self):
         logger.info(f'Handling POST request for: {self.path}')
+        route = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(route.query)
         
-        if self.path == '/api/transcribe' or self.path == '/audio2text/api/transcribe':
+        if route.path == '/api/transcribe' or route.path == '/audio2text/api/transcribe':
             try:
-                # Get headers
-                content_type = self.headers.get('Content-Type', '')
-                content_length = int(self.headers.get('Content-Length', 0))
-                
-                logger.info(f'Headers received:')
-                for header, value in self.headers.items():
-                    logger.info(f'{header}: {value}')
-                
-                # Read the raw data
-                audio_content = self.rfile.read(content_length)
-                
-                # Extract the actual audio data from the multipart form
-                if b'Content-Type: audio/' in audio_content:
-                    # Find the audio content boundary
-                    start = audio_content.find(b'\r\n\r\n') + 4
-                    end = audio_content.rfind(b'\r\n--')
-                    if start > 0 and end > 0:
-                        audio_content = audio_content[start:end]
-                
-                # Save the audio file temporarily
-                file_id = str(uuid.uuid4())
-                file_path = os.path.join(self.temp_dir, file_id)
-                with open(file_path, 'wb') as f:
-                    f.write(audio_content)
-                
-                # Get the actual content type (audio/wav, audio/mp3, etc.)
-                audio_type = 'audio/wav'  # Default to wav if not found
-                if b'Content-Type: audio/' in audio_content:
-                    type_match = re.search(b'Content-Type: (audio/[^\r\n]+)', audio_content)
-                    if type_match:
-                        audio_type = type_match.group(1).decode()
-
-                # Transcribe the audio
-                response_data = asyncio.run(self.transcribe_with_deepgram(audio_content, audio_type))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('Headers received: ' + ', '.join(f'{h}: {v}' for h, v in self.headers.items()))
+
+                file_id, file_path, audio_type, digest = self.save_upload()
+
+                # Reuse an earlier result for the same audio and model parameters;
+                # keyed on the audio payload so retagged copies hit too
+                try:
+                    content = fingerprint.content_key(file_path)
+                except Exception:
+                    content = digest  # Unparseable container: fall back to the raw upload hash
+
+                if query.get('stream', [''])[0] in ('1', 'true') or \
+                        'text/event-stream' in self.headers.get('Accept', ''):
+                    self.send_transcript_stream(file_id, file_path, content)
+                    return
+
+                client = deepgram_client.get_client()
+                key = cache_key(content, dict(client.params, **transcoder.params()))
+                cached = transcription_cache.get(key)
+                if cached is not None:
+                    response_data = dict(cached)
+                else:
+                    # Transcribe the audio (mono 16 kHz FLAC where that's smaller)
+                    with transcoder.prepare(file_path, audio_type) as upload:
+                        response_data = self.transcribe_with_deepgram(upload.path, upload.content_type)
+                    transcription_cache.put(key, response_data)
+                    response_data = dict(response_data, upload=upload.info)
                 
                 # Add the audio file URL to the response
                 response_data['audioUrl'] = f'/temp/audio/{file_id}'
 
-                # Send the response
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps(response_data).encode())
+                self.send_json(response_data)
                 
             except Exception as e:
                 logger.error(f'Error handling transcription: {e}')
                 self.send_error(500, f'Internal server error: {str(e)}')
                 return
+        elif route.path == '/api/loudness':
+            mode = query.get('mode', ['js'])[0]
+            if mode not in loudness.MODES:
+                self.send_error(400, f'Unknown loudness mode: {mode}')
+                return
+            try:
+                file_id, file_path, _, _ = self.save_upload()
+                response_data = loudness.analyze_file(file_path, mode)
+                response_data['audioUrl'] = f'/temp/audio/{file_id}'
+                self.send_json(response_data)
+            except Exception as e:
+                logger.error(f'Error analyzing loudness: {e}')
+                self.send_error(500, f'Internal server error: {str(e)}')
+                return
+        elif route.path == '/api/pitch':
+            mode = query.get('mode', ['js'])[0]
+            frequency_range = query.get('range', ['normal'])[0]
+            if mode not in pitch.MODES or frequency_range not in pitch.RANGES:
+                self.send_error(400, f'Unknown pitch mode or range: {mode}, {frequency_range}')
+                return
+            try:
+                a4 = float(query.get('a4', [440])[0])
+                hop = int(query.get('hop', [pitch.HOP])[0])
+            except ValueError:
+                self.send_error(400, 'Invalid a4 or hop parameter')
+                return
+            if not 1 <= hop <= pitch.MAX_HOP or not a4 > 0:
+                self.send_error(400, f'hop must be between 1 and {pitch.MAX_HOP} and a4 positive')
+                return
+            try:
+                include_track = query.get('track', ['1'])[0] not in ('0', 'false')
+                file_id, file_path, _, _ = self.save_upload()
+                response_data = pitch.analyze_file(file_path, mode, frequency_range, a4, hop, include_track)
+                response_data['audioUrl'] = f'/temp/audio/{file_id}'
+                self.send_json(response_data)
+            except ValueError as e:
+                self.send_error(400, f'Cannot analyze pitch: {e}')
+                return
+            except Exception as e:
+                logger.error(f'Error analyzing pitch: {e}')
+                self.send_error(500, f'Internal server error: {str(e)}')
+                return
+        elif route.path == '/api/align':
+            # Two audio parts (A then B) or JSON {"a": id, "b": id} naming files already in the store
+            try:
+                max_lag = float(query.get('maxLag', [align.MAX_LAG_SECONDS])[0])
+                decimate = int(query.get('decimate', [align.DECIMATE])[0])
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    reader = request_body_reader(self.rfile, self.headers)
+                    ids = json.loads(b''.join(iter(reader.read, b'')) or b'{}')
+                    file_ids = [ids.get('a'), ids.get('b')]
+                    if not all(file_id and audio_store.get(file_id) for file_id in file_ids):
+                        self.send_error(404, 'Audio file not found')
+                        return
+                else:
+                    file_ids = [file_id for file_id, _, _, _ in self.save_uploads(2)]
+                    if len(file_ids) < 2:
+                        self.send_error(400, 'Alignment needs two audio files')
+                        return
+                response_data = align.align_files(*[audio_store.path(file_id) for file_id in file_ids],
+                                                  max_lag_seconds=max_lag, decimate=decimate)
+            except ValueError as e:
+                self.send_error(400, f'Cannot align: {e}')
+                return
+            except Exception as e:
+                logger.error(f'Error aligning audio: {e}')
+                self.send_error(500, f'Internal server error: {str(e)}')
+                return
+            response_data['ids'] = file_ids
+            response_data['audioUrls'] = [f'/temp/audio/{file_id}' for file_id in file_ids]
+            self.send_json(response_data)
+        elif route.path == '/api/fingerprint':
+            try:
+                file_id, _, _, _ = self.save_upload()
+            except Exception as e:
+                logger.error(f'Error saving upload: {e}')
+                self.send_error(500, f'Internal server error: {str(e)}')
+                return
+            self.send_fingerprint(file_id, query)
+        elif route.path == '/api/spectrogram':
+            try:
+                file_id, _, _, _ = self.save_upload()
+            except Exception as e:
+                logger.error(f'Error saving upload: {e}')
+                self.send_error(500, f'Internal server error: {str(e)}')
+                return
+            self.send_spectrogram(file_id)
+        elif route.path == '/api/metadata':
+            try:
+                file_id, _, _, _ = self.save_upload()
+            except Exception as e:
+                logger.error(f'Error saving upload: {e}')
+                self.send_error(500, f'Internal server error: {str(e)}')
+                return
+            self.send_metadata(file_id)
+        elif route.path.startswith('/api/metadata/'):
+            file_id = route.path[len('/api/metadata/'):]
+            try:
+                reader = request_body_reader(self.rfile, self.headers)
+                changes = json.loads(b''.join(iter(reader.read, b'')) or b'{}')
+                if audio_store.get(file_id) is None:
+                    self.send_error(404, 'Audio file not found')
+                    return
+                with metadata_lock:
+                    summary = riff.update_metadata(audio_store.path(file_id), changes.get('info'),
+                                                   changes.get('bext'))
+                    audio_store.refresh(file_id)
+            except (ValueError, AttributeError) as e:
+                self.send_error(400, f'Cannot update metadata: {e}')
+                return
+            except Exception as e:
+                logger.error(f'Error updating metadata: {e}')
+                self.send_error(500, f'Internal server error: {str(e)}')
+                return
+            self.send_metadata(file_id, summary=summary)
         else:
             self.send_error(404, 'Endpoint not found')
 
@@ -147,7 +508,30 @@ class AudioTranscriptionHandler(SimpleHTTPRequestHandler):
         self.end_headers()
 
 if __name__ == '__main__':
-    port = 8000
-    server = HTTPServer(('', port), AudioTranscriptionHandler)
-    logger.info(f'Starting server on port {port}...')
-    server.serve_forever()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Serve the site and the transcription API')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', 8)),
+                        help='number of worker threads handling requests (0 = single-threaded)')
+    parser.add_argument('--queue-size', type=int, default=int(os.getenv('SERVER_QUEUE_SIZE', 64)),
+                        help='accepted connections allowed to wait for a worker')
+    parser.add_argument('--profiler', action='store_true', default=os.getenv('ENABLE_PROFILER') == '1',
+                        help='serve a sampling profile at /debug/profile?seconds=N')
+    args = parser.parse_args()
+    AudioTranscriptionHandler.profiler_enabled = args.profiler
+
+    static_assets.warm_in_background(assets)
+    if args.workers > 0:
+        server = ThreadPoolHTTPServer(('', args.port), AudioTranscriptionHandler,
+                                      workers=args.workers, queue_size=args.queue_size)
+        metrics.register_stats('server', server.stats)
+        logger.info(f'Starting server on port {args.port} with {args.workers} workers '
+                    f'(queue size {args.queue_size})...')
+    else:
+        server = HTTPServer(('', args.port), AudioTranscriptionHandler)
+        logger.info(f'Starting server on port {args.port}...')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
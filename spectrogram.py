@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# Log-frequency spectrogram pyramid served as uint8 tiles (meter file view).
+#
+#   python spectrogram.py long_mix.wav --level 3 --index 0 > tile.u8
+#
+# Level 0 has one column per HOP samples. Each level above halves the time
+# resolution by max-pooling pairs of columns from the level below, up to a
+# single tile covering the whole file (see POOL_LEVELS for the coarse levels).
+# A tile is BANDS rows (lowest band first) of TILE_WIDTH columns, one byte per
+# cell: 0 is MIN_DB or quieter, 255 is 0 dBFS. Tiles are computed when first
+# asked for and memoized, so scrolling an hour-long file only decodes the
+# stretches actually looked at. The meter's File view (meter/static/js) draws them.
+from collections import OrderedDict
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft as sp_fft
+
+from audio_io import open_audio
+
+FFT_SIZE = 4096
+HOP = 1024
+BANDS = 256
+TILE_WIDTH = 256
+# Levels up to POOL_LEVELS are max-pooled from the full-resolution columns.
+# Above that a tile would need up to 2**level base tiles decoded, so columns
+# are rendered from SUBFRAMES windows spread across each column instead,
+# unless the tiles below happen to be cached already.
+POOL_LEVELS = 2
+SUBFRAMES = 4
+# Same display range as meter/static/js/spectrogram.js
+MIN_FREQ = 20
+MAX_FREQ = 20000
+MIN_DB = -90
+MAX_DB = 0
+
+
+class TileCache:
+    """LRU of rendered tiles shared by every pyramid, bounded by total bytes.
+
+    With ``disk_dir`` set, tiles are also written under it so they survive
+    restarts; callers key pyramids by audio fingerprint for that to be safe.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        file_key, level, index = key
+        return os.path.join(self.disk_dir, file_key.replace(':', '-'), f'{level}-{index}.u8')
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._tiles
+
+    def get(self, key):
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return tile
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    tile = f.read()
+            except OSError:
+                tile = None
+            if tile is not None:
+                self._put_memory(key, tile)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return tile
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, tile):
+        self._put_memory(key, tile)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    f.write(tile)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass  # The memory tier still has it
+
+    def _put_memory(self, key, tile):
+        with self._lock:
+            previous = self._tiles.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self._tiles[key] = tile
+            self.bytes += len(tile)
+            while self.bytes > self.max_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tiles': len(self._tiles),
+                'bytes': self.bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses
+            }
+
+
+class SpectrogramPyramid:
+    """Tile source for one audio file; ``tile(level, index)`` returns bytes.
+
+    ``key`` identifies the audio in the shared cache (a fingerprint or a
+    store id). Tile rendering is serialized per file since the decoder
+    seeks; requests for tiles already in the cache never wait on it.
+    """
+
+    def __init__(self, path, key, cache, fft_size=FFT_SIZE, hop=HOP, bands=BANDS, tile_width=TILE_WIDTH):
+        self.path = path
+        self.cache = cache
+        self.fft_size = fft_size
+        self.hop = hop
+        self.bands = bands
+        self.tile_width = tile_width
+        self.key = f'{key}-{fft_size}-{hop}-{bands}-{tile_width}'
+        self._lock = threading.RLock()
+
+        with open_audio(path) as reader:
+            if reader.frames is None:
+                raise ValueError('Spectrogram tiles need an audio file with a known length')
+            self.samplerate = reader.samplerate
+            self.frames = reader.frames
+        self.columns = max(1, math.ceil(self.frames / hop))
+        self.levels = 1 + math.ceil(math.log2(math.ceil(self.columns / tile_width)))
+
+        # Band b covers edges[b]..edges[b + 1]; each takes the loudest FFT bin starting inside it
+        top = min(MAX_FREQ, self.samplerate / 2)
+        self.edges = MIN_FREQ * (top / MIN_FREQ) ** (np.arange(bands + 1) / bands)
+        bin_width = self.samplerate / fft_size
+        self.band_bins = np.minimum((self.edges[:-1] / bin_width).astype(int), fft_size // 2)
+        self.last_bin = min(int(math.ceil(self.edges[-1] / bin_width)), fft_size // 2) + 1
+        self.window = np.hanning(fft_size).astype(np.float32)
+        # Full-scale sine -> 0 dB
+        self.reference = (self.window.sum() / 2) ** 2
+
+    def tiles_at(self, level):
+        return math.ceil(self.columns / (self.tile_width << level))
+
+    def info(self):
+        return {
+            'sampleRate': self.samplerate,
+            'frames': self.frames,
+            'duration': self.frames / self.samplerate,
+            'fftSize': self.fft_size,
+            'hop': self.hop,
+            'bands': self.bands,
+            'tileWidth': self.tile_width,
+            'minFreq': float(self.edges[0]),
+            'maxFreq': float(self.edges[-1]),
+            'minDb': MIN_DB,
+            'maxDb': MAX_DB,
+            'levels': [{'level': level, 'tiles': self.tiles_at(level),
+                        'columnSeconds': (self.hop << level) / self.samplerate} for level in range(self.levels)]
+        }
+
+    def tile(self, level, index):
+        if not 0 <= level < self.levels or not 0 <= index < self.tiles_at(level):
+            raise IndexError(f'No tile {level}/{index}')
+        key = (self.key, level, index)
+        tile = self.cache.get(key)
+        if tile is not None:
+            return tile
+        with self._lock:
+            tile = self.cache.get(key)  # Another request may have rendered it meanwhile
+            if tile is None:
+                tile = self._render(level, index).tobytes()
+                self.cache.put(key, tile)
+        return tile
+
+    def _render(self, level, index):
+        if level == 0:
+            return self._render_base(index)
+        children = [(self.key, level - 1, child) for child in (2 * index, 2 * index + 1)
+                    if child < self.tiles_at(level - 1)]
+        if level > POOL_LEVELS and not all(child in self.cache for child in children):
+            return self._render_sampled(level, index)
+        # Max-pool the two tiles below; past the end of the file counts as silence
+        below = np.zeros((self.bands, 2 * self.tile_width), dtype=np.uint8)
+        for half in (0, 1):
+            child = 2 * index + half
+            if child < self.tiles_at(level - 1):
+                below[:, half * self.tile_width:(half + 1) * self.tile_width] = np.frombuffer(
+                    self.tile(level - 1, child), dtype=np.uint8).reshape(self.bands, self.tile_width)
+        return below.reshape(self.bands, self.tile_width, 2).max(axis=2)
+
+    def _render_base(self, index):
+        # Column c is centred on sample c * hop
+        first = index * self.tile_width
+        start = first * self.hop - self.fft_size // 2
+        length = (self.tile_width - 1) * self.hop + self.fft_size
+        samples = np.zeros(length, dtype=np.float32)
+        with open_audio(self.path) as reader:
+            block = reader.read(max(start, 0), length + min(start, 0))
+        mono = block.mean(axis=1, dtype=np.float32)
+        samples[max(-start, 0):max(-start, 0) + len(mono)] = mono
+
+        scaled = self._band_levels(sliding_window_view(samples, self.fft_size)[::self.hop])
+        scaled[first + np.arange(self.tile_width) >= self.columns] = 0
+        return np.ascontiguousarray(scaled.T)
+
+    def _render_sampled(self, level, index):
+        span = self.hop << level
+        first = index * self.tile_width
+        centres = ((first + np.arange(self.tile_width))[:, None] * span
+                   + (np.arange(SUBFRAMES)[None, :] + 0.5) * span / SUBFRAMES).astype(int).ravel()
+        frames = np.zeros((len(centres), self.fft_size), dtype=np.float32)
+        with open_audio(self.path) as reader:
+            for row, centre in enumerate(centres):
+                start = centre - self.fft_size // 2
+                if start >= self.frames:
+                    break
+                mono = reader.read(max(start, 0), self.fft_size + min(start, 0)).mean(axis=1, dtype=np.float32)
+                frames[row, max(-start, 0):max(-start, 0) + len(mono)] = mono
+        scaled = self._band_levels(frames).reshape(self.tile_width, SUBFRAMES, self.bands).max(axis=1)
+        scaled[first + np.arange(self.tile_width) >= math.ceil(self.columns / (1 << level))] = 0
+        return np.ascontiguousarray(scaled.T)
+
+    def _band_levels(self, frames):
+        # (frames, fft_size) samples -> (frames, bands) uint8
+        spectrum = sp_fft.rfft(frames * self.window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        bands = np.maximum.reduceat(power[:, :self.last_bin], self.band_bins, axis=1)
+        db = 10 * np.log10(np.maximum(bands / self.reference, 1e-12))
+        return np.clip((db - MIN_DB) * (255 / (MAX_DB - MIN_DB)), 0, 255).astype(np.uint8)
+
+
+def tile_cache_from_env():
+    return TileCache(
+        max_bytes=int(os.getenv('SPECTROGRAM_CACHE_BYTES', 256 * 1024 * 1024)),
+        disk_dir=os.getenv('SPECTROGRAM_CACHE_DIR') or None
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render spectrogram pyramid info or a single tile')
+    parser.add_argument('path')
+    parser.add_argument('--level', type=int)
+    parser.add_argument('--index', type=int, default=0)
+    args = parser.parse_args()
+
+    pyramid = SpectrogramPyramid(args.path, os.path.abspath(args.path), TileCache())
+    if args.level is None:
+        print(json.dumps(pyramid.info(), indent=2))
+    else:
+        sys.stdout.buffer.write(pyramid.tile(args.level, args.index))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# Static file layer shared by server.py and mixer/refresh.py.
+#
+#   python static_assets.py [root]     # precompress ahead of time (deploy step)
+#
+# Files are indexed by absolute path with their size, mtime and SHA-256; an
+# entry is rebuilt when a stat shows the size or mtime changed. Text assets
+# are compressed once (gzip, plus brotli when the module is installed) into
+# a content-addressed cache directory, so restarts and identical files reuse
+# the work. Responses carry ETag/Last-Modified and answer conditional
+# requests with 304; bodies go out with sendfile.
+from email.utils import formatdate, parsedate_to_datetime
+import argparse
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import urllib.parse
+
+from audio_store import parse_range, send_file_range
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = {'.html', '.htm', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.map', '.xml', '.ico', '.md'}
+MIN_COMPRESS_SIZE = 1024
+MAX_COMPRESS_SIZE = 64 * 1024 * 1024
+SKIP_DIRS = {'.git', 'node_modules', '__pycache__', '.proxy_cache', '.venv', 'venv'}
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compress(encoding, data):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def accepted_encodings(header):
+    # Codings from an Accept-Encoding header, without the ones given q=0
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticAssets:
+    """Index of served files with precompressed variants and validators.
+
+    ``serve(handler)`` answers a GET for whatever ``handler.translate_path``
+    maps the request to and returns False when that isn't a regular file
+    (directory listings, redirects and 404s stay with SimpleHTTPRequestHandler).
+    """
+
+    def __init__(self, root, cache_dir=None, max_age=0):
+        self.root = os.path.abspath(root)
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), 'loum-static')
+        self.max_age = max_age
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.not_modified = 0
+        self.sent = {'identity': 0, 'gzip': 0, 'br': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry(self, path):
+        # Current index entry for ``path``, rebuilt when its size or mtime moved; None if not a file
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        entry = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': digest,
+            'etag': f'"{digest[:32]}"',
+            'lastModified': formatdate(stat.st_mtime, usegmt=True),
+            'variants': {}
+        }
+        ext = os.path.splitext(path)[1].lower()
+        if ext in COMPRESSIBLE and MIN_COMPRESS_SIZE <= stat.st_size <= MAX_COMPRESS_SIZE:
+            entry['variants'] = self._precompress(path, digest, stat.st_size)
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def _precompress(self, path, digest, size):
+        # encoding -> (cached path, size) for every variant that actually saves bytes
+        variants = {}
+        data = None
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            cached = os.path.join(self.cache_dir, digest + suffix)
+            if not os.path.exists(cached):
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                compressed = _compress(encoding, data)
+                tmp_path = f'{cached}.{threading.get_ident()}.tmp'
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        f.write(compressed)
+                    os.replace(tmp_path, cached)
+                except OSError as e:
+                    logger.warning(f'Cannot write compressed copy of {path}: {e}')
+                    continue
+            compressed_size = os.path.getsize(cached)
+            if compressed_size < size * 0.9:
+                variants[encoding] = (cached, compressed_size)
+        return variants
+
+    def warm(self):
+        # Index and precompress every compressible file under root; returns (files, bytes, compressed bytes)
+        files = total = compressed = 0
+        for directory, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            for name in names:
+                if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                    continue
+                try:
+                    entry = self.entry(os.path.join(directory, name))
+                except OSError:
+                    continue
+                if entry is None:
+                    continue
+                files += 1
+                total += entry['size']
+                compressed += min([entry['size']] + [size for _, size in entry['variants'].values()])
+        logger.info(f'Indexed {files} static files: {total} bytes, {compressed} after compression')
+        return files, total, compressed
+
+    def _not_modified(self, handler, entry):
+        if_none_match = handler.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # Any encoding's tag names the same content
+            tags = [tag.strip().removeprefix('W/').strip('"').split('-')[0] for tag in if_none_match.split(',')]
+            return '*' in tags or entry['etag'].strip('"') in tags
+        if_modified_since = handler.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return entry['mtime_ns'] // 1_000_000_000 <= since
+        return False
+
+    def _cache_control(self, handler, path, entry):
+        # ?v=<hash prefix> URLs never change; everything else is revalidated (or kept max_age seconds)
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(handler.path).query)
+        version = query.get('v', [''])[0]
+        if len(version) >= 8 and entry['hash'].startswith(version):
+            return 'public, max-age=31536000, immutable'
+        if self.max_age and os.path.splitext(path)[1].lower() not in ('.html', '.htm'):
+            return f'public, max-age={self.max_age}'
+        return 'no-cache'
+
+    def serve(self, handler):
+        path = handler.translate_path(handler.path)
+        if os.path.isdir(path):
+            if not urllib.parse.urlsplit(handler.path).path.endswith('/'):
+                return False  # Let SimpleHTTPRequestHandler redirect
+            for index in ('index.html', 'index.htm'):
+                if os.path.isfile(os.path.join(path, index)):
+                    path = os.path.join(path, index)
+                    break
+            else:
+                return False
+        try:
+            entry = self.entry(path)
+        except OSError:
+            entry = None
+        if entry is None:
+            return False
+
+        cache_control = self._cache_control(handler, path, entry)
+        if self._not_modified(handler, entry):
+            with self._lock:
+                self.not_modified += 1
+            handler.send_response(304)
+            handler.send_header('ETag', entry['etag'])
+            handler.send_header('Cache-Control', cache_control)
+            handler.end_headers()
+            return True
+
+        # Compressed variants are whole-body only; a Range request gets the identity bytes
+        encoding, send_path, size = 'identity', path, entry['size']
+        byte_range = None
+        range_header = handler.headers.get('Range')
+        if range_header:
+            byte_range = parse_range(range_header, size)
+            if byte_range is False:
+                handler.send_response(416)
+                handler.send_header('Content-Range', f'bytes */{size}')
+                handler.send_header('Content-Length', '0')
+                handler.end_headers()
+                return True
+        else:
+            accepted = accepted_encodings(handler.headers.get('Accept-Encoding'))
+            for name, _ in ENCODINGS:
+                if name in accepted and name in entry['variants']:
+                    encoding = name
+                    send_path, size = entry['variants'][name]
+                    break
+        start, end = byte_range if byte_range else (0, size - 1)
+        length = end - start + 1 if size else 0
+
+        try:
+            f = open(send_path, 'rb')
+        except OSError:
+            return False
+        with f:
+            handler.send_response(206 if byte_range else 200)
+            handler.send_header('Content-Type', handler.guess_type(path))
+            handler.send_header('Content-Length', length)
+            if encoding != 'identity':
+                handler.send_header('Content-Encoding', encoding)
+                handler.send_header('ETag', f'{entry["etag"][:-1]}-{encoding}"')
+            else:
+                handler.send_header('ETag', entry['etag'])
+                handler.send_header('Accept-Ranges', 'bytes')
+            if entry['variants']:
+                handler.send_header('Vary', 'Accept-Encoding')
+            if byte_range:
+                handler.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            handler.send_header('Last-Modified', entry['lastModified'])
+            handler.send_header('Cache-Control', cache_control)
+            handler.end_headers()
+            if handler.command != 'HEAD' and length:
+                send_file_range(handler, f, start, length)
+        with self._lock:
+            self.responses += 1
+            self.sent[encoding] += length
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'bytes': sum(entry['size'] for entry in self._entries.values()),
+                'compressedFiles': sum(1 for entry in self._entries.values() if entry['variants']),
+                'brotli': brotli is not None,
+                'responses': self.responses,
+                'notModified': self.not_modified,
+                'sentBytes': dict(self.sent)
+            }
+
+
+def assets_from_env(root):
+    return StaticAssets(
+        root,
+        cache_dir=os.getenv('STATIC_CACHE_DIR') or None,
+        max_age=int(os.getenv('STATIC_MAX_AGE', 0))
+    )
+
+
+def warm_in_background(assets):
+    thread = threading.Thread(target=assets.warm, name='static-assets-warm', daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompress static assets into the shared cache directory')
+    parser.add_argument('root', nargs='?', default='.')
+    args = parser.parse_args()
+    files, total, compressed = assets_from_env(args.root).warm()
+    print(f'{files} files, {total} bytes -> {compressed} bytes served compressed')
+
+
+if __name__ == '__main__':
+    main()
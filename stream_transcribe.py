@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# Segmented transcription of long recordings, with results as they arrive.
+#
+#   python stream_transcribe.py long_interview.wav      # one JSON event per line
+#
+# The audio is decoded once, downmixed and resampled to 16 kHz while segments
+# of about SEGMENT_SECONDS are cut at the quietest frame within SEARCH_SECONDS
+# of each boundary. Every segment goes out with OVERLAP_SECONDS of context on
+# both sides, FLAC-encoded in memory, and at most ``concurrency`` are in flight
+# on the shared Deepgram client. Events come back as segments finish:
+# 'segment' (any order), 'partial' (the transcript stitched in order so far
+# grew) and finally 'done'. A word belongs to the segment whose cut range holds
+# its midpoint, so overlap isn't transcribed twice; without word timings the
+# longest run repeated across a seam is dropped instead.
+import argparse
+import contextlib
+import io
+import json
+import os
+import queue
+import re
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_io import open_audio
+from transcode import TARGET_SAMPLE_RATE, StreamResampler
+
+try:
+    import soundfile
+except ImportError:  # optional: segments go out as 16-bit WAV instead of FLAC
+    soundfile = None
+
+SEGMENT_SECONDS = 30.0
+OVERLAP_SECONDS = 1.0
+SEARCH_SECONDS = 5.0
+FRAME_SECONDS = 0.02
+MAX_SEAM_WORDS = 20
+
+
+def quietest(samples, frame):
+    # Centre of the lowest-energy frame in ``samples``
+    count = len(samples) // frame
+    if count == 0:
+        return len(samples) // 2
+    energy = np.square(samples[:count * frame].reshape(count, frame)).sum(axis=1)
+    return int(np.argmin(energy)) * frame + frame // 2
+
+
+def iter_segments(path, samplerate=TARGET_SAMPLE_RATE, segment_seconds=SEGMENT_SECONDS,
+                  overlap_seconds=OVERLAP_SECONDS, search_seconds=SEARCH_SECONDS):
+    """Yield segments of the mono, resampled audio as soon as each is decoded.
+
+    A segment is a dict with its ``samples`` (start..end, overlap included),
+    times in seconds, and ``ownStart``/``ownEnd``, the cut points between
+    which its words count.
+    """
+    with open_audio(path) as reader:
+        rate = min(samplerate, reader.samplerate)
+        resampler = StreamResampler(reader.samplerate, rate) if rate != reader.samplerate else None
+        length = max(int(segment_seconds * rate), 1)
+        overlap = int(overlap_seconds * rate)
+        search = min(int(search_seconds * rate), length // 2)
+        frame = max(int(FRAME_SECONDS * rate), 1)
+
+        def mono_blocks():
+            for block in reader.blocks():
+                mono = block.mean(axis=1, dtype=np.float32) if block.shape[1] > 1 else block[:, 0]
+                yield resampler.process(mono) if resampler else mono
+            if resampler:
+                yield resampler.flush()
+
+        def segment(index, own_start, own_end, available):
+            start = max(own_start - overlap, 0)
+            end = min(own_end + overlap, available)
+            return {
+                'index': index,
+                'start': start / rate,
+                'end': end / rate,
+                'ownStart': own_start / rate,
+                'ownEnd': own_end / rate,
+                'samplerate': rate,
+                'samples': buffer[start - buffer_start:end - buffer_start].copy()
+            }
+
+        buffer = np.zeros(0, dtype=np.float32)
+        buffer_start = 0  # Sample index of buffer[0]
+        own_start = 0
+        index = 0
+        for mono in mono_blocks():
+            buffer = np.concatenate([buffer, mono])
+            while buffer_start + len(buffer) >= own_start + length + search + overlap:
+                low = own_start + length - search - buffer_start
+                cut = buffer_start + low + quietest(buffer[low:low + 2 * search], frame)
+                yield segment(index, own_start, cut, buffer_start + len(buffer))
+                index += 1
+                own_start = cut
+                keep_from = max(own_start - overlap, 0)
+                buffer = buffer[keep_from - buffer_start:]
+                buffer_start = keep_from
+        total = buffer_start + len(buffer)
+        if total > own_start:
+            yield segment(index, own_start, total, total)
+
+
+def encode_segment(samples, samplerate):
+    # (body, content type) for one segment
+    out = io.BytesIO()
+    if soundfile is not None:
+        soundfile.write(out, samples, samplerate, format='FLAC', subtype='PCM_16')
+        return out.getvalue(), 'audio/flac'
+    with wave.open(out, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes((np.clip(samples, -1, 1 - 1 / 32768) * 32768).astype('<i2').tobytes())
+    return out.getvalue(), 'audio/wav'
+
+
+def _normalize(word):
+    return re.sub(r'[^\w]', '', word.lower())
+
+
+class Stitcher:
+    """Joins segment results in index order; ``add`` returns the words it could newly append."""
+
+    def __init__(self):
+        self.words = []
+        self.next = 0
+        self.through = 0.0
+        self._pending = {}
+        self._confidence = 0.0
+        self._duration = 0.0
+
+    def add(self, segment, result):
+        # result is None for a segment that failed; its stretch stays empty
+        self._pending[segment['index']] = (segment, result)
+        added = []
+        while self.next in self._pending:
+            segment, result = self._pending.pop(self.next)
+            words = self._take(segment, result) if result is not None else []
+            self.words.extend(words)
+            added.extend(words)
+            if result is not None:
+                span = segment['ownEnd'] - segment['ownStart']
+                self._confidence += result.get('confidence', 0) * span
+                self._duration += span
+            self.through = segment['ownEnd']
+            self.next += 1
+        return added
+
+    def _take(self, segment, result):
+        words = result.get('words')
+        if words:
+            return [word['word'] for word in words
+                    if segment['ownStart'] <= segment['start'] + (word['start'] + word['end']) / 2 < segment['ownEnd']]
+        # No timings: drop the longest head of this segment that repeats the tail stitched so far
+        tokens = result.get('text', '').split()
+        tail = [_normalize(word) for word in self.words[-MAX_SEAM_WORDS:]]
+        head = [_normalize(word) for word in tokens[:MAX_SEAM_WORDS]]
+        for count in range(min(len(tail), len(head)), 0, -1):
+            if tail[-count:] == head[:count]:
+                return tokens[count:]
+        return tokens
+
+    @property
+    def text(self):
+        return ' '.join(self.words)
+
+    @property
+    def confidence(self):
+        return self._confidence / self._duration if self._duration else 0.0
+
+
+class SegmentedTranscriber:
+    """Runs iter_segments through a DeepgramClient with bounded parallelism.
+
+    ``events(path, client)`` is a generator of (event, data) pairs; closing it
+    early (the listener went away) cancels the requests still in flight.
+    """
+
+    def __init__(self, segment_seconds=SEGMENT_SECONDS, overlap_seconds=OVERLAP_SECONDS,
+                 search_seconds=SEARCH_SECONDS, concurrency=4, samplerate=TARGET_SAMPLE_RATE):
+        self.segment_seconds = segment_seconds
+        self.overlap_seconds = overlap_seconds
+        self.search_seconds = search_seconds
+        self.concurrency = max(concurrency, 1)
+        self.samplerate = samplerate
+        self._lock = threading.Lock()
+        self.counters = {
+            'streams': 0,
+            'segments': 0,
+            'segmentFailures': 0,
+            'cancelled': 0
+        }
+
+    def params(self):
+        # Folded into transcription cache keys next to the model parameters
+        return {'segmented': f'{self.segment_seconds}/{self.overlap_seconds}/{self.search_seconds}/{self.samplerate}'}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def events(self, path, client):
+        started = time.perf_counter()
+        stitcher = Stitcher()
+        finished = queue.Queue()
+        in_flight = {}
+        failed = []
+        first_partial = None
+        self._count('streams')
+
+        def collect(block):
+            nonlocal first_partial
+            while in_flight:
+                try:
+                    segment, future = finished.get(block=block)
+                except queue.Empty:
+                    return
+                block = False
+                del in_flight[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = None
+                    failed.append(segment['index'])
+                    self._count('segmentFailures')
+                    yield 'error', {'index': segment['index'], 'start': segment['start'], 'end': segment['end'],
+                                    'error': str(e)}
+                else:
+                    yield 'segment', {'index': segment['index'], 'start': segment['start'], 'end': segment['end'],
+                                      'text': result['text'], 'confidence': result['confidence']}
+                added = stitcher.add(segment, result)
+                if added:
+                    if first_partial is None:
+                        first_partial = time.perf_counter() - started
+                    yield 'partial', {'text': ' '.join(added), 'through': round(stitcher.through, 3),
+                                      'segments': stitcher.next}
+
+        try:
+            for segment in iter_segments(path, self.samplerate, self.segment_seconds,
+                                         self.overlap_seconds, self.search_seconds):
+                while len(in_flight) >= self.concurrency:
+                    yield from collect(block=True)
+                body, content_type = encode_segment(segment.pop('samples'), segment['samplerate'])
+                future = client.submit(client.transcribe(body, content_type, words=True))
+                in_flight[future] = segment
+                future.add_done_callback(lambda future, segment=segment: finished.put((segment, future)))
+                self._count('segments')
+                yield from collect(block=False)
+            while in_flight:
+                yield from collect(block=True)
+        finally:
+            if in_flight:
+                self._count('cancelled', len(in_flight))
+            for future in in_flight:
+                future.cancel()
+
+        yield 'done', {
+            'text': stitcher.text,
+            'confidence': stitcher.confidence,
+            'duration': round(stitcher.through, 3),
+            'segments': stitcher.next,
+            'failedSegments': sorted(failed),
+            'firstPartialSeconds': round(first_partial, 3) if first_partial is not None else None,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+def transcriber_from_env():
+    return SegmentedTranscriber(
+        segment_seconds=float(os.getenv('STREAM_SEGMENT_SECONDS', SEGMENT_SECONDS)),
+        overlap_seconds=float(os.getenv('STREAM_OVERLAP_SECONDS', OVERLAP_SECONDS)),
+        search_seconds=float(os.getenv('STREAM_SEARCH_SECONDS', SEARCH_SECONDS)),
+        concurrency=int(os.getenv('STREAM_CONCURRENCY', 4))
+    )
+
+
+def main():
+    import deepgram_client
+
+    parser = argparse.ArgumentParser(description='Transcribe a long recording in overlapping segments')
+    parser.add_argument('path')
+    parser.add_argument('--segment-seconds', type=float, default=SEGMENT_SECONDS)
+    parser.add_argument('--overlap-seconds', type=float, default=OVERLAP_SECONDS)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    transcriber = SegmentedTranscriber(args.segment_seconds, args.overlap_seconds, concurrency=args.concurrency)
+    with contextlib.closing(transcriber.events(args.path, deepgram_client.get_client())) as events:
+        for event, data in events:
+            print(json.dumps({'event': event, **data}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
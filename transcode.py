@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# Upload pre-processing before the transcription request.
+#
+#   python transcode.py upload.wav out.flac --samplerate 16000
+#
+# Browsers mostly upload 44.1/48 kHz stereo WAV; speech models want mono at
+# 16 kHz. PCM uploads (WAV, AIFF, CAF, FLAC) are decoded block by block,
+# downmixed, resampled with a stateful polyphase filter (the same filter as
+# scipy.signal.resample_poly) and written as 16-bit FLAC, so memory stays
+# bounded for long recordings. Lossy uploads (MP3, Ogg, WebM, MP4/AAC) are
+# already smaller than that FLAC would be and go through unchanged, with the
+# content type taken from their magic bytes rather than the declared one.
+from math import gcd
+import argparse
+import json
+import logging
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+from scipy import signal
+
+from audio_io import open_audio
+
+try:
+    import soundfile
+except ImportError:  # optional: uploads are forwarded as they are
+    soundfile = None
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+SNIFF_BYTES = 4096
+# Containers whose payload is PCM (or lossless) and worth re-encoding
+TRANSCODABLE = {'wav', 'aiff', 'caf', 'flac'}
+WAV_CODECS = {1: 'pcm', 3: 'float', 6: 'alaw', 7: 'mulaw', 0x55: 'mp3'}
+
+
+def sniff(head):
+    # Container, codec (when the header names it) and MIME type from the first bytes of a file; None if unknown
+    if len(head) >= 12 and head[:4] in (b'RIFF', b'RF64') and head[8:12] == b'WAVE':
+        codec = None
+        offset = 12
+        while offset + 8 <= len(head):
+            chunk_id, size = head[offset:offset + 4], struct.unpack('<I', head[offset + 4:offset + 8])[0]
+            if chunk_id == b'fmt ' and offset + 10 <= len(head):
+                tag = struct.unpack('<H', head[offset + 8:offset + 10])[0]
+                if tag == 0xFFFE and offset + 34 <= len(head):
+                    tag = struct.unpack('<H', head[offset + 32:offset + 34])[0]  # WAVE_FORMAT_EXTENSIBLE subformat
+                codec = WAV_CODECS.get(tag, f'0x{tag:04x}')
+                break
+            offset += 8 + size + (size & 1)
+        return {'container': 'wav', 'codec': codec, 'mimeType': 'audio/wav'}
+    if head[:4] == b'fLaC':
+        return {'container': 'flac', 'codec': 'flac', 'mimeType': 'audio/flac'}
+    if head[:4] == b'OggS':
+        codec = next((name for marker, name in ((b'OpusHead', 'opus'), (b'\x01vorbis', 'vorbis'),
+                                                 (b'\x7fFLAC', 'flac'), (b'Speex', 'speex')) if marker in head), None)
+        return {'container': 'ogg', 'codec': codec, 'mimeType': 'audio/ogg'}
+    if head[:4] == b'\x1aE\xdf\xa3':
+        codec = next((name for marker, name in ((b'A_OPUS', 'opus'), (b'A_VORBIS', 'vorbis'), (b'A_AAC', 'aac'))
+                      if marker in head), None)
+        return {'container': 'webm', 'codec': codec, 'mimeType': 'audio/webm'}
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        return {'container': 'mp4', 'codec': None, 'mimeType': 'audio/mp4'}
+    if len(head) >= 12 and head[:4] == b'FORM' and head[8:12] in (b'AIFF', b'AIFC'):
+        return {'container': 'aiff', 'codec': 'pcm' if head[8:12] == b'AIFF' else None, 'mimeType': 'audio/aiff'}
+    if head[:4] == b'caff':
+        return {'container': 'caf', 'codec': None, 'mimeType': 'audio/x-caf'}
+    if head[:3] == b'ID3':
+        return {'container': 'mp3', 'codec': 'mp3', 'mimeType': 'audio/mpeg'}
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        # Frame sync; layer bits 00 mean ADTS AAC rather than MPEG audio
+        if head[1] & 0x06 == 0:
+            return {'container': 'aac', 'codec': 'aac', 'mimeType': 'audio/aac'}
+        return {'container': 'mp3', 'codec': 'mp3', 'mimeType': 'audio/mpeg'}
+    return None
+
+
+def sniff_file(path):
+    with open(path, 'rb') as f:
+        return sniff(f.read(SNIFF_BYTES))
+
+
+class StreamResampler:
+    """Block-wise resample_poly: same filter and output, for input that arrives in pieces.
+
+    ``process(block)`` returns every output sample the input so far fully
+    determines; ``flush()`` returns the rest. The concatenated output equals
+    ``signal.resample_poly(whole_input, up, down)`` to float precision.
+    """
+
+    def __init__(self, rate_in, rate_out):
+        divisor = gcd(rate_in, rate_out)
+        self.up, self.down = rate_out // divisor, rate_in // divisor
+        # resample_poly's default Kaiser FIR, front-padded so its delay is a whole number of output samples
+        half_len = 10 * max(self.up, self.down)
+        taps = signal.firwin(2 * half_len + 1, 1 / max(self.up, self.down), window=('kaiser', 5.0)) * self.up
+        pre_pad = self.down - half_len % self.down
+        self.taps = np.concatenate([np.zeros(pre_pad), taps]).astype(np.float32)
+        self.delay = (half_len + pre_pad) // self.down
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._base = 0  # Input index of _pending[0]; always a multiple of down
+        self._next = self.delay  # Next full-convolution output to emit
+        self._consumed = 0
+
+    def _emit(self, available):
+        # Outputs n whose newest input, floor(n * down / up), is below ``available``
+        end = -(-available * self.up // self.down)
+        if end <= self._next:
+            return np.zeros(0, dtype=np.float32)
+        full = signal.upfirdn(self.taps, self._pending, self.up, self.down)
+        offset = self._base * self.up // self.down
+        out = full[self._next - offset:end - offset].astype(np.float32)
+        self._next = end
+        # Drop input no later output needs (keeping _base a multiple of down)
+        keep_from = max((self._next * self.down - len(self.taps) + 1) // self.up, self._base)
+        keep_from -= keep_from % self.down
+        if keep_from > self._base:
+            self._pending = self._pending[keep_from - self._base:]
+            self._base = keep_from
+        return out
+
+    def process(self, block):
+        self._pending = np.concatenate([self._pending, np.asarray(block, dtype=np.float32)])
+        self._consumed += len(block)
+        return self._emit(self._consumed)
+
+    def flush(self):
+        # Zero tail so the last outputs are computable, then trim to resample_poly's length
+        total = -(-self._consumed * self.up // self.down)
+        padding = len(self.taps) // self.up + 2 * self.down
+        self._pending = np.concatenate([self._pending, np.zeros(padding, dtype=np.float32)])
+        out = self._emit(self._consumed + padding)
+        return out[:max(total + self.delay - (self._next - len(out)), 0)]
+
+
+class PreparedUpload:
+    """What to send upstream for one upload; ``close()`` deletes a transcoded copy."""
+
+    def __init__(self, path, content_type, info, temp_path=None):
+        self.path = path
+        self.content_type = content_type
+        self.info = info
+        self._temp_path = temp_path
+
+    def close(self):
+        if self._temp_path:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+            self._temp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Transcoder:
+    """Downmix/resample/FLAC stage in front of the transcription API.
+
+    ``prepare(path, declared_type)`` never fails: anything it can't decode,
+    or that wouldn't get smaller, is forwarded unchanged.
+    """
+
+    def __init__(self, samplerate=TARGET_SAMPLE_RATE, enabled=True):
+        self.samplerate = samplerate
+        self.enabled = enabled and soundfile is not None and 'FLAC' in soundfile.available_formats()
+        self._lock = threading.Lock()
+        self.counters = {
+            'uploads': 0,
+            'transcoded': 0,
+            'passthrough': 0,
+            'failures': 0,
+            'bytesIn': 0,
+            'bytesOut': 0,
+            'seconds': 0.0
+        }
+
+    def params(self):
+        # Folded into transcription cache keys, since the model hears different audio
+        return {'preprocess': f'mono-{self.samplerate}-flac'} if self.enabled else {}
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+    def prepare(self, path, declared_type='audio/wav'):
+        start = time.perf_counter()
+        size = os.path.getsize(path)
+        detected = sniff_file(path)
+        content_type = detected['mimeType'] if detected else declared_type
+        info = {
+            'container': detected['container'] if detected else None,
+            'codec': detected['codec'] if detected else None,
+            'bytes': size,
+            'forwardedBytes': size,
+            'bytesSaved': 0,
+            'transcoded': False
+        }
+
+        if self.enabled and detected and detected['container'] in TRANSCODABLE:
+            out_path = f'{path}.{threading.get_ident()}.flac'
+            try:
+                info.update(self._transcode(path, out_path))
+                out_size = os.path.getsize(out_path)
+                if out_size < size:
+                    info.update(forwardedBytes=out_size, bytesSaved=size - out_size, transcoded=True)
+                    info['seconds'] = round(time.perf_counter() - start, 4)
+                    self._count(uploads=1, transcoded=1, bytesIn=size, bytesOut=out_size,
+                                seconds=time.perf_counter() - start)
+                    logger.info(f'Transcoded upload {size} -> {out_size} bytes '
+                                f'({info["sampleRate"]} Hz x{info["channels"]} -> {info["forwardedSampleRate"]} Hz mono FLAC)')
+                    return PreparedUpload(out_path, 'audio/flac', info, temp_path=out_path)
+            except Exception as e:
+                logger.warning(f'Forwarding upload unchanged, transcoding failed: {e}')
+                self._count(failures=1)
+            try:
+                os.remove(out_path)
+            except OSError:
+                pass
+
+        info['seconds'] = round(time.perf_counter() - start, 4)
+        self._count(uploads=1, passthrough=1, bytesIn=size, bytesOut=size, seconds=time.perf_counter() - start)
+        return PreparedUpload(path, content_type, info)
+
+    def _transcode(self, path, out_path):
+        with open_audio(path) as reader:
+            rate_in, channels = reader.samplerate, reader.channels
+            rate_out = min(self.samplerate, rate_in)  # Never upsample
+            resampler = StreamResampler(rate_in, rate_out) if rate_out != rate_in else None
+            with soundfile.SoundFile(out_path, 'w', samplerate=rate_out, channels=1,
+                                     format='FLAC', subtype='PCM_16') as out:
+                for block in reader.blocks():
+                    mono = block.mean(axis=1, dtype=np.float32) if channels > 1 else block[:, 0]
+                    out.write(resampler.process(mono) if resampler else mono)
+                if resampler:
+                    out.write(resampler.flush())
+        return {'sampleRate': rate_in, 'channels': channels, 'forwardedSampleRate': rate_out}
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters['enabled'] = self.enabled
+        counters['bytesSaved'] = counters['bytesIn'] - counters['bytesOut']
+        counters['seconds'] = round(counters['seconds'], 3)
+        return counters
+
+
+def transcoder_from_env():
+    return Transcoder(
+        samplerate=int(os.getenv('TRANSCODE_SAMPLE_RATE', TARGET_SAMPLE_RATE)),
+        enabled=os.getenv('TRANSCODE_UPLOADS', '1') != '0'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Downmix, resample and FLAC-encode an upload the way the server does')
+    parser.add_argument('path')
+    parser.add_argument('output', nargs='?', help='where to copy the prepared upload')
+    parser.add_argument('--samplerate', type=int, default=TARGET_SAMPLE_RATE)
+    args = parser.parse_args()
+
+    with Transcoder(args.samplerate).prepare(args.path) as upload:
+        if args.output:
+            with open(upload.path, 'rb') as src, open(args.output, 'wb') as dst:
+                while chunk := src.read(1024 * 1024):
+                    dst.write(chunk)
+        print(json.dumps(dict(upload.info, contentType=upload.content_type), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HashingWriter:
+    # File wrapper that hashes everything written through it
+    def __init__(self, fileobj, algorithm='sha256'):
+        self.fileobj = fileobj
+        self.hash = hashlib.new(algorithm)
+        self.size = 0
+
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def cache_key(audio_digest, params):
+    # Same audio with different model/query parameters must not share a result
+    encoded = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f'{audio_digest}:{encoded}'.encode()).hexdigest()
+
+
+class TranscriptionCache:
+    """Two-tier cache of transcription results keyed by content hash.
+
+    The memory tier is an LRU bounded by entry count. The optional disk tier
+    stores one JSON file per key and is bounded by total bytes, evicting the
+    least recently used files. Both tiers expire entries after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries=1024, ttl=7 * 24 * 3600, disk_dir=None, disk_max_bytes=100 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(disk_dir)
+                                   if entry.name.endswith('.json'))
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.json')
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self.disk_dir:
+                value = self._disk_get(key, now)
+                if value is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._memory_put(key, value, now)
+                    return value
+
+            self.misses += 1
+            return None
+
+    def _disk_get(self, key, now):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - record.get('storedAt', 0) >= self.ttl:
+            self._disk_remove(path)
+            return None
+        # Touch so disk eviction sees this entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return record.get('value')
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, value, now)
+            if self.disk_dir:
+                self._disk_put(key, value, now)
+
+    def _memory_put(self, key, value, now):
+        self._memory[key] = (now, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_put(self, key, value, now):
+        path = self._disk_path(key)
+        content = json.dumps({'storedAt': now, 'value': value}).encode()
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self._disk_bytes += len(content) - previous
+        except OSError as e:
+            logger.warning(f'Could not write transcription cache entry: {e}')
+            return
+        if self._disk_bytes > self.disk_max_bytes:
+            self._evict_disk()
+
+    def _disk_remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._disk_bytes -= size
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        entries = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(self.disk_dir)
+                         if entry.name.endswith('.json'))
+        # Trim to 90% of the cap so eviction doesn't run on every put
+        target = self.disk_max_bytes * 0.9
+        for _, path in entries:
+            if self._disk_bytes <= target:
+                break
+            self._disk_remove(path)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'memoryEntries': len(self._memory),
+                'diskBytes': self._disk_bytes
+            }
+
+
+def cache_from_env():
+    return TranscriptionCache(
+        max_entries=int(os.getenv('TRANSCRIPTION_CACHE_ENTRIES', 1024)),
+        ttl=float(os.getenv('TRANSCRIPTION_CACHE_TTL', 7 * 24 * 3600)),
+        disk_dir=os.getenv('TRANSCRIPTION_CACHE_DIR') or None,
+        disk_max_bytes=int(os.getenv('TRANSCRIPTION_CACHE_DISK_BYTES', 100 * 1024 * 1024))
+    )
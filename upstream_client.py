@@ -0,0 +1,272 @@
+import asyncio
+import os
+import ssl
+import threading
+import time
+import logging
+import urllib.parse
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    def __init__(self, status, body=b''):
+        self.status = status
+        self.body = body
+        super().__init__(f'Upstream returned HTTP {status}')
+
+
+class UpstreamResponse:
+    def __init__(self, status, reason, headers, body, keep_alive):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.keep_alive = keep_alive
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def usable(self, idle_timeout):
+        if self.writer.is_closing() or self.reader.at_eof():
+            return False
+        return time.monotonic() - self.last_used < idle_timeout
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class AsyncHTTPClient:
+    """Minimal asyncio HTTP/1.1 client with per-host keep-alive pools.
+
+    Requests are limited by a semaphore, retried with exponential backoff on
+    connection errors and retryable statuses, and bounded by connect/read
+    timeouts. Bodies may be bytes or a file path streamed in chunks.
+    """
+
+    def __init__(self, pool_size=10, max_concurrency=10, connect_timeout=10,
+                 read_timeout=120, retries=2, backoff=0.5, idle_timeout=30):
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+        # stats() runs on request threads while the loop thread edits the pools,
+        # so the idle count is kept separately rather than summed from _idle
+        self._idle_count = 0
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._ssl_context = None
+        self._stats = {
+            'requests': 0,
+            'inFlight': 0,
+            'retries': 0,
+            'errors': 0,
+            'connectionsOpened': 0,
+            'connectionsReused': 0
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idleConnections'] = self._idle_count
+        return stats
+
+    def _count_idle(self, amount):
+        with self._lock:
+            self._idle_count += amount
+
+    async def _acquire(self, key):
+        pool = self._idle.get(key, [])
+        while pool:
+            conn = pool.pop()
+            self._count_idle(-1)
+            if conn.usable(self.idle_timeout):
+                self._stats['connectionsReused'] += 1
+                return conn
+            conn.close()
+
+        scheme, host, port = key
+        context = None
+        if scheme == 'https':
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            context = self._ssl_context
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context,
+                                    server_hostname=host if context else None),
+            self.connect_timeout
+        )
+        self._stats['connectionsOpened'] += 1
+        return _Connection(reader, writer)
+
+    def _release(self, key, conn):
+        pool = self._idle.setdefault(key, [])
+        if len(pool) < self.pool_size:
+            conn.last_used = time.monotonic()
+            pool.append(conn)
+            self._count_idle(1)
+        else:
+            conn.close()
+
+    async def request(self, method, url, headers=None, body=None, body_path=None):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            self._stats['requests'] += 1
+            self._stats['inFlight'] += 1
+            try:
+                for attempt in range(self.retries + 1):
+                    try:
+                        response = await self._send(method, url, headers or {}, body, body_path)
+                    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                        if attempt >= self.retries:
+                            self._stats['errors'] += 1
+                            raise
+                        logger.warning(f'Upstream {method} {url} failed ({e!r}), retrying')
+                    else:
+                        if response.status not in RETRY_STATUSES or attempt >= self.retries:
+                            return response
+                        logger.warning(f'Upstream {method} {url} returned {response.status}, retrying')
+                    self._stats['retries'] += 1
+                    await asyncio.sleep(self.backoff * (2 ** attempt))
+            finally:
+                self._stats['inFlight'] -= 1
+
+    async def _send(self, method, url, headers, body, body_path):
+        parsed = urllib.parse.urlsplit(url)
+        scheme = parsed.scheme or 'http'
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parsed.hostname, port)
+        target = parsed.path or '/'
+        if parsed.query:
+            target += '?' + parsed.query
+
+        conn = await self._acquire(key)
+        try:
+            lines = [f'{method} {target} HTTP/1.1', f'Host: {parsed.netloc}', 'Connection: keep-alive']
+            if body_path is not None:
+                length = os.path.getsize(body_path)
+            else:
+                length = len(body) if body is not None else 0
+            lines.append(f'Content-Length: {length}')
+            for name, value in headers.items():
+                if name.lower() not in ('host', 'connection', 'content-length'):
+                    lines.append(f'{name}: {value}')
+            conn.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+            if body_path is not None:
+                await self._write_file(conn.writer, body_path)
+            elif body:
+                conn.writer.write(body)
+            await asyncio.wait_for(conn.writer.drain(), self.read_timeout)
+
+            response = await asyncio.wait_for(self._read_response(conn.reader, method), self.read_timeout)
+        except BaseException:
+            conn.close()
+            raise
+
+        if response.keep_alive:
+            self._release(key, conn)
+        else:
+            conn.close()
+        return response
+
+    async def _write_file(self, writer, path):
+        loop = asyncio.get_running_loop()
+        with open(path, 'rb') as f:
+            while True:
+                data = await loop.run_in_executor(None, f.read, CHUNK_SIZE)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+
+    async def _read_response(self, reader, method):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Upstream closed the connection')
+        parts = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise ValueError(f'Invalid status line: {status_line!r}')
+        version, status = parts[0], int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ''
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = connection != 'close'
+        else:
+            keep_alive = connection == 'keep-alive'
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        return UpstreamResponse(status, reason, headers, body, keep_alive)
+
+    async def close(self):
+        for pool in self._idle.values():
+            for conn in pool:
+                conn.close()
+        self._idle.clear()
+        with self._lock:
+            self._idle_count = 0
+
+
+class LoopThread:
+    # Runs an event loop in a daemon thread so synchronous handlers can share it
+    def __init__(self, name='upstream-loop'):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)